@@ -0,0 +1,40 @@
+"""add_vector_index_state
+
+Revision ID: e_vector_index_state
+Revises: d_conversations
+Create Date: 2026-02-10
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'e_vector_index_state'
+down_revision: Union[str, Sequence[str], None] = 'd_conversations'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Track the live vector index generation for blue/green reindexing."""
+    op.execute(text("""
+        CREATE TABLE IF NOT EXISTS vector_index_state (
+            id INTEGER PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 1,
+            build_started_at TIMESTAMP WITH TIME ZONE,
+            last_reindex_at TIMESTAMP WITH TIME ZONE
+        )
+    """))
+    op.execute(text(
+        "INSERT INTO vector_index_state (id, generation) VALUES (1, 1) ON CONFLICT (id) DO NOTHING"
+    ))
+
+
+def downgrade() -> None:
+    op.execute(text("DROP TABLE IF EXISTS vector_index_state"))
+    # Leftovers from an interrupted rebuild (never read by retrieval)
+    op.execute(text("DROP TABLE IF EXISTS vector_embeddings_next"))
+    op.execute(text("DROP TABLE IF EXISTS vector_embeddings_prev"))
@@ -0,0 +1,139 @@
+"""add_index_stats_counters
+
+Revision ID: f_index_stats
+Revises: e_vector_index_state
+Create Date: 2026-02-12
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'f_index_stats'
+down_revision: Union[str, Sequence[str], None] = 'e_vector_index_state'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Trigger-maintained counters so stats endpoints never scan the tables."""
+    op.execute(text("""
+        CREATE TABLE IF NOT EXISTS vector_index_stats (
+            namespace VARCHAR PRIMARY KEY,
+            vector_count BIGINT NOT NULL DEFAULT 0
+        )
+    """))
+    op.execute(text("""
+        CREATE TABLE IF NOT EXISTS knowledge_base_category_stats (
+            category VARCHAR PRIMARY KEY,
+            total_count BIGINT NOT NULL DEFAULT 0,
+            active_count BIGINT NOT NULL DEFAULT 0
+        )
+    """))
+
+    # Statement-level: a bulk load of N chunks costs one counter update per namespace
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION vector_index_stats_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE vector_index_stats s
+                SET vector_count = s.vector_count - d.n
+                FROM (SELECT COALESCE(namespace, 'default') AS ns, COUNT(*) AS n
+                      FROM old_rows GROUP BY 1) d
+                WHERE s.namespace = d.ns;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO vector_index_stats (namespace, vector_count)
+                SELECT COALESCE(namespace, 'default'), COUNT(*) FROM new_rows GROUP BY 1
+                ON CONFLICT (namespace) DO UPDATE
+                SET vector_count = vector_index_stats.vector_count + EXCLUDED.vector_count;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION knowledge_base_category_stats_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE knowledge_base_category_stats
+                SET total_count = total_count - 1,
+                    active_count = active_count - CASE WHEN COALESCE(OLD.is_active, false) THEN 1 ELSE 0 END
+                WHERE category = COALESCE(OLD.category, '');
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO knowledge_base_category_stats (category, total_count, active_count)
+                VALUES (COALESCE(NEW.category, ''), 1,
+                        CASE WHEN COALESCE(NEW.is_active, false) THEN 1 ELSE 0 END)
+                ON CONFLICT (category) DO UPDATE
+                SET total_count = knowledge_base_category_stats.total_count + 1,
+                    active_count = knowledge_base_category_stats.active_count + EXCLUDED.active_count;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+
+    # Install triggers and backfill inside one DO block per table so the
+    # migration is a no-op for tables that don't exist yet.
+    op.execute(text("""
+        DO $$
+        BEGIN
+            IF to_regclass('vector_embeddings') IS NOT NULL THEN
+                DROP TRIGGER IF EXISTS trg_vector_index_stats_ins ON vector_embeddings;
+                DROP TRIGGER IF EXISTS trg_vector_index_stats_upd ON vector_embeddings;
+                DROP TRIGGER IF EXISTS trg_vector_index_stats_del ON vector_embeddings;
+                CREATE TRIGGER trg_vector_index_stats_ins AFTER INSERT ON vector_embeddings
+                    REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE PROCEDURE vector_index_stats_apply();
+                CREATE TRIGGER trg_vector_index_stats_upd AFTER UPDATE ON vector_embeddings
+                    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE PROCEDURE vector_index_stats_apply();
+                CREATE TRIGGER trg_vector_index_stats_del AFTER DELETE ON vector_embeddings
+                    REFERENCING OLD TABLE AS old_rows
+                    FOR EACH STATEMENT EXECUTE PROCEDURE vector_index_stats_apply();
+
+                LOCK TABLE vector_embeddings IN SHARE MODE;
+                DELETE FROM vector_index_stats;
+                INSERT INTO vector_index_stats (namespace, vector_count)
+                SELECT COALESCE(namespace, 'default'), COUNT(*) FROM vector_embeddings GROUP BY 1;
+            END IF;
+
+            IF to_regclass('knowledge_base') IS NOT NULL THEN
+                DROP TRIGGER IF EXISTS trg_knowledge_base_category_stats ON knowledge_base;
+                CREATE TRIGGER trg_knowledge_base_category_stats
+                    AFTER INSERT OR UPDATE OF category, is_active OR DELETE ON knowledge_base
+                    FOR EACH ROW EXECUTE PROCEDURE knowledge_base_category_stats_apply();
+
+                LOCK TABLE knowledge_base IN SHARE MODE;
+                DELETE FROM knowledge_base_category_stats;
+                INSERT INTO knowledge_base_category_stats (category, total_count, active_count)
+                SELECT COALESCE(category, ''), COUNT(*),
+                       COUNT(*) FILTER (WHERE COALESCE(is_active, false))
+                FROM knowledge_base GROUP BY 1;
+            END IF;
+        END $$;
+    """))
+
+
+def downgrade() -> None:
+    op.execute(text("""
+        DO $$
+        BEGIN
+            IF to_regclass('vector_embeddings') IS NOT NULL THEN
+                DROP TRIGGER IF EXISTS trg_vector_index_stats_ins ON vector_embeddings;
+                DROP TRIGGER IF EXISTS trg_vector_index_stats_upd ON vector_embeddings;
+                DROP TRIGGER IF EXISTS trg_vector_index_stats_del ON vector_embeddings;
+            END IF;
+            IF to_regclass('knowledge_base') IS NOT NULL THEN
+                DROP TRIGGER IF EXISTS trg_knowledge_base_category_stats ON knowledge_base;
+            END IF;
+        END $$;
+    """))
+    op.execute(text("DROP FUNCTION IF EXISTS vector_index_stats_apply()"))
+    op.execute(text("DROP FUNCTION IF EXISTS knowledge_base_category_stats_apply()"))
+    op.execute(text("DROP TABLE IF EXISTS knowledge_base_category_stats"))
+    op.execute(text("DROP TABLE IF EXISTS vector_index_stats"))
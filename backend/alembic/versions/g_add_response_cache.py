@@ -0,0 +1,64 @@
+"""add_response_cache
+
+Revision ID: g_response_cache
+Revises: f_index_stats
+Create Date: 2026-02-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'g_response_cache'
+down_revision: Union[str, Sequence[str], None] = 'f_index_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """KB content version + semantic response cache table."""
+    op.execute(text(
+        "ALTER TABLE vector_index_state ADD COLUMN IF NOT EXISTS kb_version INTEGER NOT NULL DEFAULT 1"
+    ))
+
+    op.execute(text("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            id SERIAL PRIMARY KEY,
+            context_type VARCHAR NOT NULL,
+            recipe VARCHAR NOT NULL DEFAULT '',
+            instagram BOOLEAN NOT NULL DEFAULT false,
+            user_tier VARCHAR NOT NULL DEFAULT '',
+            kb_version INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            response TEXT NOT NULL,
+            sources JSON,
+            kb_confidence DOUBLE PRECISION,
+            tokens_used INTEGER DEFAULT 0,
+            hit_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            last_hit_at TIMESTAMP WITH TIME ZONE
+        )
+    """))
+    op.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_response_cache_key "
+        "ON response_cache (context_type, recipe, instagram, user_tier, kb_version)"
+    ))
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_response_cache_created_at ON response_cache (created_at)"))
+
+    # The embedding column needs pgvector; without it the cache simply never hits
+    op.execute(text("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'vector') THEN
+                ALTER TABLE response_cache ADD COLUMN IF NOT EXISTS embedding vector(1536);
+            END IF;
+        END $$;
+    """))
+
+
+def downgrade() -> None:
+    op.execute(text("DROP TABLE IF EXISTS response_cache"))
+    op.execute(text("ALTER TABLE vector_index_state DROP COLUMN IF EXISTS kb_version"))
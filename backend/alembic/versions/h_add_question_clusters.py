@@ -0,0 +1,66 @@
+"""add_question_clusters
+
+Revision ID: h_question_clusters
+Revises: g_response_cache
+Create Date: 2026-02-20
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'h_question_clusters'
+down_revision: Union[str, Sequence[str], None] = 'g_response_cache'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Question embeddings, clusters and the per-day cluster rollup."""
+    op.execute(text("ALTER TABLE question_logs ADD COLUMN IF NOT EXISTS cluster_id INTEGER"))
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_question_logs_cluster_id ON question_logs (cluster_id)"))
+
+    op.execute(text("""
+        CREATE TABLE IF NOT EXISTS question_clusters (
+            id SERIAL PRIMARY KEY,
+            centroid BYTEA NOT NULL,
+            size INTEGER NOT NULL DEFAULT 0,
+            representative_log_id INTEGER,
+            representative_question TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    """))
+
+    op.execute(text("""
+        CREATE TABLE IF NOT EXISTS question_embeddings (
+            question_log_id INTEGER PRIMARY KEY,
+            cluster_id INTEGER NOT NULL,
+            embedding BYTEA NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    """))
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_question_embeddings_cluster_id ON question_embeddings (cluster_id)"))
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_question_embeddings_created_at ON question_embeddings (created_at)"))
+
+    op.execute(text("""
+        CREATE TABLE IF NOT EXISTS question_cluster_daily (
+            cluster_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            first_asked TIMESTAMP WITH TIME ZONE NOT NULL,
+            last_asked TIMESTAMP WITH TIME ZONE NOT NULL,
+            PRIMARY KEY (cluster_id, day)
+        )
+    """))
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_question_cluster_daily_day ON question_cluster_daily (day)"))
+
+
+def downgrade() -> None:
+    op.execute(text("DROP TABLE IF EXISTS question_cluster_daily"))
+    op.execute(text("DROP TABLE IF EXISTS question_embeddings"))
+    op.execute(text("DROP TABLE IF EXISTS question_clusters"))
+    op.execute(text("ALTER TABLE question_logs DROP COLUMN IF EXISTS cluster_id"))
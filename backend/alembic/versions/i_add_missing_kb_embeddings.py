@@ -0,0 +1,32 @@
+"""add_missing_kb_embeddings
+
+Revision ID: i_missing_kb_embeddings
+Revises: h_question_clusters
+Create Date: 2026-02-24
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'i_missing_kb_embeddings'
+down_revision: Union[str, Sequence[str], None] = 'h_question_clusters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Cached question embeddings for auto-resolving missing KB items."""
+    op.execute(text("ALTER TABLE missing_kb_items ADD COLUMN IF NOT EXISTS question_embedding BYTEA"))
+    op.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_missing_kb_items_unresolved
+        ON missing_kb_items (id) WHERE is_resolved = false
+    """))
+
+
+def downgrade() -> None:
+    op.execute(text("DROP INDEX IF EXISTS ix_missing_kb_items_unresolved"))
+    op.execute(text("ALTER TABLE missing_kb_items DROP COLUMN IF EXISTS question_embedding"))
@@ -0,0 +1,30 @@
+"""add_chat_messages_conversation_index
+
+Revision ID: j_chat_messages_conv_index
+Revises: i_missing_kb_embeddings
+Create Date: 2026-02-25
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'j_chat_messages_conv_index'
+down_revision: Union[str, Sequence[str], None] = 'i_missing_kb_embeddings'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index for loading the newest turns of a conversation."""
+    op.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_chat_messages_conversation_recent
+        ON chat_messages (conversation_id, id)
+    """))
+
+
+def downgrade() -> None:
+    op.execute(text("DROP INDEX IF EXISTS ix_chat_messages_conversation_recent"))
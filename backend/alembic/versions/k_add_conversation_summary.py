@@ -0,0 +1,29 @@
+"""add_conversation_summary
+
+Revision ID: k_conversation_summary
+Revises: j_chat_messages_conv_index
+Create Date: 2026-02-26
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'k_conversation_summary'
+down_revision: Union[str, Sequence[str], None] = 'j_chat_messages_conv_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Rolling summary of a conversation's older turns."""
+    op.execute(text("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary TEXT"))
+    op.execute(text("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary_message_id INTEGER"))
+
+
+def downgrade() -> None:
+    op.execute(text("ALTER TABLE conversations DROP COLUMN IF EXISTS summary_message_id"))
+    op.execute(text("ALTER TABLE conversations DROP COLUMN IF EXISTS summary"))
@@ -0,0 +1,32 @@
+"""drop_question_logs_question_index
+
+Revision ID: l_question_logs_question_index
+Revises: k_conversation_summary
+Create Date: 2026-02-27
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'l_question_logs_question_index'
+down_revision: Union[str, Sequence[str], None] = 'k_conversation_summary'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Drop the b-tree index on the unbounded question text.
+    
+    Nothing looks questions up by their full text, the index slows every
+    log insert, and a long enough question exceeds the b-tree row size.
+    """
+    op.execute(text("DROP INDEX IF EXISTS ix_question_logs_question"))
+
+
+def downgrade() -> None:
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_question_logs_question ON question_logs (question)"))
@@ -0,0 +1,29 @@
+"""add_chat_messages_is_truncated
+
+Revision ID: m_chat_messages_truncated
+Revises: l_question_logs_question_index
+Create Date: 2026-02-28
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = 'm_chat_messages_truncated'
+down_revision: Union[str, Sequence[str], None] = 'l_question_logs_question_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Mark responses cut short because the client disconnected mid-stream."""
+    op.execute(text(
+        "ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS is_truncated BOOLEAN NOT NULL DEFAULT false"
+    ))
+
+
+def downgrade() -> None:
+    op.execute(text("ALTER TABLE chat_messages DROP COLUMN IF EXISTS is_truncated"))
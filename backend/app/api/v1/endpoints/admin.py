@@ -18,6 +18,10 @@ from datetime import datetime, timedelta, timezone
 from app.db.database import get_db
 from app.db.models import User, ChatMessage, UsageTracking, MissingKBItem, QuestionLog
 from app.core.constants import UserTier
+from app.core.http import pool_stats
+from app.core.llm_gateway import llm_gateway
+from app.core.llm_scheduler import llm_scheduler
+from app.core.model_routing import model_router
 from app.schemas.knowledge import (
     KnowledgeBaseItem,
     KnowledgeBaseCreate,
@@ -43,12 +47,14 @@ from app.schemas.logging import (
 from app.schemas.chat import PersonaTestRequest, PersonaTestResponse
 from app.schemas.auth import UserResponse
 from app.services.knowledge_service import KnowledgeService
-from app.services.chat_service import ChatService
+from app.services.chat_service import ChatService, question_log_writer
+from app.services.semantic_cache_service import SemanticCacheService
+from app.services.question_clustering_service import QuestionClusteringService, run_question_clustering
 from app.services.user_service import UserService
 from app.services.usage_service import UsageService
 from app.core import ConversationContext
 from app.core.constants import UserTier
-from app.core.exceptions import AlreadyExistsError
+from app.core.exceptions import AlreadyExistsError, TayAIError, to_http_exception
 from app.utils import truncate_text
 from app.dependencies import get_current_admin
 
@@ -168,9 +174,17 @@ async def reindex_knowledge(
     db: AsyncSession = Depends(get_db),
     admin: dict = Depends(get_current_admin)
 ):
-    """Reindex all knowledge base items in PostgreSQL pgvector."""
+    """
+    Reindex all knowledge base items in PostgreSQL pgvector.
+    
+    Builds a shadow generation and swaps it in atomically; chat retrieval
+    keeps using the current index until the swap.
+    """
     service = KnowledgeService(db)
-    success, errors = await service.reindex_all()
+    try:
+        success, errors = await service.reindex_all()
+    except TayAIError as e:
+        raise to_http_exception(e)
     
     return ReindexResponse(
         success_count=success,
@@ -515,11 +529,69 @@ async def get_system_overview(
         "knowledge_base": {
             "total_items": kb_stats.total_items,
             "active_items": kb_stats.active_items,
-            "categories": kb_stats.categories_count
+            "categories": len(kb_stats.categories),
+            "vectors": kb_stats.vector_count,
+            "index_size_bytes": kb_stats.index_size_bytes,
+            "last_reindex_at": kb_stats.last_reindex_at
         }
     }
 
 
+@router.get("/stats/semantic-cache")
+async def get_semantic_cache_stats(
+    db: AsyncSession = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """Semantic response cache hit rate and tokens saved."""
+    return await SemanticCacheService(db).get_stats()
+
+
+@router.get("/stats/question-log-writer")
+async def get_question_log_writer_stats(admin: dict = Depends(get_current_admin)):
+    """Buffered question log writer: queue depth, flush latency and row counts."""
+    return question_log_writer.stats()
+
+
+@router.get("/stats/llm")
+async def get_llm_stats(admin: dict = Depends(get_current_admin)):
+    """LLM gateway per model: retries, failures, hedges, circuit state and latency histograms."""
+    return llm_gateway.stats()
+
+
+@router.get("/stats/llm-queue")
+async def get_llm_queue_stats(admin: dict = Depends(get_current_admin)):
+    """LLM scheduler (this worker): in-flight and queued turns by tier, queue wait and shed turns."""
+    return llm_scheduler.stats()
+
+
+@router.get("/stats/http-pools")
+async def get_http_pool_stats(admin: dict = Depends(get_current_admin)):
+    """Outbound HTTP pools (this worker) per service: limits, requests in flight and connections."""
+    return pool_stats()
+
+
+@router.get("/stats/model-routes")
+async def get_model_route_stats(admin: dict = Depends(get_current_admin)):
+    """Chat model routing per route: model, turns, time to first token, total time and cost."""
+    return model_router.stats()
+
+
+@router.get("/stats/chat-streams")
+async def get_chat_stream_stats(admin: dict = Depends(get_current_admin)):
+    """Streamed answers completed vs stopped by a client disconnect, and tokens saved."""
+    return ChatService.get_stream_stats()
+
+
+@router.delete("/semantic-cache")
+async def clear_semantic_cache(
+    db: AsyncSession = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """Drop all cached responses (e.g. after a persona prompt change)."""
+    removed = await SemanticCacheService(db).clear()
+    return {"message": f"Removed {removed} cached responses", "removed": removed}
+
+
 @router.get("/stats/activity")
 async def get_activity_stats(
     days: int = Query(7, ge=1, le=30),
@@ -831,33 +903,48 @@ async def get_question_stats(
     )
     total_questions = result.scalar() or 0
     
-    # Top questions (by normalized question)
-    result = await db.execute(
-        select(
-            QuestionLog.normalized_question,
-            QuestionLog.question,
-            func.count(QuestionLog.id).label('count'),
-            func.min(QuestionLog.created_at).label('first_asked'),
-            func.max(QuestionLog.created_at).label('last_asked')
-        )
-        .where(QuestionLog.created_at >= start_date)
-        .where(QuestionLog.normalized_question.isnot(None))
-        .group_by(QuestionLog.normalized_question, QuestionLog.question)
-        .order_by(desc('count'))
-        .limit(20)
-    )
-    
+    # Top questions (by cluster, from the daily rollup)
+    clusters = await QuestionClusteringService(db).get_top_clusters(start_date, limit=20)
     top_questions = [
         {
-            "question": row.question,
-            "normalized_question": row.normalized_question,
-            "count": row.count,
-            "first_asked": row.first_asked.isoformat() if row.first_asked else None,
-            "last_asked": row.last_asked.isoformat() if row.last_asked else None
+            "cluster_id": row["cluster_id"],
+            "question": row["question"],
+            "normalized_question": row["normalized_question"],
+            "count": row["count"],
+            "first_asked": row["first_asked"].isoformat() if row["first_asked"] else None,
+            "last_asked": row["last_asked"].isoformat() if row["last_asked"] else None
         }
-        for row in result.all()
+        for row in clusters
     ]
     
+    if not top_questions:
+        # Nothing clustered yet - fall back to grouping the raw text
+        result = await db.execute(
+            select(
+                QuestionLog.normalized_question,
+                QuestionLog.question,
+                func.count(QuestionLog.id).label('count'),
+                func.min(QuestionLog.created_at).label('first_asked'),
+                func.max(QuestionLog.created_at).label('last_asked')
+            )
+            .where(QuestionLog.created_at >= start_date)
+            .where(QuestionLog.normalized_question.isnot(None))
+            .group_by(QuestionLog.normalized_question, QuestionLog.question)
+            .order_by(desc('count'))
+            .limit(20)
+        )
+        
+        top_questions = [
+            {
+                "question": row.question,
+                "normalized_question": row.normalized_question,
+                "count": row.count,
+                "first_asked": row.first_asked.isoformat() if row.first_asked else None,
+                "last_asked": row.last_asked.isoformat() if row.last_asked else None
+            }
+            for row in result.all()
+        ]
+    
     # By category
     result = await db.execute(
         select(
@@ -910,53 +997,75 @@ async def export_question_logs(
     """Export question logs for insights and content development."""
     start_date = datetime.now(timezone.utc) - timedelta(days=period_days)
     
-    # Get aggregated questions (by normalized question)
-    result = await db.execute(
-        select(
-            QuestionLog.normalized_question,
-            QuestionLog.question,
-            QuestionLog.category,
-            QuestionLog.context_type,
-            QuestionLog.user_tier,
-            func.count(QuestionLog.id).label('count'),
-            func.min(QuestionLog.created_at).label('first_asked'),
-            func.max(QuestionLog.created_at).label('last_asked'),
-            func.min(QuestionLog.id).label('sample_id')
-        )
-        .where(QuestionLog.created_at >= start_date)
-        .group_by(
-            QuestionLog.normalized_question,
-            QuestionLog.question,
-            QuestionLog.category,
-            QuestionLog.context_type,
-            QuestionLog.user_tier
+    # Aggregated questions by cluster, described by each cluster's representative log
+    exports = [
+        QuestionExport(
+            id=row["sample_id"] or 0,
+            cluster_id=row["cluster_id"],
+            question=row["question"] or row["normalized_question"] or "",
+            normalized_question=row["normalized_question"],
+            category=row["category"],
+            context_type=row["context_type"],
+            user_id=row["user_id"] or 0,
+            user_tier=row["user_tier"],
+            count=row["count"],
+            first_asked=row["first_asked"] or datetime.now(timezone.utc),
+            last_asked=row["last_asked"] or datetime.now(timezone.utc)
         )
-        .order_by(desc('count'))
-    )
+        for row in await QuestionClusteringService(db).get_top_clusters(start_date)
+    ]
     
-    exports = []
-    for row in result.all():
-        # Get a sample user_id from one of the logs
-        sample_result = await db.execute(
-            select(QuestionLog.user_id)
-            .where(QuestionLog.id == row.sample_id)
+    if not exports:
+        # Nothing clustered yet - fall back to grouping the raw text
+        result = await db.execute(
+            select(
+                QuestionLog.normalized_question,
+                QuestionLog.question,
+                QuestionLog.category,
+                QuestionLog.context_type,
+                QuestionLog.user_tier,
+                func.count(QuestionLog.id).label('count'),
+                func.min(QuestionLog.created_at).label('first_asked'),
+                func.max(QuestionLog.created_at).label('last_asked'),
+                func.min(QuestionLog.id).label('sample_id')
+            )
+            .where(QuestionLog.created_at >= start_date)
+            .group_by(
+                QuestionLog.normalized_question,
+                QuestionLog.question,
+                QuestionLog.category,
+                QuestionLog.context_type,
+                QuestionLog.user_tier
+            )
+            .order_by(desc('count'))
         )
-        sample_user_id = sample_result.scalar()
+        rows = result.all()
         
-        exports.append(
+        # Sample user_ids in one query rather than one per row
+        sample_ids = [row.sample_id for row in rows if row.sample_id]
+        sample_users = {}
+        if sample_ids:
+            users_result = await db.execute(
+                select(QuestionLog.id, QuestionLog.user_id)
+                .where(QuestionLog.id.in_(sample_ids))
+            )
+            sample_users = {row.id: row.user_id for row in users_result.all()}
+        
+        exports = [
             QuestionExport(
                 id=row.sample_id or 0,
                 question=row.question or row.normalized_question or "",
                 normalized_question=row.normalized_question,
                 category=row.category,
                 context_type=row.context_type,
-                user_id=sample_user_id or 0,
+                user_id=sample_users.get(row.sample_id) or 0,
                 user_tier=row.user_tier,
                 count=row.count,
                 first_asked=row.first_asked or datetime.now(timezone.utc),
                 last_asked=row.last_asked or datetime.now(timezone.utc)
             )
-        )
+            for row in rows
+        ]
     
     # If CSV format requested, return as CSV string
     if export_format == "csv":
@@ -965,13 +1074,14 @@ async def export_question_logs(
         
         output = StringIO()
         writer = csv.DictWriter(output, fieldnames=[
-            "question", "normalized_question", "category", "context_type",
+            "cluster_id", "question", "normalized_question", "category", "context_type",
             "user_tier", "count", "first_asked", "last_asked"
         ])
         writer.writeheader()
         
         for item in exports:
             writer.writerow({
+                "cluster_id": item.cluster_id or "",
                 "question": item.question,
                 "normalized_question": item.normalized_question or "",
                 "category": item.category or "",
@@ -987,6 +1097,15 @@ async def export_question_logs(
     return exports
 
 
+@router.post("/logs/questions/cluster")
+async def cluster_questions(
+    recluster: bool = Query(False, description="Also refine centroids and merge near-duplicate clusters"),
+    admin: dict = Depends(get_current_admin)
+):
+    """Run the question clustering job now instead of waiting for the next interval."""
+    return await run_question_clustering(force_recluster=recluster)
+
+
 @router.get("/logs/stats", response_model=LoggingStatsResponse)
 async def get_all_logging_stats(
     period_days: int = Query(30, ge=1, le=365),
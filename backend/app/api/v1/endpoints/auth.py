@@ -39,7 +39,6 @@ from app.dependencies import get_current_user
 from app.schemas.auth import SSORequest, UserProfile
 from app.core.config import settings
 from app.utils import create_user_tokens
-import httpx
 import logging
 import secrets
 from datetime import datetime, timezone
@@ -367,18 +366,16 @@ async def sso_login(
     user_data = None
     if settings.MEMBERSHIP_PLATFORM_API_URL and settings.MEMBERSHIP_PLATFORM_API_KEY:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{settings.MEMBERSHIP_PLATFORM_API_URL}/verify-token",
-                    json={"token": sso_request.platform_token},
-                    headers={"Authorization": f"Bearer {settings.MEMBERSHIP_PLATFORM_API_KEY}"},
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    user_data = response.json()
-                else:
-                    logger.warning(f"Platform token verification failed: {response.status_code}")
+            response = await membership_service.http_client.post(
+                f"{settings.MEMBERSHIP_PLATFORM_API_URL}/verify-token",
+                json={"token": sso_request.platform_token},
+                headers={"Authorization": f"Bearer {settings.MEMBERSHIP_PLATFORM_API_KEY}"}
+            )
+            
+            if response.status_code == 200:
+                user_data = response.json()
+            else:
+                logger.warning(f"Platform token verification failed: {response.status_code}")
         except Exception as e:
             logger.error(f"Failed to verify platform token: {e}")
     
@@ -7,14 +7,18 @@ Provides:
 - WebSocket endpoint for real-time bidirectional chat
 - Chat history management
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect
+from fastapi import (
+    APIRouter, Depends, HTTPException, status, Query, Path, Header, Request, WebSocket, WebSocketDisconnect,
+)
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import aclosing
 from typing import List, Optional
-import json
+import asyncio
 import logging
+import time
 
-from app.db.database import get_db
+from app.db.database import AsyncSessionLocal, get_db
 from app.schemas.chat import (
     ChatRequest,
     ChatResponse,
@@ -26,8 +30,21 @@ from app.schemas.chat import (
 )
 from app.services.chat_service import ChatService
 from app.services.usage_service import UsageService
-from app.core.exceptions import UsageLimitExceededError, to_http_exception
-from app.core.constants import CHAT_HISTORY_DEFAULT_LIMIT, CHAT_HISTORY_MAX_LIMIT
+from app.core.exceptions import ServerBusyError, UsageLimitExceededError, to_http_exception
+from app.core.config import settings
+from app.core.constants import (
+    CHAT_HISTORY_DEFAULT_LIMIT,
+    CHAT_HISTORY_MAX_LIMIT,
+    IDEMPOTENCY_KEY_MAX_LENGTH,
+    SSE_HEARTBEAT_INTERVAL,
+)
+from app.core.background import run_in_background
+from app.core.chat_events import ChatEvent, ChatEventType
+from app.core.idempotency import IdempotencyRecord, replay_events, request_fingerprint
+from app.core.llm_scheduler import llm_scheduler
+from app.core.resumable_stream import ResumableStream
+from app.core.security import decode_access_token
+from app.core.sse import with_heartbeat
 from app.api.v1.decorators import handle_service_errors, validate_input
 from app.dependencies import get_current_user
 from app.utils import (
@@ -47,14 +64,31 @@ logger = logging.getLogger(__name__)
 async def send_message(
     request: ChatRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(check_usage_limit_dependency)
+    current_user: dict = Depends(check_usage_limit_dependency),
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
     """
     Send a chat message and get AI response.
     
     The message is processed through the RAG pipeline with context
-    from the knowledge base.
+    from the knowledge base. Usage is recorded with the saved message.
+    Responds 429 (with Retry-After) when the turn would wait longer than
+    LLM_QUEUE_MAX_WAIT_SECONDS for the LLM.
+    
+    With an `Idempotency-Key` header, a retry of the same message gets the
+    first request's response (waiting for it if it is still running)
+    instead of a new turn; the same key with a different message is
+    rejected with 422.
     """
+    record = IdempotencyRecord(current_user["user_id"], "chat", idempotency_key) if idempotency_key else None
+    if record is not None:
+        stored = await record.resolve(
+            request_fingerprint(request.message, request.conversation_id, request.include_sources),
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+        )
+        if stored is not None:
+            return ChatResponse(**stored["response"])
+    
     # Sanitize input (validation handled by @validate_input decorator)
     sanitized_message = sanitize_user_input(request.message)
     
@@ -63,30 +97,97 @@ async def send_message(
     
     # Process message (conversation_id = session: omit for new chat, send for continuing)
     chat_service = ChatService(db)
-    response = await chat_service.process_message(
-        user_id=current_user["user_id"],
-        message=sanitized_message,
-        conversation_history=history,
-        include_sources=request.include_sources,
-        user_tier=current_user["tier"],
-        conversation_id=request.conversation_id,
+    try:
+        response = await chat_service.process_message(
+            user_id=current_user["user_id"],
+            message=sanitized_message,
+            conversation_history=history,
+            include_sources=request.include_sources,
+            user_tier=current_user["tier"],
+            conversation_id=request.conversation_id,
+        )
+    except Exception:
+        if record is not None:
+            await record.release()
+        raise
+    if record is not None:
+        if response.message_id is not None:
+            await record.complete(response.model_dump(mode="json"))
+        else:
+            await record.release()  # A fallback reply: nothing was saved, a retry may run again
+    return response
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable nginx buffering
+}
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """Return once the client has disconnected (the request body was already read)."""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _generate_into_stream(
+    stream: ResumableStream,
+    record: Optional[IdempotencyRecord] = None,
+    **kwargs
+) -> None:
+    """Producer of a resumable answer: runs the chat turn with its own session."""
+    async with AsyncSessionLocal() as db:
+        events = ChatService(db).process_message_stream(**kwargs)
+        if record is not None:
+            events = record.track(events)
+        await stream.publish(events)
+
+
+async def _start_resumable_stream(
+    record: Optional[IdempotencyRecord] = None,
+    **kwargs
+) -> Optional[ResumableStream]:
+    """Start generating an answer into Redis (None if Redis is unavailable)."""
+    try:
+        stream = await ResumableStream.create(kwargs["user_id"])
+    except Exception as e:
+        logger.warning(f"Resumable stream unavailable, streaming directly: {e}")
+        return None
+    if record is not None:
+        await record.set_stream(stream.stream_id)
+    run_in_background(
+        "chat-stream",
+        _generate_into_stream(stream, record, **kwargs),
+        key=("chat-stream", stream.stream_id),
     )
+    return stream
+
+
+def _replay_stream(stored: dict, http_request: Request) -> StreamingResponse:
+    """Answer a retried stream request: the original's live stream, or its stored events."""
+    if "response" in stored:
+        async def frames():
+            for event in replay_events(stored):
+                yield event.to_sse()
+        
+        return StreamingResponse(frames(), media_type="text/event-stream", headers=SSE_HEADERS)
     
-    # Track usage
-    usage_service = UsageService(db)
-    await usage_service.record_usage(
-        user_id=current_user["user_id"],
-        tokens_used=response.tokens_used
+    stream = ResumableStream(stored["stream_id"])
+    return StreamingResponse(
+        with_heartbeat(stream.frames(), SSE_HEARTBEAT_INTERVAL, until=_wait_for_disconnect(http_request)),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Stream-ID": stream.stream_id},
     )
-    
-    return response
 
 
 @router.post("/stream")
 async def send_message_stream(
     request: ChatRequest,
+    http_request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(check_usage_limit_dependency)
+    current_user: dict = Depends(check_usage_limit_dependency),
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
     """
     Send a chat message and get streaming AI response via Server-Sent Events.
@@ -94,10 +195,35 @@ async def send_message_stream(
     Returns a stream of SSE events:
     - `start`: Initial event with context type
     - `chunk`: Text chunks as they arrive from the AI
+    - `reset`: Discard the text received so far; the response is being
+      regenerated because it contained a banned word
     - `sources`: Knowledge base sources used (if requested)
     - `done`: Final event with message ID and token count
     - `error`: Error event if something goes wrong
     
+    Responds 429 (with Retry-After) instead of streaming when the LLM
+    queue is too long for the turn to start within LLM_QUEUE_MAX_WAIT_SECONDS.
+    
+    Small text deltas are coalesced into fewer `chunk` events, and a
+    `: ping` comment is sent after SSE_HEARTBEAT_INTERVAL seconds without
+    output so proxies keep the connection open.
+    
+    The answer is generated into a Redis buffer (RESUMABLE_STREAMS_ENABLED)
+    and each event carries a sequence number as its SSE `id`. After a
+    dropped connection, `GET /chat/stream/{stream_id}` (the id is in the
+    `X-Stream-ID` header) with `Last-Event-ID` replays the missed events
+    and follows the live answer, on any worker.
+    
+    When no client has been reading for STREAM_RESUME_GRACE_SECONDS (or
+    at once, without the buffer) the upstream completion is cancelled;
+    the partial answer is saved as truncated, counting only the tokens
+    generated.
+    
+    With an `Idempotency-Key` header, a retry of the same message follows
+    the first request's answer (from its first event) while it is being
+    generated, or gets it replayed as one `chunk` once it is done, instead
+    of starting a new turn.
+    
     Example client usage:
     ```javascript
     const eventSource = new EventSource('/api/v1/chat/stream?...');
@@ -105,40 +231,95 @@ async def send_message_stream(
         const data = JSON.parse(e.data);
         appendToResponse(data.content);
     });
+    eventSource.addEventListener('reset', () => clearResponse());
     ```
     """
+    record = IdempotencyRecord(current_user["user_id"], "chat_stream", idempotency_key) if idempotency_key else None
+    if record is not None:
+        stored = await record.resolve(
+            request_fingerprint(request.message, request.conversation_id, request.include_sources),
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            stream=True,
+        )
+        if stored is not None:
+            return _replay_stream(stored, http_request)
+    
+    # Shed with a 429 before streaming starts when the completion queue is too long
+    try:
+        llm_scheduler.check(current_user["user_id"], current_user["tier"])
+    except ServerBusyError:
+        if record is not None:
+            await record.release()
+        raise
+    
     # Convert conversation history
     history = convert_conversation_history(request.conversation_history)
+    turn = dict(
+        user_id=current_user["user_id"],
+        message=request.message,
+        conversation_history=history,
+        include_sources=request.include_sources,
+        user_tier=current_user["tier"],
+        conversation_id=request.conversation_id
+    )
+    
+    stream = await _start_resumable_stream(record, **turn) if settings.RESUMABLE_STREAMS_ENABLED else None
+    if stream is not None:
+        return StreamingResponse(
+            with_heartbeat(stream.frames(), SSE_HEARTBEAT_INTERVAL, until=_wait_for_disconnect(http_request)),
+            media_type="text/event-stream",
+            headers={**SSE_HEADERS, "X-Stream-ID": stream.stream_id},
+        )
     
     # Create streaming response
     chat_service = ChatService(db)
     
     async def generate():
         """Generate SSE events from the chat stream."""
-        async for event in chat_service.process_message_stream(
-            user_id=current_user["user_id"],
-            message=request.message,
-            conversation_history=history,
-            include_sources=request.include_sources,
-            user_tier=current_user["tier"]
-        ):
-            yield event
-        
-        # Record usage after streaming completes
-        # Note: Actual token count tracked in the service
-        await usage_service.record_usage(
-            user_id=current_user["user_id"],
-            tokens_used=0  # Will be updated from stored message
-        )
+        events = chat_service.process_message_stream(**turn)
+        if record is not None:
+            events = record.track(events)
+        # Closed explicitly, so an early stop reaches the upstream stream at once
+        async with aclosing(events):
+            async for event in events:
+                yield event.to_sse()
     
     return StreamingResponse(
-        generate(),
+        with_heartbeat(generate(), SSE_HEARTBEAT_INTERVAL, until=_wait_for_disconnect(http_request)),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",  # Disable nginx buffering
-        }
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/stream/{stream_id}")
+async def resume_message_stream(
+    http_request: Request,
+    stream_id: str = Path(..., pattern="^[0-9a-f]{32}$"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Resume a streamed answer after a dropped connection.
+    
+    Replays the events after `Last-Event-ID` (none: from the start), then
+    follows the answer live until its `done` or `error` event. Nothing is
+    generated or counted again. Ends with an `error` event if the missed
+    events are no longer available.
+    """
+    stream = ResumableStream(stream_id)
+    try:
+        owner = await stream.owner()
+    except Exception as e:
+        logger.warning(f"Could not look up stream {stream_id}: {e}")
+        owner = None
+    if owner is None or owner != current_user["user_id"]:
+        raise HTTPException(status_code=404, detail="Stream not found or expired")
+    
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(
+        with_heartbeat(stream.frames(after), SSE_HEARTBEAT_INTERVAL, until=_wait_for_disconnect(http_request)),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Stream-ID": stream_id},
     )
 
 
@@ -241,8 +422,37 @@ async def clear_chat_history(
 # WebSocket Endpoint for Real-Time Chat
 # =============================================================================
 
+def _ws_error(data: dict) -> str:
+    return ChatEvent(ChatEventType.ERROR, data).to_ws()
+
+
+async def _stream_turn(websocket: WebSocket, user_id: int, user_tier: str, data: dict) -> None:
+    """Run one chat turn with its own database session, sending events as they come."""
+    async with AsyncSessionLocal() as db:
+        # Check usage limits
+        try:
+            await UsageService(db).check_usage_limit(user_id, user_tier)
+        except UsageLimitExceededError as e:
+            await websocket.send_text(_ws_error(e.to_dict()))
+            return
+        
+        events = ChatService(db).process_message_stream(
+            user_id=user_id,
+            message=data["content"],
+            # Note: conversation_history from WebSocket is already in dict format
+            conversation_history=data.get("conversation_history", []),
+            include_sources=data.get("include_sources", False),
+            user_tier=user_tier,
+            conversation_id=data.get("conversation_id")
+        )
+        # Events are encoded once, straight to WebSocket messages
+        async with aclosing(events):
+            async for event in events:
+                await websocket.send_text(event.to_ws())
+
+
 @router.websocket("/ws")
-async def websocket_chat(websocket: WebSocket):
+async def websocket_chat(websocket: WebSocket, token: Optional[str] = Query(None)):
     """
     WebSocket endpoint for real-time bidirectional chat.
     
@@ -251,20 +461,37 @@ async def websocket_chat(websocket: WebSocket):
     - Streaming AI responses
     - Connection management
     
+    The connection is authenticated once, from the `token` query parameter
+    or the first message that carries a token; later messages can omit it
+    (a different token, e.g. after a refresh, re-authenticates). Each
+    message then runs as one turn with its own database session.
+    
+    The socket keeps being read while a response streams: a disconnect or
+    a `cancel` message stops the upstream completion at once, and the
+    partial answer is saved as truncated.
+    
     Message Format (Client → Server):
     ```json
     {
         "type": "message",
         "content": "user message text",
         "token": "jwt_access_token",
+        "conversation_id": 123,
         "conversation_history": [...]
     }
     ```
     
+    A message of type `auth` with just a `token` authenticates without
+    sending anything to the model; `cancel` stops the response streaming.
+    
+    With conversation_id the server loads the thread's history itself and
+    conversation_history can be omitted; the `done` event returns the
+    conversation_id to send with the next message.
+    
     Message Format (Server → Client):
     ```json
     {
-        "type": "start" | "chunk" | "sources" | "done" | "error",
+        "type": "start" | "chunk" | "reset" | "sources" | "done" | "error",
         "data": {...}
     }
     ```
@@ -272,132 +499,79 @@ async def websocket_chat(websocket: WebSocket):
     await websocket.accept()
     logger.info("WebSocket connection established")
     
+    auth_token = None
     user_id = None
     user_tier = None
+    token_expires: Optional[float] = None
+    turn: Optional[asyncio.Task] = None
+    receiver: Optional[asyncio.Task] = None
+    
+    def authenticate(new_token: str) -> bool:
+        nonlocal auth_token, user_id, user_tier, token_expires
+        payload = decode_access_token(new_token)
+        if not payload:
+            return False
+        auth_token = new_token
+        user_id = payload.get("user_id")
+        user_tier = payload.get("tier", "basic")
+        token_expires = payload.get("exp")
+        return True
+    
+    def token_expired() -> bool:
+        """Whether the connection's token has expired since it was decoded."""
+        return token_expires is not None and time.time() >= token_expires
     
     try:
+        if token and not authenticate(token):
+            await websocket.send_text(_ws_error({"message": "Invalid or expired token"}))
+        
         while True:
-            # Receive message from client
-            data = await websocket.receive_json()
+            # Receive message from client (also while a turn is streaming)
+            if receiver is None:
+                receiver = asyncio.ensure_future(websocket.receive_json())
+            if turn is not None:
+                await asyncio.wait({receiver, turn}, return_when=asyncio.FIRST_COMPLETED)
+                if turn.done():
+                    finished, turn = turn, None
+                    if not finished.cancelled() and finished.exception():
+                        raise finished.exception()
+                if not receiver.done():
+                    continue
+            data = await receiver
+            receiver = None
             message_type = data.get("type")
             
-            if message_type == "message":
-                # Extract token and verify user
-                token = data.get("token")
-                if not token:
-                    await websocket.send_json({
-                        "type": "error",
-                        "data": {"message": "Authentication required"}
-                    })
+            if message_type in ("message", "auth"):
+                # Authenticate once per connection; only a new token is decoded again
+                message_token = data.get("token")
+                if message_token and message_token != auth_token and not authenticate(message_token):
+                    await websocket.send_text(_ws_error({"message": "Invalid or expired token"}))
                     continue
-                
-                # Verify token and get user
-                from app.core.security import decode_access_token
-                from app.db.database import get_db
-                
-                payload = decode_access_token(token)
-                if not payload:
-                    await websocket.send_json({
-                        "type": "error",
-                        "data": {"message": "Invalid or expired token"}
-                    })
+                if user_id is not None and token_expired():
+                    # Checked on every message: the socket may outlive the token
+                    auth_token = user_id = None
+                    await websocket.send_text(_ws_error({"message": "Invalid or expired token"}))
+                    continue
+                if user_id is None:
+                    await websocket.send_text(_ws_error({"message": "Authentication required"}))
+                    continue
+                if message_type == "auth":
                     continue
                 
-                user_id = payload.get("user_id")
-                user_tier = payload.get("tier", "basic")
-                
-                # Get database session
-                from app.db.database import AsyncSessionLocal
-                async with AsyncSessionLocal() as db:
-                    # Initialize services
-                    chat_service = ChatService(db)
-                    usage_service = UsageService(db)
-                    
-                    # Check usage limits
-                    try:
-                        await usage_service.check_usage_limit(user_id, user_tier)
-                    except UsageLimitExceededError as e:
-                        await websocket.send_json({
-                            "type": "error",
-                            "data": e.to_dict()
-                        })
-                        continue
-                    
-                    # Get message content
-                    message_content = data.get("content", "")
-                    # Note: conversation_history from WebSocket is already in dict format
-                    conversation_history = data.get("conversation_history", [])
-                    include_sources = data.get("include_sources", False)
-                    
-                    if not message_content:
-                        await websocket.send_json({
-                            "type": "error",
-                            "data": {"message": "Message content is required"}
-                        })
-                        continue
-                    
-                    # Send start event
-                    await websocket.send_json({
-                        "type": "start",
-                        "data": {
-                            "message": "Processing your message...",
-                            "context_type": "processing"
-                        }
-                    })
-                    
-                    # Process message with streaming
-                    full_response = ""
-                    sources = []
-                    
-                    async for event in chat_service.process_message_stream(
-                        user_id=user_id,
-                        message=message_content,
-                        conversation_history=conversation_history,
-                        include_sources=include_sources,
-                        user_tier=user_tier
-                    ):
-                        # Parse SSE event and send as WebSocket message
-                        if event.startswith("event: "):
-                            lines = event.strip().split("\n")
-                            event_type = None
-                            event_data = None
-                            
-                            for line in lines:
-                                if line.startswith("event: "):
-                                    event_type = line[7:]
-                                elif line.startswith("data: "):
-                                    event_data = json.loads(line[6:])
-                            
-                            if event_type and event_data:
-                                # Send chunk events in real-time
-                                if event_type == "chunk":
-                                    full_response += event_data.get("content", "")
-                                    await websocket.send_json({
-                                        "type": "chunk",
-                                        "data": event_data
-                                    })
-                                elif event_type == "sources":
-                                    sources = event_data.get("sources", [])
-                                    await websocket.send_json({
-                                        "type": "sources",
-                                        "data": event_data
-                                    })
-                                elif event_type == "done":
-                                    # Record usage
-                                    await usage_service.record_usage(
-                                        user_id=user_id,
-                                        tokens_used=event_data.get("tokens_used", 0)
-                                    )
-                                    await websocket.send_json({
-                                        "type": "done",
-                                        "data": event_data
-                                    })
-                                elif event_type == "error":
-                                    await websocket.send_json({
-                                        "type": "error",
-                                        "data": event_data
-                                    })
+                if not data.get("content"):
+                    await websocket.send_text(_ws_error({"message": "Message content is required"}))
+                    continue
+                if turn is not None:
+                    await websocket.send_text(_ws_error({"message": "A response is still streaming"}))
+                    continue
                 
+                turn = asyncio.create_task(_stream_turn(websocket, user_id, user_tier, data))
+            
+            elif message_type == "cancel":
+                # Stop button: cancelling the turn stops generation upstream
+                if turn is not None:
+                    turn.cancel()
+            
             elif message_type == "ping":
                 # Heartbeat/ping
                 await websocket.send_json({"type": "pong"})
@@ -407,23 +581,23 @@ async def websocket_chat(websocket: WebSocket):
                 break
             
             else:
-                await websocket.send_json({
-                    "type": "error",
-                    "data": {"message": f"Unknown message type: {message_type}"}
-                })
+                await websocket.send_text(_ws_error({"message": f"Unknown message type: {message_type}"}))
     
     except WebSocketDisconnect:
         logger.info("WebSocket client disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         try:
-            await websocket.send_json({
-                "type": "error",
-                "data": {"message": "An error occurred processing your message"}
-            })
+            await websocket.send_text(_ws_error({"message": "An error occurred processing your message"}))
         except Exception:
             pass
     finally:
+        # A turn still streaming is cancelled, which saves its partial answer
+        for task in (turn, receiver):
+            if task is not None and not task.done():
+                task.cancel()
+        if turn is not None:
+            await asyncio.gather(turn, return_exceptions=True)
         try:
             await websocket.close()
         except Exception:
@@ -57,6 +57,7 @@ from app.core.exceptions import (
     TayAIError,
     NotFoundError,
     AlreadyExistsError,
+    IdempotencyConflictError,
     ValidationError,
     AuthenticationError,
     InvalidCredentialsError,
@@ -68,6 +69,8 @@ from app.core.exceptions import (
     UsageLimitExceededError,
     ExternalServiceError,
     OpenAIError,
+    CircuitOpenError,
+    ServerBusyError,
     RedisError,
     to_http_exception,
 )
@@ -119,6 +122,8 @@ from app.core.query_helpers import (
     QueryBuilder,
     get_paginated_results,
     count_records,
+    trigger_exists,
+    estimate_row_count,
 )
 
 __all__ = [
@@ -153,6 +158,7 @@ __all__ = [
     "TayAIError",
     "NotFoundError",
     "AlreadyExistsError",
+    "IdempotencyConflictError",
     "ValidationError",
     "AuthenticationError",
     "InvalidCredentialsError",
@@ -164,6 +170,8 @@ __all__ = [
     "UsageLimitExceededError",
     "ExternalServiceError",
     "OpenAIError",
+    "CircuitOpenError",
+    "ServerBusyError",
     "RedisError",
     "to_http_exception",
     # Constants
@@ -204,4 +212,6 @@ __all__ = [
     "QueryBuilder",
     "get_paginated_results",
     "count_records",
+    "trigger_exists",
+    "estimate_row_count",
 ]
@@ -0,0 +1,137 @@
+"""
+Background Tasks
+
+Periodic in-process jobs started and stopped by the application lifespan,
+and one-off jobs started off the request path.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Coroutine, Dict, Hashable, List, Optional
+
+from app.core.constants import BACKGROUND_JOBS_DRAIN_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Run an async job every interval_seconds until stopped.
+    
+    Failures are logged and the loop continues; a run that overlaps the next
+    tick simply delays it.
+    
+    Usage:
+        task = PeriodicTask("question-clustering", run_clustering, 600)
+        task.start()
+        ...
+        await task.stop()
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        job: Callable[[], Awaitable[None]],
+        interval_seconds: float,
+        initial_delay: float = 0.0
+    ):
+        self.name = name
+        self.job = job
+        self.interval_seconds = interval_seconds
+        self.initial_delay = initial_delay
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=self.name)
+            logger.info(f"Started background task '{self.name}' (every {self.interval_seconds}s)")
+    
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Stopped background task '{self.name}'")
+    
+    async def _run(self) -> None:
+        if self.initial_delay:
+            await asyncio.sleep(self.initial_delay)
+        while True:
+            try:
+                await self.job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Background task '{self.name}' failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+# Tasks registered by the lifespan, stopped together on shutdown
+_tasks: List[PeriodicTask] = []
+
+
+def start_periodic_task(
+    name: str,
+    job: Callable[[], Awaitable[None]],
+    interval_seconds: float,
+    initial_delay: float = 0.0
+) -> PeriodicTask:
+    """Create, start and register a periodic task."""
+    task = PeriodicTask(name, job, interval_seconds, initial_delay)
+    task.start()
+    _tasks.append(task)
+    return task
+
+
+# One-off jobs still running, by key
+_jobs: Dict[Hashable, asyncio.Task] = {}
+
+
+def run_in_background(name: str, job: Coroutine, key: Optional[Hashable] = None) -> bool:
+    """
+    Run a one-off async job without awaiting it.
+    
+    While a job with the same key is running, another is not started (its
+    coroutine is closed unrun). Failures are logged.
+    
+    Returns:
+        Whether the job was started
+    """
+    if key is not None and key in _jobs:
+        job.close()
+        return False
+    task = asyncio.create_task(_run_job(name, job), name=name)
+    key = key if key is not None else task
+    _jobs[key] = task
+    task.add_done_callback(lambda _: _jobs.pop(key, None))
+    return True
+
+
+async def _run_job(name: str, job: Coroutine) -> None:
+    try:
+        await job
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Background job '{name}' failed: {e}")
+
+
+async def stop_background_tasks(drain_timeout: float = BACKGROUND_JOBS_DRAIN_TIMEOUT) -> None:
+    """
+    Stop every registered periodic task, then let running one-off jobs
+    finish for up to drain_timeout seconds and cancel those still running.
+    """
+    while _tasks:
+        await _tasks.pop().stop()
+    jobs = list(_jobs.values())
+    if not jobs:
+        return
+    _, pending = await asyncio.wait(jobs, timeout=drain_timeout)
+    if pending:
+        logger.warning(f"Cancelling {len(pending)} background job(s) still running at shutdown")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
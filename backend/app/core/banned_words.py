@@ -0,0 +1,103 @@
+"""
+Banned Word Enforcement
+
+Detects persona-banned words in model output, either on a complete
+response or incrementally while it streams, so a streamed generation can
+be aborted as soon as a banned word appears.
+
+Usage:
+    scanner = BannedWordScanner()
+    for chunk in stream:
+        if scanner.feed(chunk):
+            ...  # abort and regenerate
+    found = scanner.finish()
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+
+from app.core.constants import BANNED_WORDS, CONTEXTUAL_WORDS
+
+
+def find_banned_words(
+    text: str,
+    banned_words: Sequence[str] = BANNED_WORDS,
+    contextual_words: Dict[str, List[str]] = CONTEXTUAL_WORDS
+) -> List[str]:
+    """
+    Check a complete text for banned words.
+    
+    Matching is case-insensitive substring matching. A word listed in
+    contextual_words is allowed if any of its context phrases also
+    appears in the text.
+    
+    Returns:
+        List of banned words found
+    """
+    text_lower = text.lower()
+    found = []
+    
+    for word in banned_words:
+        if word.lower() in text_lower:
+            # Check contextual exceptions
+            allowed_contexts = contextual_words.get(word.lower())
+            if allowed_contexts and any(ctx in text_lower for ctx in allowed_contexts):
+                continue  # Allowed in this context
+            found.append(word)
+    
+    return found
+
+
+class BannedWordScanner:
+    """
+    Incremental banned-word matcher for streamed output.
+    
+    Each chunk is searched together with the lowercase tail of the text
+    before it (one character shorter than the longest banned word), so a
+    word split across chunk boundaries is still found. Words with
+    contextual exceptions can only be judged on the full text; feed()
+    skips them and finish() runs the complete check.
+    """
+    
+    def __init__(
+        self,
+        banned_words: Sequence[str] = BANNED_WORDS,
+        contextual_words: Dict[str, List[str]] = CONTEXTUAL_WORDS
+    ):
+        self.banned_words = banned_words
+        self.contextual_words = contextual_words
+        
+        immediate = sorted(
+            (w.lower() for w in banned_words if w.lower() not in contextual_words),
+            key=len,
+            reverse=True  # Prefer "transformation" over "transform"
+        )
+        self._words = {w.lower(): w for w in banned_words}
+        self._pattern = re.compile("|".join(map(re.escape, immediate))) if immediate else None
+        self._tail_length = max((len(w) for w in immediate), default=1) - 1
+        self._tail = ""
+        self._parts: List[str] = []
+    
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._parts)
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Add a chunk of output.
+        
+        Returns:
+            The first banned word completed by this chunk, or None
+        """
+        self._parts.append(chunk)
+        if self._pattern is None:
+            return None
+        
+        window = self._tail + chunk.lower()
+        self._tail = window[-self._tail_length:] if self._tail_length else ""
+        match = self._pattern.search(window)
+        return self._words[match.group(0)] if match else None
+    
+    def finish(self) -> List[str]:
+        """Full check of the complete text, including contextual words."""
+        return find_banned_words(self.text, self.banned_words, self.contextual_words)
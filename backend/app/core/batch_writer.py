@@ -0,0 +1,167 @@
+"""
+Batch Writer
+
+Buffers rows for one table in memory and inserts them in batches, so
+high-volume log writes cost one multi-row INSERT per batch instead of a
+transaction per row.
+
+Usage:
+    writer = BatchWriter("question-log", QuestionLog.__table__, batch_size=100,
+                         flush_interval=2.0, max_queue=10000)
+    writer.start()
+    writer.add({"user_id": 1, "question": "..."})
+    ...
+    await writer.stop()  # flushes what is still buffered
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Table, insert
+
+from app.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """
+    Bounded in-process buffer flushed on size or time.
+    
+    A worker task inserts a batch once batch_size rows are waiting or
+    flush_interval seconds after the first row of the batch arrived. When
+    the queue is full, new rows are dropped (and counted) rather than
+    slowing down the request that produced them. Every row of a batch
+    must have the same keys.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        table: Table,
+        batch_size: int,
+        flush_interval: float,
+        max_queue: int
+    ):
+        self.name = name
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        self._batch: List[Dict[str, Any]] = []
+        self._stopped = False
+        
+        # Metrics
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.dropped_rows = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+    
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopped = False
+            self._task = asyncio.create_task(self._run(), name=self.name)
+            logger.info(
+                f"Started batch writer '{self.name}' "
+                f"(batch {self.batch_size}, every {self.flush_interval}s)"
+            )
+    
+    def add(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue a row for insertion (starting the worker if needed).
+        
+        Returns:
+            False if the row was dropped (queue full or writer stopped)
+        """
+        if self._stopped:
+            self.dropped_rows += 1
+            return False
+        if self._task is None:
+            self.start()
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self.dropped_rows += 1
+            if self.dropped_rows % 100 == 1:
+                logger.warning(f"Batch writer '{self.name}' queue full; {self.dropped_rows} rows dropped")
+            return False
+    
+    async def stop(self) -> None:
+        """Stop the worker and insert every row still buffered."""
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+        
+        rows, self._batch = self._batch, []
+        while not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        for i in range(0, len(rows), self.batch_size):
+            await self._flush(rows[i:i + self.batch_size])
+        logger.info(f"Stopped batch writer '{self.name}' ({len(rows)} rows flushed on stop)")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "dropped_rows": self.dropped_rows,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            batch, self._batch = self._batch, []
+            # Shielded: a stop during the insert waits for it instead of losing the batch
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+            self._flushing = None
+    
+    async def _flush(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        start = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(insert(self.table).values(rows))
+                await session.commit()
+        except Exception as e:
+            self.failed_rows += len(rows)
+            logger.error(f"Batch writer '{self.name}' failed to insert {len(rows)} rows: {e}")
+            return
+        
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.flushes += 1
+        self.flushed_rows += len(rows)
+        self.last_flush_ms = elapsed_ms
+        self.total_flush_ms += elapsed_ms
+        logger.debug(f"Batch writer '{self.name}' inserted {len(rows)} rows in {elapsed_ms}ms")
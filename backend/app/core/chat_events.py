@@ -0,0 +1,42 @@
+"""
+Chat Stream Events
+
+Typed events yielded by ChatService.process_message_stream. Each
+transport encodes an event once: SSE as an event frame, WebSocket as a
+{"type", "data"} JSON text message.
+"""
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from app.core.sse import dumps, encode_event
+
+
+class ChatEventType(str, Enum):
+    """Events of a streamed chat response, in the order they can occur."""
+    START = "start"      # Context detected, generation starting
+    CHUNK = "chunk"      # Response text
+    RESET = "reset"      # Discard the text so far (regenerating without banned words)
+    SOURCES = "sources"  # Knowledge base sources (if requested)
+    DONE = "done"        # Message saved: ids, token usage
+    ERROR = "error"      # Generation failed
+
+
+@dataclass(frozen=True)
+class ChatEvent:
+    """One event of a streamed chat response."""
+    type: ChatEventType
+    data: Dict[str, Any]
+    
+    @property
+    def is_final(self) -> bool:
+        """Whether this event ends the stream."""
+        return self.type in (ChatEventType.DONE, ChatEventType.ERROR)
+    
+    def to_sse(self, event_id: Optional[int] = None) -> bytes:
+        """Encode as a Server-Sent Events frame (event_id: sequence number for resuming)."""
+        return encode_event(self.type.value, self.data, event_id)
+    
+    def to_ws(self) -> str:
+        """Encode as a WebSocket text message."""
+        return dumps({"type": self.type.value, "data": self.data}).decode()
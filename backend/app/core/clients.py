@@ -3,6 +3,9 @@ Shared API Clients - Centralized client initialization for external services.
 
 This module provides lazy-initialized clients for:
 - OpenAI (GPT-4, Embeddings)
+- Redis (asyncio, for blocking reads such as resumable streams)
+
+HTTP connection pools are shared through app.core.http.
 
 Using centralized clients ensures:
 - Single source of truth for configuration
@@ -10,28 +13,62 @@ Using centralized clients ensures:
 - Easier testing and mocking
 """
 from typing import Optional
+import httpx
 from openai import AsyncOpenAI
+from redis.asyncio import Redis
 
 from app.core.config import settings
+from app.core.http import get_http_client
 
 # Singleton instances
 _openai_client: Optional[AsyncOpenAI] = None
+_openai_http_client: Optional[httpx.AsyncClient] = None
+_redis_client: Optional[Redis] = None
 
 
 def get_openai_client() -> AsyncOpenAI:
     """
     Get or create the OpenAI async client.
     
+    The client is rebuilt when its pooled HTTP client was closed and
+    replaced (after a lifespan shutdown), so calls never go through a
+    closed pool.
+    
     Returns:
         AsyncOpenAI client instance
     """
-    global _openai_client
-    if _openai_client is None:
-        _openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    global _openai_client, _openai_http_client
+    http_client = get_http_client("openai")
+    if _openai_client is None or http_client is not _openai_http_client:
+        # Deadlines and retries are applied per call by app.core.llm_gateway
+        _openai_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=0,
+            http_client=http_client,
+        )
+        _openai_http_client = http_client
     return _openai_client
 
 
+def get_redis_client() -> Redis:
+    """
+    Get or create the asyncio Redis client.
+    
+    Responses are bytes. app.core.performance.cache_client remains the
+    synchronous client for quick cache reads and writes.
+    
+    Returns:
+        Redis client instance
+    """
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
 def reset_clients():
     """Reset all clients. Useful for testing."""
-    global _openai_client
+    global _openai_client, _openai_http_client, _redis_client
     _openai_client = None
+    _openai_http_client = None
+    _redis_client = None
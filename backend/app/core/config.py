@@ -112,6 +112,70 @@ class Settings(BaseSettings):
         "OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"
     )
     
+    # Model routing: simple chat turns (small talk, short KB-grounded questions) go to
+    # the fast model with a smaller completion budget, the rest to OPENAI_MODEL
+    MODEL_ROUTING_ENABLED: bool = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+    OPENAI_FAST_MODEL: str = os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini")
+    
+    # LLM gateway: per-call deadlines (seconds, retries included), retries of
+    # transient errors, hedged requests (opt-in) and a circuit breaker per model
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_EMBEDDING_TIMEOUT_SECONDS: float = float(os.getenv("LLM_EMBEDDING_TIMEOUT_SECONDS", "10"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RESET_SECONDS: float = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+    
+    # LLM scheduler, per worker process: concurrent chat completions, tokens per minute
+    # (prompt + max_tokens, 0 = unlimited) and the longest queue wait before a turn is
+    # shed with a 429
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    LLM_QUEUE_MAX_WAIT_SECONDS: float = float(os.getenv("LLM_QUEUE_MAX_WAIT_SECONDS", "10"))
+    
+    # Outbound HTTP pools (app.core.http), per service and worker process: connection
+    # limit and idle connections kept open; HTTP/2 is used only when h2 is installed
+    OPENAI_HTTP_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "100"))
+    OPENAI_HTTP_MAX_KEEPALIVE: int = int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "40"))
+    MEMBERSHIP_HTTP_MAX_CONNECTIONS: int = int(os.getenv("MEMBERSHIP_HTTP_MAX_CONNECTIONS", "20"))
+    MEMBERSHIP_HTTP_MAX_KEEPALIVE: int = int(os.getenv("MEMBERSHIP_HTTP_MAX_KEEPALIVE", "5"))
+    MEMBERSHIP_HTTP_TIMEOUT_SECONDS: float = float(os.getenv("MEMBERSHIP_HTTP_TIMEOUT_SECONDS", "10"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    
+    # Semantic response cache (opt-in): reuse answers to near-duplicate questions
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_TTL_HOURS: int = int(os.getenv("SEMANTIC_CACHE_TTL_HOURS", "72"))
+    
+    # Resumable /chat/stream answers: generated into a Redis stream that clients can
+    # re-attach to with Last-Event-ID; generation stops once no client has read for
+    # the grace period
+    RESUMABLE_STREAMS_ENABLED: bool = os.getenv("RESUMABLE_STREAMS_ENABLED", "true").lower() == "true"
+    STREAM_RESUME_GRACE_SECONDS: int = int(os.getenv("STREAM_RESUME_GRACE_SECONDS", "15"))
+    
+    # Idempotency-Key on chat submissions: hours a completed response is kept for retries
+    IDEMPOTENCY_TTL_HOURS: int = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    
+    # Chat message layout: "standard" (persona prompt with user block inside) or
+    # "prefix_cache" (static -> dynamic ordering for provider-side prompt caching)
+    PROMPT_LAYOUT: str = os.getenv("PROMPT_LAYOUT", "standard")
+    
+    # Conversation history sent with each chat turn, in tokens per tier
+    HISTORY_TOKEN_BUDGET_BASIC: int = int(os.getenv("HISTORY_TOKEN_BUDGET_BASIC", "1500"))
+    HISTORY_TOKEN_BUDGET_VIP: int = int(os.getenv("HISTORY_TOKEN_BUDGET_VIP", "3000"))
+    
+    # Rolling summary of long conversations: once the unsummarized turns exceed
+    # the trigger (in tokens, 0 disables), older turns are summarized in the background
+    CONVERSATION_SUMMARY_TRIGGER_TOKENS: int = int(os.getenv("CONVERSATION_SUMMARY_TRIGGER_TOKENS", "2000"))
+    CONVERSATION_SUMMARY_MODEL: str = os.getenv("CONVERSATION_SUMMARY_MODEL", "gpt-4o-mini")
+    
+    # Question clustering job (0 disables the in-process loop)
+    QUESTION_CLUSTERING_INTERVAL_SECONDS: int = int(os.getenv("QUESTION_CLUSTERING_INTERVAL_SECONDS", "600"))
+    QUESTION_RECLUSTER_INTERVAL_HOURS: int = int(os.getenv("QUESTION_RECLUSTER_INTERVAL_HOURS", "24"))
+    
     # Usage Limits
     BASIC_MEMBER_MESSAGES_PER_MONTH: int = int(
         os.getenv("BASIC_MEMBER_MESSAGES_PER_MONTH", "50")
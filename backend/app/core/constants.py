@@ -24,7 +24,42 @@ class UserTier(str, enum.Enum):
 # Message limits
 MAX_MESSAGE_LENGTH = 4000
 MIN_MESSAGE_LENGTH = 1
-MAX_CONVERSATION_HISTORY = 10
+MAX_CONVERSATION_HISTORY = 50  # Hard cap on history messages; the token budget decides what is sent
+HISTORY_MESSAGE_MAX_TOKENS = 500  # Longer history turns are truncated to this
+HISTORY_MIN_TRUNCATED_TOKENS = 50  # A turn that would be cut shorter than this is dropped instead
+HISTORY_TRUNCATION_MARKER = " [...]"
+
+# Server-side conversation memory (Redis list per conversation)
+CONVERSATION_MEMORY_MAX_MESSAGES = MAX_CONVERSATION_HISTORY
+CONVERSATION_MEMORY_TTL = 86400  # 24 hours since last use
+
+# Rolling conversation summaries (older turns folded into Conversation.summary)
+CONVERSATION_SUMMARY_KEEP_TURNS = 3  # Most recent turns always sent verbatim
+CONVERSATION_SUMMARY_BATCH_TURNS = 20  # Max turns folded into the summary per run
+CONVERSATION_SUMMARY_MAX_TOKENS = 400
+
+# Streaming (SSE) framing
+SSE_COALESCE_WINDOW = 0.03  # Seconds text deltas are merged into one chunk event
+SSE_COALESCE_MAX_BYTES = 512  # A chunk event is sent early once this much text is waiting
+SSE_HEARTBEAT_INTERVAL = 15  # Seconds of silence before a keep-alive comment frame
+
+# Resumable streams (answers buffered in Redis for reconnects with Last-Event-ID)
+CHAT_STREAM_MAX_EVENTS = 2000  # Events kept per answer (far above one answer's chunk count)
+CHAT_STREAM_TTL = 300  # Seconds an answer stays replayable after its last event
+CHAT_STREAM_READ_BLOCK_MS = 5000  # Longest blocking read; a reader renews its lease after each
+CHAT_STREAM_PRODUCER_TTL = 60  # Producer lease: readers give up once it lapses without a final event
+
+# Idempotent chat submissions (Idempotency-Key header)
+IDEMPOTENCY_PENDING_TTL = 300  # Seconds a running request holds its key (freed early when it fails)
+IDEMPOTENCY_POLL_INTERVAL = 0.25  # Seconds between checks while a retry waits for the original
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# LLM gateway (deadlines, retries and breaker thresholds are settings)
+LLM_RETRY_BASE_DELAY = 0.5  # Seconds; backoff doubles per retry, with full jitter
+LLM_RETRY_MAX_DELAY = 8.0
+LLM_HEDGE_MIN_SAMPLES = 20  # Latency samples needed before a model's calls are hedged
+LLM_STREAM_IDLE_TIMEOUT = 30  # Seconds without data before an open completion stream fails
+LLM_SCHEDULER_EWMA_WEIGHT = 0.2  # Weight of the newest completion in the average hold time
 
 # OpenAI API defaults
 DEFAULT_TEMPERATURE = 0.3  # Lower for more factual, consistent responses
@@ -38,6 +73,27 @@ RAG_SCORE_THRESHOLD = 0.75  # Higher threshold for confident answers
 RAG_MIN_CONFIDENCE = 0.75  # Below this, ask clarifying questions
 RAG_CHUNK_SIZE = 500
 RAG_CHUNK_OVERLAP = 50
+VECTOR_REINDEX_STALE_SECONDS = 3600  # Shadow builds older than this are treated as abandoned
+
+# Question clustering (top-questions analytics)
+QUESTION_CLUSTER_SIMILARITY = 0.85  # Cosine similarity needed to join an existing cluster
+QUESTION_CLUSTER_MERGE_SIMILARITY = 0.92  # Clusters closer than this are merged on recluster
+QUESTION_CLUSTER_BATCH_SIZE = 200  # Questions embedded per batch
+QUESTION_RECLUSTER_MAX_POINTS = 50000  # Most recent embeddings refined per recluster
+QUESTION_RECLUSTER_ITERATIONS = 5  # k-means iterations per recluster
+
+# Question log writes (buffered in-process, inserted in batches)
+QUESTION_LOG_BATCH_SIZE = 100  # Rows per multi-row INSERT
+QUESTION_LOG_FLUSH_INTERVAL = 2.0  # Seconds a row may wait for its batch to fill
+QUESTION_LOG_MAX_QUEUE = 10000  # Rows buffered before new ones are dropped
+
+# One-off background jobs (analytics rows, truncated-turn saves) on shutdown
+BACKGROUND_JOBS_DRAIN_TIMEOUT = 10.0  # Seconds to let running jobs finish before cancelling them
+
+# Missing KB auto-resolution
+MISSING_KB_RESOLVE_SIMILARITY = RAG_SCORE_THRESHOLD  # New chunk must answer the question confidently
+MISSING_KB_MATCH_BATCH_SIZE = 500  # Unresolved items scored per matrix product
+MISSING_KB_RESOLVE_CHUNK_BATCH = 2000  # Indexed chunk vectors held before matching them (~12 MB at 1536-d)
 
 # Banned Words - Regenerate if these appear (unless in specific context)
 BANNED_WORDS = [
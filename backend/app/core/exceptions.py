@@ -84,6 +84,22 @@ class AlreadyExistsError(TayAIError):
         )
 
 
+class IdempotencyConflictError(TayAIError):
+    """Raised when a request's Idempotency-Key cannot be honoured."""
+    
+    def __init__(self, in_progress: bool):
+        if in_progress:
+            super().__init__(
+                message="A request with this Idempotency-Key is still in progress",
+                code="IDEMPOTENCY_IN_PROGRESS",
+            )
+        else:
+            super().__init__(
+                message="This Idempotency-Key was already used with a different request",
+                code="IDEMPOTENCY_KEY_REUSED",
+            )
+
+
 class ValidationError(TayAIError):
     """Raised when input validation fails."""
     
@@ -201,6 +217,15 @@ class RateLimitExceededError(TayAIError):
         self.retry_after = retry_after
 
 
+class ServerBusyError(RateLimitExceededError):
+    """Raised when a chat turn is shed because its wait for the LLM would be too long."""
+    
+    def __init__(self, retry_after: int = 5):
+        super().__init__(retry_after=retry_after, limit_type="llm_capacity")
+        self.message = "TayAI is helping a lot of people right now. Please try again in a few seconds."
+        self.args = (self.message,)
+
+
 class UsageLimitExceededError(TayAIError):
     """Raised when usage limit is exceeded."""
     
@@ -253,6 +278,18 @@ class OpenAIError(ExternalServiceError):
         super().__init__(service="OpenAI", message=message)
 
 
+class CircuitOpenError(ExternalServiceError):
+    """Raised instead of calling a service while its circuit breaker is open."""
+    
+    def __init__(self, service: str, retry_after: float):
+        super().__init__(
+            service=service,
+            message="Temporarily unavailable",
+            details={"retry_after": round(retry_after, 1)}
+        )
+        self.retry_after = retry_after
+
+
 class PineconeError(ExternalServiceError):
     """Raised when Pinecone API fails."""
     
@@ -280,6 +317,8 @@ def to_http_exception(error: TayAIError) -> HTTPException:
     status_map = {
         "NOT_FOUND": status.HTTP_404_NOT_FOUND,
         "ALREADY_EXISTS": status.HTTP_409_CONFLICT,
+        "IDEMPOTENCY_IN_PROGRESS": status.HTTP_409_CONFLICT,
+        "IDEMPOTENCY_KEY_REUSED": status.HTTP_422_UNPROCESSABLE_ENTITY,
         "VALIDATION_ERROR": status.HTTP_400_BAD_REQUEST,
         "AUTHENTICATION_ERROR": status.HTTP_401_UNAUTHORIZED,
         "PERMISSION_DENIED": status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,188 @@
+"""
+Outbound HTTP
+
+Pooled httpx clients for the external services the API calls, so requests
+reuse warm connections instead of paying TCP and TLS setup every time:
+- one AsyncClient per service ("openai", "membership"), each with its own
+  connection limit, keepalive pool and timeouts
+- HTTP/2 (many requests multiplexed on one connection) when HTTP2_ENABLED
+  is set and the h2 package is installed; HTTP/1.1 otherwise
+- pool_stats(): per service, requests in flight (now and peak), requests
+  and errors, and the pool's open, busy and idle connections
+
+Clients are created on first use, opened by the application lifespan at
+startup and closed at shutdown. Pools are per worker process.
+
+Usage:
+    response = await get_http_client("membership").get(url, params=params)
+"""
+import logging
+from typing import Any, AsyncIterator, Dict
+
+import httpx
+
+from app.core.config import settings
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - depends on the environment
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+SERVICES = ("openai", "membership")
+
+
+def _service_settings(service: str) -> Dict[str, Any]:
+    """Connection limit, keepalive pool size and read timeout of a service."""
+    if service == "openai":
+        return {
+            "max_connections": settings.OPENAI_HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.OPENAI_HTTP_MAX_KEEPALIVE,
+            # Per-call deadlines are applied by app.core.llm_gateway
+            "timeout": settings.LLM_TIMEOUT_SECONDS,
+        }
+    if service == "membership":
+        return {
+            "max_connections": settings.MEMBERSHIP_HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.MEMBERSHIP_HTTP_MAX_KEEPALIVE,
+            "timeout": settings.MEMBERSHIP_HTTP_TIMEOUT_SECONDS,
+        }
+    raise ValueError(f"Unknown HTTP service: {service}")
+
+
+class _CountedStream(httpx.AsyncByteStream):
+    """A response body that ends its request's in-flight count when closed."""
+    
+    def __init__(self, stream: httpx.AsyncByteStream, transport: "PooledTransport"):
+        self._stream = stream
+        self._transport = transport
+        self._closed = False
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+    
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._transport.in_flight -= 1
+        await self._stream.aclose()
+
+
+class PooledTransport(httpx.AsyncHTTPTransport):
+    """Connection-pooling transport counting requests until their response is closed."""
+    
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException as e:
+            self.in_flight -= 1
+            if isinstance(e, Exception):
+                self.errors += 1
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_CountedStream(response.stream, self),
+            extensions=response.extensions,
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        """Request counts and the pool's connections (busy ones are serving a request)."""
+        connections = list(getattr(self._pool, "connections", []))
+        busy = sum(1 for connection in connections if not connection.is_idle())
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections": len(connections),
+            "busy_connections": busy,
+            "idle_connections": len(connections) - busy,
+        }
+
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_transports: Dict[str, PooledTransport] = {}
+
+
+def http2_available() -> bool:
+    """Whether new clients negotiate HTTP/2."""
+    return settings.HTTP2_ENABLED and h2 is not None
+
+
+def get_http_client(service: str) -> httpx.AsyncClient:
+    """
+    Get or create the pooled client of a service.
+    
+    Args:
+        service: One of SERVICES
+    
+    Returns:
+        Shared AsyncClient; do not close it (close_http_clients does)
+    """
+    client = _clients.get(service)
+    if client is None or client.is_closed:
+        config = _service_settings(service)
+        transport = PooledTransport(
+            limits=httpx.Limits(
+                max_connections=config["max_connections"],
+                max_keepalive_connections=config["max_keepalive_connections"],
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            http2=http2_available(),
+        )
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(config["timeout"], connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+        )
+        _clients[service] = client
+        _transports[service] = transport
+    return client
+
+
+def open_http_clients() -> None:
+    """Create every service's client (at startup)."""
+    for service in SERVICES:
+        get_http_client(service)
+    logger.info(f"Outbound HTTP pools ready ({'HTTP/2' if http2_available() else 'HTTP/1.1'})")
+
+
+async def close_http_clients() -> None:
+    """Close every client and its connections (at shutdown)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    _transports.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing HTTP client: {e}")
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Limits and utilization of each service's pool (this worker)."""
+    services = {}
+    for service, transport in _transports.items():
+        config = _service_settings(service)
+        services[service] = {
+            "max_connections": config["max_connections"],
+            "max_keepalive_connections": config["max_keepalive_connections"],
+            **transport.stats(),
+        }
+    return {
+        "http2": http2_available(),
+        "keepalive_expiry_seconds": settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        "services": services,
+    }
@@ -0,0 +1,175 @@
+"""
+Idempotent Chat Submissions
+
+A client may send an Idempotency-Key header with a chat message, so a
+double click or a retry after a dropped connection does not generate,
+save and bill the same turn twice. The key's Redis record (per user and
+endpoint) holds the request's state:
+- pending: the turn is running; a retry waits for it to finish, or
+  attaches to its resumable stream once stream_id is set
+- done: a retry gets the stored response
+- a turn that fails (or is cut short) deletes its record, so a retry
+  runs it again
+
+The record also keeps a fingerprint of the request body: reusing a key
+for a different message is rejected. Without Redis requests simply run
+as if they had no key.
+
+Usage:
+    record = IdempotencyRecord(user_id, "chat", key)
+    stored = await record.resolve(request_fingerprint(message, conversation_id), timeout=60)
+    if stored is None:  # This request holds the key: run it
+        ...
+        await record.complete(response)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.chat_events import ChatEvent, ChatEventType
+from app.core.clients import get_redis_client
+from app.core.config import settings
+from app.core.constants import IDEMPOTENCY_PENDING_TTL, IDEMPOTENCY_POLL_INTERVAL
+from app.core.exceptions import IdempotencyConflictError
+from app.core.sse import dumps
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Digest of the request fields a retry must repeat unchanged."""
+    return hashlib.sha256(dumps(list(parts))).hexdigest()
+
+
+class IdempotencyRecord:
+    """The Redis record of one Idempotency-Key."""
+    
+    def __init__(self, user_id: int, scope: str, key: str):
+        self.redis = get_redis_client()
+        self.key = f"idempotency:{scope}:{user_id}:{hashlib.sha256(key.encode()).hexdigest()}"
+        self.fingerprint: Optional[str] = None
+        self.enabled = True
+    
+    async def resolve(self, fingerprint: str, timeout: float, stream: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Claim the key for this request, or wait for the request holding it.
+        
+        Args:
+            fingerprint: request_fingerprint of this request
+            timeout: Seconds to wait for a running request
+            stream: Also return a pending record as soon as it has a stream_id
+        
+        Returns:
+            None once this request holds the key (run it, then complete or
+            release); otherwise the record to answer from
+        
+        Raises:
+            IdempotencyConflictError: The key belongs to a different request,
+                or its request is still running at timeout
+        """
+        self.fingerprint = fingerprint
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                record = await self._claim()
+                if record is None:
+                    return None
+                if record.get("fingerprint") != fingerprint:
+                    raise IdempotencyConflictError(in_progress=False)
+                if record["state"] == DONE or (stream and record.get("stream_id")):
+                    return record
+                if loop.time() >= deadline:
+                    raise IdempotencyConflictError(in_progress=True)
+                await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+        except IdempotencyConflictError:
+            raise
+        except Exception as e:
+            logger.warning(f"Idempotency record unavailable, running without it: {e}")
+            self.enabled = False
+            return None
+    
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Take the key if it is free; otherwise the record holding it."""
+        pending = dumps({"state": PENDING, "fingerprint": self.fingerprint})
+        while True:
+            if await self.redis.set(self.key, pending, nx=True, ex=IDEMPOTENCY_PENDING_TTL):
+                return None
+            existing = await self.redis.get(self.key)
+            if existing is not None:  # Otherwise it expired in between: claim again
+                return json.loads(existing)
+    
+    async def set_stream(self, stream_id: str) -> None:
+        """Point retries of the running request at its resumable stream."""
+        await self._write(
+            {"state": PENDING, "fingerprint": self.fingerprint, "stream_id": stream_id}, IDEMPOTENCY_PENDING_TTL
+        )
+    
+    async def complete(self, response: Dict[str, Any]) -> None:
+        """Store the final response for retries."""
+        await self._write(
+            {"state": DONE, "fingerprint": self.fingerprint, "response": response},
+            settings.IDEMPOTENCY_TTL_HOURS * 3600,
+        )
+    
+    async def release(self) -> None:
+        """Free the key after a failed request, so a retry runs it again."""
+        if not self.enabled:
+            return
+        try:
+            await self.redis.delete(self.key)
+        except Exception as e:
+            logger.warning(f"Could not release idempotency record: {e}")
+    
+    async def _write(self, record: Dict[str, Any], ttl: int) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self.redis.set(self.key, dumps(record), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Could not update idempotency record: {e}")
+    
+    async def track(self, events: AsyncIterator[ChatEvent]) -> AsyncIterator[ChatEvent]:
+        """
+        Pass a streamed turn's events through, storing the answer when its
+        done event arrives (before passing it on), or releasing the key if
+        the turn ends without one.
+        """
+        parts: List[str] = []
+        stored: Dict[str, Any] = {}
+        completed = False
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    if event.type == ChatEventType.CHUNK:
+                        parts.append(event.data["content"])
+                    elif event.type == ChatEventType.RESET:
+                        parts = []
+                    elif event.type in (ChatEventType.START, ChatEventType.SOURCES):
+                        stored[event.type.value] = event.data
+                    elif event.type == ChatEventType.DONE:
+                        await self.complete({"response": "".join(parts), **stored, "done": event.data})
+                        completed = True
+                    yield event
+        finally:
+            if not completed:
+                await self.release()
+
+
+def replay_events(record: Dict[str, Any]) -> List[ChatEvent]:
+    """The events of a completed streamed turn, with the answer as one chunk."""
+    stored = record["response"]
+    events = []
+    if "start" in stored:
+        events.append(ChatEvent(ChatEventType.START, stored["start"]))
+    events.append(ChatEvent(ChatEventType.CHUNK, {"content": stored["response"], "replayed": True}))
+    if "sources" in stored:
+        events.append(ChatEvent(ChatEventType.SOURCES, stored["sources"]))
+    events.append(ChatEvent(ChatEventType.DONE, {**stored["done"], "replayed": True}))
+    return events
@@ -0,0 +1,324 @@
+"""
+LLM Gateway
+
+Every OpenAI completion and embedding call goes through llm_gateway, so a
+slow or failing upstream cannot pin workers:
+- deadlines: each call has a total time budget; every attempt gets what
+  is left of it
+- retries: timeouts, connection errors, 408/409/429 and 5xx responses are
+  retried with full-jitter exponential backoff while the deadline allows
+- hedging (LLM_HEDGE_ENABLED): a non-streamed call still running after
+  the model's LLM_HEDGE_PERCENTILE latency gets a second, identical
+  request; the first to succeed wins and the other is cancelled
+- circuit breaker per model: after LLM_CIRCUIT_FAILURE_THRESHOLD failed
+  calls in a row, calls fail fast with CircuitOpenError for
+  LLM_CIRCUIT_RESET_SECONDS, then a single probe call decides
+- latency histograms per model (to the full response, or to the open
+  stream for streamed completions), in stats()
+
+Usage:
+    response = await llm_gateway.chat_completion(model=model, messages=messages, max_tokens=400)
+    stream = await llm_gateway.chat_completion_stream(model=model, messages=messages)
+    embedding = await llm_gateway.embeddings(model=model, input=text)
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+import openai
+
+from app.core.clients import get_openai_client
+from app.core.config import settings
+from app.core.constants import (
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_STREAM_IDLE_TIMEOUT,
+)
+from app.core.exceptions import CircuitOpenError, OpenAIError
+from app.core.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRIABLE_STATUS_CODES = {408, 409, 429}
+
+
+def is_retriable(error: BaseException) -> bool:
+    """Whether a failed call may succeed if simply sent again."""
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRIABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    
+    closed: calls pass. open (after failure_threshold failures in a row):
+    calls are refused for reset_timeout seconds. half_open: one probe call
+    is let through (another one if it has not finished within
+    reset_timeout); its success closes the circuit, its failure opens it
+    again.
+    """
+    
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.times_opened = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+    
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+    
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+    
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the probe when half open)."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = time.monotonic()
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+    
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._probe_started = None
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        probing = self._probe_started is not None
+        if probing or self.failures >= self.failure_threshold:
+            if not probing:
+                self.times_opened += 1
+            self._opened_at = time.monotonic()
+            self._probe_started = None
+
+
+class LLMGateway:
+    """Deadlines, retries, hedging and circuit breaking for OpenAI calls."""
+    
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(
+                settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_SECONDS
+            )
+        return breaker
+    
+    def check(self, model: str) -> None:
+        """Raise CircuitOpenError if calls to model are currently refused."""
+        breaker = self.breaker(model)
+        if breaker.state == "open":
+            self._counters[model]["rejected"] += 1
+            raise CircuitOpenError(f"OpenAI {model}", breaker.retry_after())
+    
+    # -------------------------------------------------------------------------
+    # Calls
+    # -------------------------------------------------------------------------
+    
+    async def chat_completion(self, *, model: str, messages: list, timeout: Optional[float] = None, **kwargs: Any):
+        """Non-streamed chat completion (hedged when enabled)."""
+        client = get_openai_client()
+        return await self.call(
+            model,
+            lambda budget: client.chat.completions.create(
+                model=model, messages=messages, timeout=budget, **kwargs
+            ),
+            timeout=timeout or settings.LLM_TIMEOUT_SECONDS,
+            hedge=True,
+        )
+    
+    async def chat_completion_stream(
+        self,
+        *,
+        model: str,
+        messages: list,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ):
+        """
+        Open a streamed chat completion.
+        
+        The deadline and retries cover opening the stream; once open,
+        reads fail after LLM_STREAM_IDLE_TIMEOUT seconds without data.
+        """
+        client = get_openai_client()
+        return await self.call(
+            model,
+            lambda budget: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                timeout=httpx.Timeout(budget, read=LLM_STREAM_IDLE_TIMEOUT),
+                **kwargs
+            ),
+            timeout=timeout or settings.LLM_TIMEOUT_SECONDS,
+            latency_key=f"{model}:stream",
+        )
+    
+    async def embeddings(self, *, model: str, input: Any, timeout: Optional[float] = None):
+        """Embeddings for a text or a list of texts (hedged when enabled)."""
+        client = get_openai_client()
+        return await self.call(
+            model,
+            lambda budget: client.embeddings.create(model=model, input=input, timeout=budget),
+            timeout=timeout or settings.LLM_EMBEDDING_TIMEOUT_SECONDS,
+            hedge=True,
+        )
+    
+    async def call(
+        self,
+        model: str,
+        request: Callable[[float], Awaitable[T]],
+        *,
+        timeout: float,
+        hedge: bool = False,
+        latency_key: Optional[str] = None
+    ) -> T:
+        """
+        Run request(seconds_left) under the gateway's policies.
+        
+        Args:
+            model: Model called (circuit breaker and stats key)
+            request: Makes one attempt, given the seconds left of the deadline
+            timeout: Total deadline in seconds, retries included
+            hedge: Whether a slow attempt may be hedged (idempotent calls only)
+            latency_key: Histogram to record into (default: model)
+        
+        Raises:
+            CircuitOpenError: The model's circuit is open (nothing was sent)
+            OpenAIError: Retriable failures outlasted the retries or deadline
+        """
+        breaker = self.breaker(model)
+        counters = self._counters[model]
+        if not breaker.allow():
+            counters["rejected"] += 1
+            raise CircuitOpenError(f"OpenAI {model}", breaker.retry_after())
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        attempt = 0
+        counters["calls"] += 1
+        while True:
+            attempt += 1
+            started = loop.time()
+            remaining = deadline - started
+            try:
+                result = await asyncio.wait_for(self._attempt(model, request, remaining, hedge), remaining)
+            except Exception as e:
+                if not is_retriable(e):
+                    # The upstream answered; the request itself was refused
+                    breaker.record_success()
+                    raise
+                delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+                if attempt > settings.LLM_MAX_RETRIES or loop.time() + delay >= deadline:
+                    breaker.record_failure()
+                    counters["failures"] += 1
+                    logger.warning(f"LLM call to {model} failed after {attempt} attempts: {type(e).__name__}: {e}")
+                    raise OpenAIError(f"{model}: {type(e).__name__} after {attempt} attempts") from e
+                counters["retries"] += 1
+                logger.info(f"Retrying LLM call to {model} in {delay:.2f}s after {type(e).__name__}")
+                await asyncio.sleep(delay)
+                continue
+            
+            breaker.record_success()
+            self._latency[latency_key or model].observe((loop.time() - started) * 1000)
+            return result
+    
+    async def _attempt(
+        self,
+        model: str,
+        request: Callable[[float], Awaitable[T]],
+        budget: float,
+        hedge: bool
+    ) -> T:
+        delay = self._hedge_delay(model) if hedge else None
+        if delay is None or delay >= budget:
+            return await request(budget)
+        
+        first = asyncio.ensure_future(request(budget))
+        second: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                return first.result()
+            
+            self._counters[model]["hedges"] += 1
+            second = asyncio.ensure_future(request(budget - delay))
+            pending = {first, second}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._counters[model]["hedge_wins"] += 1
+                        return task.result()
+                if not pending:
+                    return done.pop().result()
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds before hedging a call to model (None: do not hedge)."""
+        if not settings.LLM_HEDGE_ENABLED:
+            return None
+        histogram = self._latency.get(model)
+        if histogram is None or histogram.count < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        latency_ms = histogram.percentile(settings.LLM_HEDGE_PERCENTILE)
+        return latency_ms / 1000 if latency_ms is not None else None
+    
+    # -------------------------------------------------------------------------
+    # Statistics
+    # -------------------------------------------------------------------------
+    
+    def stats(self) -> Dict[str, Any]:
+        """Per model: call counters, circuit state and latency histograms."""
+        models: Dict[str, Any] = {}
+        for model in set(self._counters) | set(self._breakers):
+            breaker = self.breaker(model)
+            models[model] = {
+                **{name: self._counters[model][name] for name in
+                   ("calls", "retries", "failures", "rejected", "hedges", "hedge_wins")},
+                "circuit": breaker.state,
+                "circuit_opened": breaker.times_opened,
+                "latency_ms": {
+                    key: histogram.as_dict() for key, histogram in self._latency.items()
+                    if key == model or key.startswith(f"{model}:")
+                },
+            }
+        return {"hedging": settings.LLM_HEDGE_ENABLED, "models": models}
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,286 @@
+"""
+LLM Scheduler
+
+Admission control in front of chat completions, so a traffic peak queues
+here instead of running into the provider's rate limits all at once:
+- budgets (per worker process): at most LLM_MAX_CONCURRENCY completions
+  in flight, and LLM_TOKENS_PER_MINUTE tokens reserved as prompt +
+  max_tokens, corrected with the actual usage once a completion ends
+- priority: excess turns queue by tier (higher RATE_LIMIT_TIER_MULTIPLIERS
+  first, so VIP members go ahead of trial members), then by how many turns
+  the user already has queued or running, so one user's burst does not
+  hold back the rest of their tier
+- load shedding: a turn whose estimated wait exceeds
+  LLM_QUEUE_MAX_WAIT_SECONDS is refused at once with ServerBusyError
+  (a 429 with Retry-After); a turn still queued after that long is
+  dropped with it
+- stats(): in flight, queue depth by tier, tokens available, queue wait
+  histogram, and counts of turns admitted, delayed (queued first), shed
+  on arrival and timed out in the queue
+
+Usage:
+    llm_scheduler.check(user_id, tier)  # Before any work, to shed early
+    ticket = await llm_scheduler.acquire(user_id, tier, estimated_tokens)
+    try:
+        ...
+    finally:
+        ticket.release(tokens_used=usage.total_tokens)
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.constants import LLM_SCHEDULER_EWMA_WEIGHT, RATE_LIMIT_TIER_MULTIPLIERS, UserTier
+from app.core.exceptions import ServerBusyError
+from app.core.metrics import LatencyHistogram
+
+
+class TokenBucket:
+    """Tokens per minute, refilled continuously up to one minute's worth."""
+    
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+    
+    def available(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+    
+    def seconds_until(self, tokens: float) -> float:
+        """Seconds until tokens are available."""
+        return max(0.0, (tokens - self.available()) / self.rate)
+    
+    def take(self, tokens: float) -> None:
+        """Remove tokens (may go negative: returning usage above a reservation)."""
+        self._tokens = self.available() - tokens
+
+
+class Ticket:
+    """An admitted completion: one concurrency slot and its token reservation."""
+    
+    def __init__(self, scheduler: "LLMScheduler", user_id: int, tokens: float):
+        self._scheduler = scheduler
+        self.user_id = user_id
+        self.tokens = tokens
+        self.admitted_at = time.monotonic()
+        self.released = False
+    
+    def release(self, tokens_used: Optional[int] = None) -> None:
+        """
+        Free the slot, correcting the token reservation with tokens_used
+        if given. Safe to call more than once.
+        """
+        if not self.released:
+            self.released = True
+            self._scheduler._release(self, tokens_used)
+
+
+class _Waiter:
+    """A queued acquire."""
+    
+    __slots__ = ("user_id", "tier", "tokens", "future", "enqueued_at")
+    
+    def __init__(self, user_id: int, tier: str, tokens: float):
+        self.user_id = user_id
+        self.tier = tier
+        self.tokens = tokens
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Concurrency and token budgets with a tier-priority, per-user-fair queue."""
+    
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_wait: Optional[float] = None
+    ):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.tokens_per_minute = (
+            settings.LLM_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        )
+        self.max_wait = settings.LLM_QUEUE_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        self._bucket = TokenBucket(self.tokens_per_minute) if self.tokens_per_minute else None
+        self._active = 0
+        self._queue: List[Tuple[int, int, int, _Waiter]] = []
+        self._queued_by_tier: Dict[str, int] = defaultdict(int)
+        self._user_load: Dict[int, int] = defaultdict(int)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._service_seconds: Optional[float] = None
+        self._wait_ms = LatencyHistogram()
+        self._counters: Dict[str, int] = defaultdict(int)
+    
+    # -------------------------------------------------------------------------
+    # Admission
+    # -------------------------------------------------------------------------
+    
+    def check(self, user_id: int, tier: Optional[str]) -> None:
+        """Raise ServerBusyError if a new turn from user_id would wait too long."""
+        if not self._queued:
+            return
+        rank = self._rank(tier or UserTier.BASIC.value)
+        wait = self._estimate_wait((rank, self._user_load[user_id] + 1, math.inf), 0)
+        if wait > self.max_wait:
+            self._counters["shed"] += 1
+            raise ServerBusyError(self._retry_after(wait))
+    
+    async def acquire(self, user_id: int, tier: Optional[str], tokens: float) -> Ticket:
+        """
+        Wait for a slot and tokens for one completion.
+        
+        Raises:
+            ServerBusyError: The estimated or actual wait exceeded max_wait
+        """
+        tier = tier or UserTier.BASIC.value
+        if self._bucket is not None:
+            tokens = min(tokens, self._bucket.capacity)
+        self._user_load[user_id] += 1
+        
+        if not self._queued and self._active < self.max_concurrency and self._has_tokens(tokens):
+            self._wait_ms.observe(0)
+            return self._admit(user_id, tokens)
+        
+        key = (self._rank(tier), self._user_load[user_id], next(self._seq))
+        wait = self._estimate_wait(key, tokens)
+        if wait > self.max_wait:
+            self._unload(user_id)
+            self._counters["shed"] += 1
+            raise ServerBusyError(self._retry_after(wait))
+        
+        waiter = _Waiter(user_id, tier, tokens)
+        heapq.heappush(self._queue, (*key, waiter))
+        self._queued_by_tier[tier] += 1
+        self._counters["delayed"] += 1
+        self._dispatch()
+        try:
+            done, _ = await asyncio.wait({waiter.future}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not done:
+            self._abandon(waiter)
+            self._counters["timed_out"] += 1
+            raise ServerBusyError(self._retry_after(self.max_wait))
+        return waiter.future.result()
+    
+    @property
+    def _queued(self) -> int:
+        return sum(self._queued_by_tier.values())
+    
+    @staticmethod
+    def _rank(tier: str) -> int:
+        return -RATE_LIMIT_TIER_MULTIPLIERS.get(tier, 1)
+    
+    def _has_tokens(self, tokens: float) -> bool:
+        return self._bucket is None or self._bucket.seconds_until(tokens) == 0
+    
+    def _estimate_wait(self, key: Tuple, tokens: float) -> float:
+        """Seconds until a turn queued with key would be admitted."""
+        ahead = [entry[3] for entry in self._queue if entry[:3] < key and not entry[3].future.done()]
+        wait = 0.0
+        if self._service_seconds is not None:
+            # With every slot busy, one frees up every service time / slots on average
+            needed = len(ahead) + 1 - (self.max_concurrency - self._active)
+            wait = max(0, needed) * self._service_seconds / self.max_concurrency
+        if self._bucket is not None:
+            wait = max(wait, self._bucket.seconds_until(sum(w.tokens for w in ahead) + tokens))
+        return wait
+    
+    @staticmethod
+    def _retry_after(wait: float) -> int:
+        return max(1, min(60, math.ceil(wait)))
+    
+    def _admit(self, user_id: int, tokens: float) -> Ticket:
+        self._active += 1
+        if self._bucket is not None:
+            self._bucket.take(tokens)
+        self._counters["admitted"] += 1
+        return Ticket(self, user_id, tokens)
+    
+    def _dispatch(self) -> None:
+        """Admit queued turns, in priority order, while slots and tokens allow."""
+        while self._queue and self._active < self.max_concurrency:
+            waiter = self._queue[0][3]
+            if waiter.future.done():  # Abandoned
+                heapq.heappop(self._queue)
+                continue
+            if self._bucket is not None:
+                delay = self._bucket.seconds_until(waiter.tokens)
+                if delay > 0:
+                    self._dispatch_later(delay)
+                    return
+            heapq.heappop(self._queue)
+            self._queued_by_tier[waiter.tier] -= 1
+            self._wait_ms.observe((time.monotonic() - waiter.enqueued_at) * 1000)
+            waiter.future.set_result(self._admit(waiter.user_id, waiter.tokens))
+    
+    def _dispatch_later(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+    
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+    
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Take a waiter that gave up out of the queue (or release its ticket if admitted meanwhile)."""
+        if waiter.future.done():
+            waiter.future.result().release()
+            return
+        waiter.future.cancel()
+        self._queued_by_tier[waiter.tier] -= 1
+        self._unload(waiter.user_id)
+    
+    def _release(self, ticket: Ticket, tokens_used: Optional[int]) -> None:
+        self._active -= 1
+        self._unload(ticket.user_id)
+        if self._bucket is not None and tokens_used is not None:
+            self._bucket.take(tokens_used - ticket.tokens)
+        held = time.monotonic() - ticket.admitted_at
+        if self._service_seconds is None:
+            self._service_seconds = held
+        else:
+            self._service_seconds += LLM_SCHEDULER_EWMA_WEIGHT * (held - self._service_seconds)
+        self._dispatch()
+    
+    def _unload(self, user_id: int) -> None:
+        self._user_load[user_id] -= 1
+        if self._user_load[user_id] <= 0:
+            del self._user_load[user_id]
+    
+    # -------------------------------------------------------------------------
+    # Statistics
+    # -------------------------------------------------------------------------
+    
+    def stats(self) -> Dict[str, Any]:
+        """Budgets, in-flight and queued turns, queue wait and shed counts."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "tokens_per_minute": self.tokens_per_minute,
+            "max_wait_seconds": self.max_wait,
+            "in_flight": self._active,
+            "queued": self._queued,
+            "queued_by_tier": {tier: count for tier, count in self._queued_by_tier.items() if count},
+            "tokens_available": round(self._bucket.available()) if self._bucket is not None else None,
+            "avg_completion_ms": (
+                round(self._service_seconds * 1000, 2) if self._service_seconds is not None else None
+            ),
+            **{name: self._counters[name] for name in ("admitted", "delayed", "shed", "timed_out")},
+            "queue_wait_ms": self._wait_ms.as_dict(),
+        }
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,150 @@
+"""
+Request Metrics
+
+Per-request stage timings, used to see where latency goes in multi-step
+pipelines such as chat pre-generation, token usage, and latency
+histograms for upstream calls.
+
+Usage:
+    timer = StageTimer()
+    embedding = await timer.run("embed", embed(message))
+    with timer.stage("build_messages"):
+        messages = build(...)
+    logger.info(f"Stage timings: {timer.as_dict()}")
+    
+    usage = TokenUsage()
+    usage.add(response.usage)
+    
+    latency = LatencyHistogram()
+    latency.observe(812.5)
+    latency.percentile(0.95)
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Dict, Iterator, List, Optional, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """
+    Record wall-clock durations of named stages in milliseconds.
+    
+    Stages may overlap (e.g. run concurrently as tasks); each is timed
+    independently and "total" covers the span since the timer was created.
+    """
+    
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+    
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Await awaitable, recording its duration as stage name."""
+        with self.stage(name):
+            return await awaitable
+    
+    def as_dict(self) -> Dict[str, float]:
+        return {**self.timings, "total": round((time.perf_counter() - self._started) * 1000, 2)}
+
+
+@dataclass
+class TokenUsage:
+    """
+    Token counts for one request, summed over every completion it made.
+    
+    cached_prompt_tokens is the part of the prompt served from the
+    provider's prompt cache (a prefix shared with a recent request).
+    estimated is set once any completion was counted locally because the
+    provider reported no usage for it.
+    """
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    estimated: bool = False
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+    
+    def add(self, usage) -> None:
+        """Accumulate an OpenAI usage object (missing fields count as 0)."""
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.cached_prompt_tokens += getattr(details, "cached_tokens", 0) or 0
+    
+    def add_estimate(self, prompt_tokens: int, completion_tokens: int) -> None:
+        """Accumulate locally counted tokens for a completion without usage."""
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.estimated = True
+    
+    def as_dict(self) -> Dict[str, Union[int, bool]]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "estimated": self.estimated,
+        }
+
+
+# Upper bounds (ms) of the latency histogram buckets; slower calls go in "+Inf"
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000)
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed buckets (upper bounds in milliseconds).
+    
+    Percentiles are estimated as the upper bound of the bucket the
+    requested rank falls in, so they err on the slow side.
+    """
+    
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+    
+    def observe(self, ms: float) -> None:
+        index = bisect_left(self.buckets, ms)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += ms
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0 < q <= 1) in ms; None without samples or beyond the last bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return None
+    
+    def as_dict(self) -> Dict[str, Union[int, float, None, Dict[str, int]]]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
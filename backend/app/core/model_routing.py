@@ -0,0 +1,165 @@
+"""
+Model Routing
+
+Picks the model and completion budget for a chat turn from signals the
+chat pipeline already computes, so simple turns get a fast, cheap model
+and only demanding ones pay for the primary model:
+- ModelRoute: one declarative rule; conditions left as None match anything
+- MODEL_ROUTES: the rules in order; the first match wins, the last one
+  matches everything
+- ModelRouter: picks a route and keeps per-route time to first token,
+  total generation time, tokens and cost
+
+Usage:
+    routed = model_router.route(RoutingSignals(context_type, has_recipe, kb_confidence, user_tier, len(message)))
+    stream = await llm_gateway.chat_completion_stream(model=routed.model, max_tokens=routed.max_tokens, ...)
+    model_router.record(routed, first_token_ms, total_ms, usage)
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from app.core.config import settings
+from app.core.constants import DEFAULT_MAX_TOKENS, UserTier
+from app.core.metrics import LatencyHistogram, TokenUsage
+from app.core.prompts.context import ConversationContext
+from app.utils.cost_calculator import estimate_cost_from_tokens
+
+
+@dataclass(frozen=True)
+class RoutingSignals:
+    """What routing looks at for one turn."""
+    context_type: ConversationContext
+    has_recipe: bool
+    kb_confidence: float
+    user_tier: Optional[str]
+    message_chars: int
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """
+    A routing rule: the conditions a turn must meet, and what it gets.
+    
+    fast selects OPENAI_FAST_MODEL instead of OPENAI_MODEL.
+    """
+    name: str
+    max_tokens: int
+    fast: bool = False
+    contexts: Optional[FrozenSet[ConversationContext]] = None
+    recipe: Optional[bool] = None
+    tiers: Optional[FrozenSet[str]] = None
+    max_message_chars: Optional[int] = None
+    min_kb_confidence: Optional[float] = None
+    
+    def matches(self, signals: RoutingSignals) -> bool:
+        return (
+            (self.contexts is None or signals.context_type in self.contexts)
+            and (self.recipe is None or signals.has_recipe == self.recipe)
+            and (self.tiers is None or (signals.user_tier or UserTier.BASIC.value) in self.tiers)
+            and (self.max_message_chars is None or signals.message_chars <= self.max_message_chars)
+            and (self.min_kb_confidence is None or signals.kb_confidence >= self.min_kb_confidence)
+        )
+
+
+MODEL_ROUTES: Tuple[ModelRoute, ...] = (
+    # Recipe answers follow a long multi-section template
+    ModelRoute("recipe", max_tokens=DEFAULT_MAX_TOKENS, recipe=True),
+    # Greetings, thanks and one-liners outside any topic
+    ModelRoute(
+        "small_talk",
+        max_tokens=300,
+        fast=True,
+        contexts=frozenset({ConversationContext.GENERAL}),
+        recipe=False,
+        max_message_chars=80,
+    ),
+    # Short questions the knowledge base answers well: the model mostly restates it.
+    # VIP members keep the primary model for these
+    ModelRoute(
+        "kb_grounded",
+        max_tokens=600,
+        fast=True,
+        recipe=False,
+        tiers=frozenset({UserTier.BASIC.value}),
+        max_message_chars=300,
+        min_kb_confidence=0.75,
+    ),
+    ModelRoute("default", max_tokens=DEFAULT_MAX_TOKENS),
+)
+
+
+@dataclass(frozen=True)
+class RoutedModel:
+    """The route a turn took, resolved to a model name."""
+    route: str
+    model: str
+    max_tokens: int
+
+
+class ModelRouter:
+    """First-match routing over MODEL_ROUTES, with per-route statistics."""
+    
+    def __init__(self, routes: Tuple[ModelRoute, ...] = MODEL_ROUTES):
+        self.routes = routes
+        self._first_token: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._total: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._totals: Dict[str, Dict[str, Any]] = defaultdict(lambda: defaultdict(int))
+    
+    def route(self, signals: RoutingSignals) -> RoutedModel:
+        """The first route matching signals (the last route when routing is disabled)."""
+        if settings.MODEL_ROUTING_ENABLED:
+            route = next((r for r in self.routes if r.matches(signals)), self.routes[-1])
+        else:
+            route = self.routes[-1]
+        return self._resolve(route)
+    
+    def default(self) -> RoutedModel:
+        return self._resolve(self.routes[-1])
+    
+    @staticmethod
+    def _resolve(route: ModelRoute) -> RoutedModel:
+        model = settings.OPENAI_FAST_MODEL if route.fast else settings.OPENAI_MODEL
+        return RoutedModel(route.name, model, route.max_tokens)
+    
+    def record(
+        self,
+        routed: RoutedModel,
+        first_token_ms: Optional[float],
+        total_ms: float,
+        usage: TokenUsage
+    ) -> None:
+        """Record one completed generation on routed."""
+        if first_token_ms is not None:
+            self._first_token[routed.route].observe(first_token_ms)
+        self._total[routed.route].observe(total_ms)
+        totals = self._totals[routed.route]
+        totals["turns"] += 1
+        totals["prompt_tokens"] += usage.prompt_tokens
+        totals["completion_tokens"] += usage.completion_tokens
+        totals["cost_usd"] += estimate_cost_from_tokens(
+            usage.prompt_tokens, usage.completion_tokens,
+            model=routed.model, cached_input_tokens=usage.cached_prompt_tokens
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        """Per route: its model, turns, latency histograms, tokens and cost."""
+        routes: Dict[str, Any] = {}
+        for route in self.routes:
+            totals = self._totals[route.name]
+            turns = totals["turns"]
+            routes[route.name] = {
+                "model": self._resolve(route).model,
+                "max_tokens": route.max_tokens,
+                "turns": turns,
+                "prompt_tokens": totals["prompt_tokens"],
+                "completion_tokens": totals["completion_tokens"],
+                "cost_usd": round(totals["cost_usd"], 6),
+                "avg_cost_usd": round(totals["cost_usd"] / turns, 6) if turns else 0.0,
+                "first_token_ms": self._first_token[route.name].as_dict(),
+                "total_ms": self._total[route.name].as_dict(),
+            }
+        return {"enabled": settings.MODEL_ROUTING_ENABLED, "routes": routes}
+
+
+model_router = ModelRouter()
@@ -27,7 +27,12 @@ from .generation import (
     get_system_prompt, 
     get_context_injection_prompt,
     detect_instagram_intent,
-    get_instagram_intelligence_prompt
+    get_instagram_intelligence_prompt,
+    get_persona_core_prompt,
+    get_context_mode_prompt,
+    get_confidence_mode_prompt,
+    get_user_context_prompt,
+    get_conversation_summary_prompt,
 )
 from .recipes import detect_recipe, get_recipe_prompt, get_all_recipes_reference, ALL_RECIPES
 from .fallbacks import FALLBACK_RESPONSES
@@ -45,6 +50,11 @@ __all__ = [
     "get_context_injection_prompt",
     "detect_instagram_intent",
     "get_instagram_intelligence_prompt",
+    "get_persona_core_prompt",
+    "get_context_mode_prompt",
+    "get_confidence_mode_prompt",
+    "get_user_context_prompt",
+    "get_conversation_summary_prompt",
     # Recipes
     "detect_recipe",
     "get_recipe_prompt",
@@ -5,7 +5,9 @@ Handles detecting WHAT type of help the user needs based on their message.
 This affects which specialized instructions TayAI uses to respond.
 """
 from enum import Enum
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from app.utils.keywords import KeywordHits, KeywordMatcher
 
 
 class ConversationContext(str, Enum):
@@ -48,7 +50,10 @@ CONTEXT_KEYWORDS: Dict[ConversationContext, List[str]] = {
 }
 
 
-def detect_conversation_context(message: str) -> ConversationContext:
+_CONTEXT_MATCHER = KeywordMatcher(CONTEXT_KEYWORDS)
+
+
+def detect_conversation_context(message: str, hits: Optional[KeywordHits] = None) -> ConversationContext:
     """
     Detect the conversation context from a user message using keyword matching.
     
@@ -57,6 +62,8 @@ def detect_conversation_context(message: str) -> ConversationContext:
     
     Args:
         message: The user's message text
+        hits: Keyword scan of the message, if one covering CONTEXT_KEYWORDS
+            was already made (see KeywordMatcher)
     
     Returns:
         The detected ConversationContext type
@@ -68,12 +75,13 @@ def detect_conversation_context(message: str) -> ConversationContext:
         >>> detect_conversation_context("My hair is breaking")
         ConversationContext.TROUBLESHOOTING
     """
-    message_lower = message.lower()
+    if hits is None:
+        hits = _CONTEXT_MATCHER.scan(message)
     
     # Count keyword matches for each context
-    scores: Dict[ConversationContext, int] = {}
-    for context, keywords in CONTEXT_KEYWORDS.items():
-        scores[context] = sum(1 for kw in keywords if kw in message_lower)
+    scores: Dict[ConversationContext, int] = {
+        context: hits.count(context) for context in CONTEXT_KEYWORDS
+    }
     
     # Find the context with highest score
     max_score = max(scores.values())
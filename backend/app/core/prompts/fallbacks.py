@@ -20,6 +20,18 @@ FALLBACK_RESPONSES = {
         "your business is at? The more I know, the better I can help you."
     ),
     
+    # When the AI service is failing and calls are paused (circuit breaker open)
+    "service_unavailable": (
+        "I'm having a little trouble on my end right now. Give me a minute and "
+        "ask me again - I want to give you a real answer, not a rushed one!"
+    ),
+    
+    # When the queue for the model is too long - the turn was not started
+    "busy": (
+        "It's a busy moment over here and I don't want to rush you! "
+        "Give me a few seconds and send that again."
+    ),
+    
     # When an error occurs - maintains friendly tone
     "error_graceful": (
         "Okay, something went sideways on my end! Can you try asking that again? "
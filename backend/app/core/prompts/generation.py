@@ -4,92 +4,36 @@ Prompt Generation for TayAI
 Two-pass response system:
 Pass 1: Retrieve + outline answer strictly from KB
 Pass 2: Rewrite in Tay's voice + apply tone + accountability
+
+The system prompt is assembled from fragments compiled once at import
+(PersonaFragments). Fully rendered prompts for the default persona are
+memoized per (context type, confidence band, RAG flag); only the user
+context block is spliced in per request.
 """
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, List, Optional
 
+from app.utils.keywords import KeywordHits, KeywordMatcher
+
 from .persona import PersonaConfig, DEFAULT_PERSONA
 from .context import ConversationContext
 
+# Below this KB confidence the prompt switches to clarifying mode
+LOW_CONFIDENCE_THRESHOLD = 0.75
 
-def get_system_prompt(
-    persona: Optional[PersonaConfig] = None,
-    context_type: ConversationContext = ConversationContext.GENERAL,
-    include_rag_instructions: bool = True,
-    user_tier: Optional[str] = None,
-    kb_confidence: float = 1.0,  # Confidence score from RAG
-    user_profile: Optional[dict] = None  # User onboarding profile data
-) -> str:
-    """
-    Generate the system prompt for TayAI.
-    
-    Args:
-        kb_confidence: RAG retrieval confidence (0-1). Below 0.75 triggers clarifying mode.
-        user_profile: User onboarding profile data (name, business_type, focus, etc.)
-    """
-    persona = persona or DEFAULT_PERSONA
-    
-    # Build user context section from profile
-    user_context_section = ""
-    if user_profile and user_profile.get("onboarding"):
-        onboarding = user_profile["onboarding"]
-        user_context_section = "\n## 👤 USER CONTEXT\n\n"
-        user_context_section += "Use this information to personalize your responses:\n\n"
-        
-        if onboarding.get("user_name"):
-            user_context_section += f"• **Name**: {onboarding['user_name']}\n"
-        if onboarding.get("business_type"):
-            user_context_section += f"• **Business Type**: {onboarding['business_type']}\n"
-        if onboarding.get("focus"):
-            user_context_section += f"• **Main Focus**: {onboarding['focus']}\n"
-        if onboarding.get("primary_struggle"):
-            user_context_section += f"• **Primary Challenge**: {onboarding['primary_struggle']}\n"
-        if onboarding.get("goals"):
-            user_context_section += f"• **Goals**: {onboarding['goals']}\n"
-        if onboarding.get("experience_level"):
-            user_context_section += f"• **Experience Level**: {onboarding['experience_level']}\n"
-        if onboarding.get("preferred_communication_style"):
-            user_context_section += f"• **Communication Style**: {onboarding['preferred_communication_style']}\n"
-        
-        user_context_section += "\n**Use this context to:**\n"
-        user_context_section += "• Address them by name when appropriate\n"
-        user_context_section += "• Tailor advice to their specific business type and focus\n"
-        user_context_section += "• Reference their goals and challenges when relevant\n"
-        user_context_section += "• Match their preferred communication style\n"
-        user_context_section += "• Provide context-appropriate guidance based on their experience level\n\n"
-    
-    # Build sections
-    rules = _format_list_as_bullets(persona.core_rules)
-    voice = _format_dict_as_bullets(persona.voice_style)
-    structure = _format_dict_as_bullets(persona.answer_structure)
-    business = _format_list_as_bullets(persona.business_rules)
-    content = _format_list_as_bullets(persona.content_rules)
-    niche = _format_list_as_bullets(persona.niche_rules)
-    product_rule = _format_dict_as_bullets(persona.product_recommendation_rule)
-    hair = _format_list_as_bullets(persona.hair_knowledge)
-    biz_knowledge = _format_list_as_bullets(persona.business_knowledge)
-    banned = ", ".join(persona.banned_words)
-    guardrails = _format_list_as_bullets(persona.guardrails)
-    
-    # Context-specific section
-    context_section = _get_context_instructions(context_type)
-    
-    # Low confidence mode
-    confidence_section = ""
-    if kb_confidence < 0.75:
-        confidence_section = f"""
-## ⚠️ LOW CONFIDENCE MODE ACTIVATED
+# Rendered prompt bodies kept for the default persona. Keys are bounded by
+# context types x confidence percentages (0-74% or high) x RAG flag.
+SYSTEM_PROMPT_CACHE_SIZE = 512
 
-Your knowledge base match confidence is LOW ({kb_confidence:.0%}).
-DO NOT give a full generic answer. Instead:
-1. Acknowledge what they're asking about
-2. Ask 1-2 clarifying questions to understand their specific situation
-3. Say: "I want to give you the right guidance here. Can you tell me more about [specific aspect]?"
 
-{persona.low_confidence_response}
-"""
-    
-    # Vague question detection and clarifying question rule
-    vague_question_section = """
+# =============================================================================
+# Static Prompt Sections
+# =============================================================================
+
+_PROMPT_HEADER = "# TAY AI - AUTHORITATIVE BUSINESS MENTOR\n\n"
+
+_VAGUE_QUESTION_SECTION = """
 ## 🔍 VAGUE QUESTION RULE (GLOBAL)
 
 **If a user asks a vague question with no context, Tay AI MUST ask one clarifying question before giving advice.**
@@ -115,9 +59,8 @@ DO NOT give a full generic answer. Instead:
 
 **This prevents waffle answers and ensures specific, actionable advice.**
 """
-    
-    # User stage detection module
-    user_stage_detection_section = """
+
+_USER_STAGE_DETECTION_SECTION = """
 ## 🔒 USER STAGE DETECTION MODULE (MANDATORY)
 
 **Tay AI must silently classify the user into ONE of these buckets before answering:**
@@ -139,9 +82,8 @@ DO NOT give a full generic answer. Instead:
 
 **This ensures advice matches their actual stage, not assumptions.**
 """
-    
-    # Readiness check module
-    readiness_check_section = """
+
+_READINESS_CHECK_SECTION = """
 ## 🔒 READINESS CHECK MODULE (MANDATORY)
 
 **Before giving advice on:**
@@ -167,9 +109,8 @@ DO NOT give a full generic answer. Instead:
 
 **Never give execution plans (funnels, course outlines, launch strategies) if readiness isn't proven.**
 """
-    
-    # Mindset containment module
-    mindset_containment_section = """
+
+_MINDSET_CONTAINMENT_SECTION = """
 ## 🔒 MINDSET CONTAINMENT MODULE (MANDATORY)
 
 **Rules for handling emotional/victim mentality questions:**
@@ -193,29 +134,162 @@ DO NOT give a full generic answer. Instead:
 
 **This keeps responses practical and action-focused, not therapy sessions.**
 """
+
+
+@dataclass(frozen=True)
+class PersonaFragments:
+    """Persona sections pre-formatted for the system prompt."""
+    identity: str
+    rules: str
+    voice: str
+    structure: str
+    business: str
+    content: str
+    niche: str
+    product_rule: str
+    hair: str
+    biz_knowledge: str
+    banned: str
+    guardrails: str
+    low_confidence_response: str
+    example_response: str
+    
+    @classmethod
+    def compile(cls, persona: PersonaConfig) -> "PersonaFragments":
+        """Format every persona list/dict once."""
+        return cls(
+            identity=persona.identity,
+            rules=_format_list_as_bullets(persona.core_rules),
+            voice=_format_dict_as_bullets(persona.voice_style),
+            structure=_format_dict_as_bullets(persona.answer_structure),
+            business=_format_list_as_bullets(persona.business_rules),
+            content=_format_list_as_bullets(persona.content_rules),
+            niche=_format_list_as_bullets(persona.niche_rules),
+            product_rule=_format_dict_as_bullets(persona.product_recommendation_rule),
+            hair=_format_list_as_bullets(persona.hair_knowledge),
+            biz_knowledge=_format_list_as_bullets(persona.business_knowledge),
+            banned=", ".join(persona.banned_words),
+            guardrails=_format_list_as_bullets(persona.guardrails),
+            low_confidence_response=persona.low_confidence_response,
+            example_response=persona.example_response,
+        )
+
+
+# =============================================================================
+# System Prompt
+# =============================================================================
+
+def get_system_prompt(
+    persona: Optional[PersonaConfig] = None,
+    context_type: ConversationContext = ConversationContext.GENERAL,
+    include_rag_instructions: bool = True,
+    user_tier: Optional[str] = None,
+    kb_confidence: float = 1.0,  # Confidence score from RAG
+    user_profile: Optional[dict] = None  # User onboarding profile data
+) -> str:
+    """
+    Generate the system prompt for TayAI.
+    
+    Args:
+        kb_confidence: RAG retrieval confidence (0-1). Below 0.75 triggers clarifying mode.
+        user_profile: User onboarding profile data (name, business_type, focus, etc.)
+    """
+    # The low-confidence section quotes the score as a whole percentage, so
+    # that rendered percentage is the confidence band
+    confidence_label = f"{kb_confidence:.0%}" if kb_confidence < LOW_CONFIDENCE_THRESHOLD else None
+    
+    if persona is None or persona is DEFAULT_PERSONA:
+        body = _default_prompt_body(context_type, confidence_label, include_rag_instructions)
+    else:
+        body = _render_prompt_body(
+            PersonaFragments.compile(persona), context_type, confidence_label, include_rag_instructions
+        )
+    
+    return _PROMPT_HEADER + _format_user_context(user_profile) + body
+
+
+def get_persona_core_prompt(include_rag_instructions: bool = True) -> str:
+    """
+    The static part of the default system prompt.
+    
+    Used by the prefix-cache message layout: the context mode, confidence
+    and user blocks are sent as later messages (see get_context_mode_prompt,
+    get_confidence_mode_prompt, get_user_context_prompt), so this prefix
+    is byte-identical for every user and request.
+    """
+    return _PROMPT_HEADER + _default_prompt_body(ConversationContext.GENERAL, None, include_rag_instructions)
+
+
+def get_context_mode_prompt(context_type: ConversationContext) -> str:
+    """Context-specific instructions (empty for general questions)."""
+    return _get_context_instructions(context_type)
+
+
+def get_confidence_mode_prompt(kb_confidence: float) -> str:
+    """Low confidence mode instructions (empty above the threshold)."""
+    if kb_confidence >= LOW_CONFIDENCE_THRESHOLD:
+        return ""
+    return _render_confidence_section(_DEFAULT_FRAGMENTS, f"{kb_confidence:.0%}")
+
+
+def get_user_context_prompt(user_profile: Optional[dict]) -> str:
+    """Per-user personalization block (empty without onboarding data)."""
+    return _format_user_context(user_profile)
+
+
+def get_conversation_summary_prompt(summary: Optional[str]) -> str:
+    """Summary of the conversation's earlier turns (empty without one)."""
+    if not summary:
+        return ""
+    return (
+        "EARLIER IN THIS CONVERSATION (summary of turns no longer shown):\n"
+        f"{summary}"
+    )
+
+
+@lru_cache(maxsize=SYSTEM_PROMPT_CACHE_SIZE)
+def _default_prompt_body(
+    context_type: ConversationContext,
+    confidence_label: Optional[str],
+    include_rag_instructions: bool
+) -> str:
+    """Rendered prompt body for the default persona (memoized)."""
+    return _render_prompt_body(_DEFAULT_FRAGMENTS, context_type, confidence_label, include_rag_instructions)
+
+
+def _render_prompt_body(
+    fragments: PersonaFragments,
+    context_type: ConversationContext,
+    confidence_label: Optional[str],
+    include_rag_instructions: bool
+) -> str:
+    """Render everything after the user context block."""
+    # Context-specific section
+    context_section = _get_context_instructions(context_type)
+    
+    # Low confidence mode
+    confidence_section = _render_confidence_section(fragments, confidence_label)
     
     # RAG section
     rag_section = _get_rag_instructions() if include_rag_instructions else ""
     
-    return f"""# TAY AI - AUTHORITATIVE BUSINESS MENTOR
+    return f"""
 
-{user_context_section}
+{_VAGUE_QUESTION_SECTION}
 
-{vague_question_section}
+{_USER_STAGE_DETECTION_SECTION}
 
-{user_stage_detection_section}
+{_READINESS_CHECK_SECTION}
 
-{readiness_check_section}
+{_MINDSET_CONTAINMENT_SECTION}
 
-{mindset_containment_section}
-
-{persona.identity}
+{fragments.identity}
 
 ## CORE RULES (NON-NEGOTIABLE)
-{rules}
+{fragments.rules}
 
 ## YOUR VOICE
-{voice}
+{fragments.voice}
 
 ## RESPONSE FORMATTING (CRITICAL - FOLLOW CHATGPT STYLE)
 You MUST format all responses using ChatGPT's visual formatting approach:
@@ -255,44 +329,44 @@ You MUST format all responses using ChatGPT's visual formatting approach:
 **IMPORTANT:** Always format responses this way. Even short answers should use bullet points and bold text for emphasis.
 
 ## ANSWER STRUCTURE (Follow This Order)
-{structure}
+{fragments.structure}
 
 ## 🚫 BANNED WORDS - NEVER USE THESE
-{banned}
+{fragments.banned}
 
 If you catch yourself using these words, REWRITE the sentence.
 Exception: "luxury" is allowed ONLY when discussing pricing/positioning.
 {confidence_section}
 ## BUSINESS ADVICE RULES
-{business}
+{fragments.business}
 
 ## CAPTION/CONTENT RULES
 When writing captions, scripts, or content:
-{content}
+{fragments.content}
 
 ## NICHE/POSITIONING ADVICE
-{niche}
+{fragments.niche}
 
 ## 🎓 DIGITAL PRODUCTS / CLASSES / MENTORSHIP RULE (GLOBAL)
-{product_rule}
+{fragments.product_rule}
 
 ## VERIFIED HAIR KNOWLEDGE
-{hair}
+{fragments.hair}
 
 ## VERIFIED BUSINESS KNOWLEDGE
-{biz_knowledge}
+{fragments.biz_knowledge}
 {context_section}
 {rag_section}
 ## EXAMPLE OF YOUR VOICE
 
 Here's how you should sound:
 
-"{persona.example_response}"
+"{fragments.example_response}"
 
 Notice: Direct. Opinionated. Actionable. No fluff. Takes a clear stance.
 
 ## BOUNDARIES
-{guardrails}
+{fragments.guardrails}
 
 ## 🔒 GLOBAL ENFORCEMENT & OFFER ROUTING RULE
 (Authority Protection + Smart Redirection)
@@ -481,7 +555,89 @@ Ask yourself:
 You are NOT a generic assistant. You are Tay's judgment, standards, and experience at scale."""
 
 
-def detect_instagram_intent(message: str) -> bool:
+def _render_confidence_section(fragments: PersonaFragments, confidence_label: Optional[str]) -> str:
+    """Low confidence mode instructions (empty when confidence is high)."""
+    if confidence_label is None:
+        return ""
+    return f"""
+## ⚠️ LOW CONFIDENCE MODE ACTIVATED
+
+Your knowledge base match confidence is LOW ({confidence_label}).
+DO NOT give a full generic answer. Instead:
+1. Acknowledge what they're asking about
+2. Ask 1-2 clarifying questions to understand their specific situation
+3. Say: "I want to give you the right guidance here. Can you tell me more about [specific aspect]?"
+
+{fragments.low_confidence_response}
+"""
+
+
+def _format_user_context(user_profile: Optional[dict]) -> str:
+    """Build the per-user context block from onboarding profile data."""
+    if not user_profile or not user_profile.get("onboarding"):
+        return ""
+    
+    onboarding = user_profile["onboarding"]
+    fields = [
+        ("user_name", "Name"),
+        ("business_type", "Business Type"),
+        ("focus", "Main Focus"),
+        ("primary_struggle", "Primary Challenge"),
+        ("goals", "Goals"),
+        ("experience_level", "Experience Level"),
+        ("preferred_communication_style", "Communication Style"),
+    ]
+    details = "".join(
+        f"• **{label}**: {onboarding[key]}\n"
+        for key, label in fields
+        if onboarding.get(key)
+    )
+    return (
+        "\n## 👤 USER CONTEXT\n\n"
+        "Use this information to personalize your responses:\n\n"
+        f"{details}"
+        "\n**Use this context to:**\n"
+        "• Address them by name when appropriate\n"
+        "• Tailor advice to their specific business type and focus\n"
+        "• Reference their goals and challenges when relevant\n"
+        "• Match their preferred communication style\n"
+        "• Provide context-appropriate guidance based on their experience level\n\n"
+    )
+
+
+# Keywords that trigger the Instagram Intelligence prompt
+INSTAGRAM_KEYWORDS = [
+    # Captions
+    "instagram caption", "instagram captions", "caption for", "write a caption",
+    "caption structure", "strong caption", "what makes a strong caption",
+    "improve my captions", "caption help", "caption advice",
+
+    # Content/Reels
+    "instagram content", "reels", "reel", "instagram reel", "instagram reels",
+    "content for instagram", "instagram post", "instagram posts",
+
+    # Strategy
+    "instagram strategy", "instagram marketing", "instagram growth",
+    "instagram reach", "instagram engagement", "instagram algorithm",
+    "instagram 2025", "instagram 2026", "instagram update", "algorithm changes",
+
+    # Hooks/Hashtags
+    "hooks", "hook", "hashtags", "hashtag", "instagram hashtags",
+    "what hashtags", "hashtag strategy",
+
+    # Performance
+    "reach", "engagement", "saves", "shares", "why my reach dropped",
+    "content not performing", "reels not doing well",
+
+    # General Instagram help
+    "instagram help", "instagram tips", "instagram best practices",
+    "instagram advice", "how to use instagram", "instagram for business"
+]
+
+_INSTAGRAM_MATCHER = KeywordMatcher({"instagram": INSTAGRAM_KEYWORDS})
+
+
+def detect_instagram_intent(message: str, hits: Optional[KeywordHits] = None) -> bool:
     """
     Detect if the user's message is Instagram-related.
     
@@ -490,43 +646,17 @@ def detect_instagram_intent(message: str) -> bool:
     
     Args:
         message: The user's message text
+        hits: Keyword scan of the message, if one covering the "instagram"
+            set (INSTAGRAM_KEYWORDS) was already made
     
     Returns:
         True if Instagram-related intent detected, False otherwise
     """
-    message_lower = message.lower()
-    
-    # Comprehensive Instagram-related keywords
-    instagram_keywords = [
-        # Captions
-        "instagram caption", "instagram captions", "caption for", "write a caption",
-        "caption structure", "strong caption", "what makes a strong caption",
-        "improve my captions", "caption help", "caption advice",
-        
-        # Content/Reels
-        "instagram content", "reels", "reel", "instagram reel", "instagram reels",
-        "content for instagram", "instagram post", "instagram posts",
-        
-        # Strategy
-        "instagram strategy", "instagram marketing", "instagram growth",
-        "instagram reach", "instagram engagement", "instagram algorithm",
-        "instagram 2025", "instagram 2026", "instagram update", "algorithm changes",
-        
-        # Hooks/Hashtags
-        "hooks", "hook", "hashtags", "hashtag", "instagram hashtags",
-        "what hashtags", "hashtag strategy",
-        
-        # Performance
-        "reach", "engagement", "saves", "shares", "why my reach dropped",
-        "content not performing", "reels not doing well",
-        
-        # General Instagram help
-        "instagram help", "instagram tips", "instagram best practices",
-        "instagram advice", "how to use instagram", "instagram for business"
-    ]
+    if hits is None:
+        hits = _INSTAGRAM_MATCHER.scan(message)
     
     # Check if any Instagram keyword is present
-    return any(keyword in message_lower for keyword in instagram_keywords)
+    return hits.any("instagram")
 
 
 def get_instagram_intelligence_prompt() -> str:
@@ -824,3 +954,7 @@ When NO KB content is provided:
 2. For specific TaysLuxe questions, say you don't have that info
 3. Ask clarifying questions rather than guessing
 """
+
+
+# Compiled once at import; the default persona is immutable at runtime
+_DEFAULT_FRAGMENTS = PersonaFragments.compile(DEFAULT_PERSONA)
@@ -8,6 +8,8 @@ from dataclasses import dataclass
 from typing import List, Dict, Optional
 import re
 
+from app.utils.keywords import KeywordHits, KeywordMatcher
+
 
 @dataclass
 class Recipe:
@@ -2440,29 +2442,16 @@ ALL_RECIPES = [
 # RECIPE DETECTION
 # =============================================================================
 
-def detect_recipe(message: str) -> Optional[Recipe]:
-    """
-    Detect which recipe should be used based on the user's message.
-    Returns the matching recipe or None if no specific recipe matches.
-    
-    Priority: 
-    - Content Intelligence & Audit takes precedence for content performance/video audit questions
-    - Wig & Hair Product E-Commerce takes precedence for Shopify, wig sales, e-commerce questions
-    - Instagram Intelligence takes precedence over general captions recipe when Instagram-specific keywords are detected
-    """
-    message_lower = message.lower()
-    
-    # Check for content performance/audit keywords first (highest priority)
-    content_audit_keywords = [
+# Context keywords that boost specific recipes in detect_recipe
+RECIPE_CONTEXT_KEYWORDS: Dict[str, List[str]] = {
+    # Content performance / video audit (highest priority)
+    "content_audit": [
         "content performance", "reels not doing well", "video audit", "content audit",
         "my content isn't doing well", "my reel didn't do well", "content hasn't been doing",
         "video not performing", "reel performance", "audit my content", "why isn't my content working"
-    ]
-    
-    has_content_audit_context = any(kw in message_lower for kw in content_audit_keywords)
-    
-    # Check for advanced sales/funnels/scale keywords (second priority - advanced execution)
-    advanced_sales_funnels_keywords = [
+    ],
+    # Advanced sales / funnels / scale (second priority)
+    "advanced_sales_funnels": [
         "sales copy", "writing sales pages", "content funnels", "sales funnels",
         "converting audience to buyers", "email marketing strategy", "launch strategy",
         "when to outsource", "hiring VAs", "hiring editors", "hiring OBMs", "hiring virtual assistant",
@@ -2470,62 +2459,82 @@ def detect_recipe(message: str) -> Optional[Recipe]:
         "how do i sell without sounding salesy", "sales funnel", "funnel strategy",
         "conversion strategy", "email funnel", "sales page", "landing page",
         "outsource", "delegation", "hiring help", "scaling business", "growth systems"
-    ]
-    
-    has_advanced_sales_funnels_context = any(kw in message_lower for kw in advanced_sales_funnels_keywords)
-    
-    # Check for advanced service provider keywords (third priority - booked-out, educator stage)
-    advanced_stylist_keywords = [
+    ],
+    # Advanced service provider: booked-out, educator stage
+    "advanced_stylist": [
         "i'm fully booked", "fully booked", "booked out", "want more income than just services",
         "want passive income", "want to teach", "want to release a course", "want to create a digital product",
         "want to monetise my knowledge", "want to monetize my knowledge", "want to build a community",
         "scaling beyond services", "moving beyond services", "educator stage", "passive income stage",
         "teaching other stylists", "creating a course", "digital product", "monetising knowledge",
         "building authority", "positioning as expert", "community building", "advanced service provider"
-    ]
-    
-    has_advanced_stylist_context = any(kw in message_lower for kw in advanced_stylist_keywords)
-    
-    # Check for beginner service provider keywords (third priority)
-    beginner_stylist_keywords = [
+    ],
+    # Beginner service provider
+    "beginner_stylist": [
         "filling bookings", "getting clients", "being new as a hairstylist", "new hairstylist",
         "beginner hairstylist", "just starting out", "struggling with bookings", "no clients",
         "empty calendar", "starting my hair business", "home salon", "bedroom setup",
         "kitchen setup", "first clients", "building clientele", "beginner stylist",
         "new stylist", "early stage", "building foundations", "service provider beginner"
-    ]
-    
-    has_beginner_stylist_context = any(kw in message_lower for kw in beginner_stylist_keywords)
-    
-    # Check for e-commerce/wig business keywords (third priority)
-    ecommerce_keywords = [
+    ],
+    # E-commerce / wig business
+    "ecommerce": [
         "selling wigs", "selling bundles", "wig e-commerce", "shopify", "wig sales",
         "my wig sales are down", "my restock flopped", "my website isn't converting",
         "can you audit my shopify store", "wig brand", "hair business", "e-commerce",
         "restocks", "drops", "black friday", "refunds", "returns", "chargebacks"
-    ]
-    
-    has_ecommerce_context = any(kw in message_lower for kw in ecommerce_keywords)
-    
-    # Check for Instagram-specific keywords (third priority)
-    instagram_keywords = [
+    ],
+    # Instagram-specific
+    "instagram": [
         "instagram captions", "instagram caption", "instagram strategy", 
         "instagram 2025", "instagram 2026", "algorithm changes", "reach dropped",
         "what makes a strong caption", "strong captions", "instagram update"
-    ]
+    ],
+}
+
+
+def _recipe_keyword_sets() -> Dict[tuple, List[str]]:
+    """Keyword sets used by detect_recipe, keyed for KeywordMatcher."""
+    sets = {("recipe_context", name): keywords for name, keywords in RECIPE_CONTEXT_KEYWORDS.items()}
+    for recipe in ALL_RECIPES:
+        sets[("recipe", recipe.name)] = [trigger.lower() for trigger in recipe.triggers]
+    return sets
+
+
+RECIPE_KEYWORD_SETS = _recipe_keyword_sets()
+_RECIPE_MATCHER = KeywordMatcher(RECIPE_KEYWORD_SETS)
+
+
+def detect_recipe(message: str, hits: Optional[KeywordHits] = None) -> Optional[Recipe]:
+    """
+    Detect which recipe should be used based on the user's message.
+    Returns the matching recipe or None if no specific recipe matches.
+    
+    Priority: 
+    - Content Intelligence & Audit takes precedence for content performance/video audit questions
+    - Wig & Hair Product E-Commerce takes precedence for Shopify, wig sales, e-commerce questions
+    - Instagram Intelligence takes precedence over general captions recipe when Instagram-specific keywords are detected
+    
+    hits may be a keyword scan of the message that already covers
+    RECIPE_KEYWORD_SETS; otherwise the message is scanned here.
+    """
+    if hits is None:
+        hits = _RECIPE_MATCHER.scan(message)
     
-    has_instagram_context = any(kw in message_lower for kw in instagram_keywords)
+    has_content_audit_context = hits.any(("recipe_context", "content_audit"))
+    has_advanced_sales_funnels_context = hits.any(("recipe_context", "advanced_sales_funnels"))
+    has_advanced_stylist_context = hits.any(("recipe_context", "advanced_stylist"))
+    has_beginner_stylist_context = hits.any(("recipe_context", "beginner_stylist"))
+    has_ecommerce_context = hits.any(("recipe_context", "ecommerce"))
+    has_instagram_context = hits.any(("recipe_context", "instagram"))
     
     # Score each recipe based on trigger matches
     best_match = None
     best_score = 0
     
     for recipe in ALL_RECIPES:
-        score = 0
-        for trigger in recipe.triggers:
-            if trigger.lower() in message_lower:
-                # Longer triggers are more specific, so weight them higher
-                score += len(trigger.split())
+        # Longer triggers are more specific, so weight them higher
+        score = sum(len(trigger.split()) for trigger in hits.matched(("recipe", recipe.name)))
         
         # Boost Content Intelligence recipe if content audit context detected (highest priority)
         if recipe.name == "CONTENT INTELLIGENCE & AUDIT (Instagram Reels 2025-2026)" and has_content_audit_context:
@@ -4,7 +4,7 @@ Database Query Helpers
 Common query patterns and optimizations to reduce duplication.
 """
 from typing import Optional, TypeVar, Type, List
-from sqlalchemy import select, func, desc, asc
+from sqlalchemy import select, func, desc, asc, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
@@ -120,3 +120,38 @@ async def count_records(
     
     result = await db.execute(query)
     return result.scalar() or 0
+
+
+async def trigger_exists(db: AsyncSession, table: str, trigger_name: str) -> bool:
+    """
+    Check whether a trigger is installed on a table (catalog lookup only).
+    
+    Used to decide whether trigger-maintained counters can be trusted.
+    """
+    result = await db.execute(
+        text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgrelid = to_regclass(:table) AND tgname = :trigger_name
+            )
+        """),
+        {"table": table, "trigger_name": trigger_name}
+    )
+    return bool(result.scalar())
+
+
+async def estimate_row_count(db: AsyncSession, table: str) -> int:
+    """
+    Planner row estimate for a table from pg_class.reltuples.
+    
+    Constant time regardless of table size; accurate as of the last
+    VACUUM/ANALYZE. Returns 0 for unknown or never-analyzed tables.
+    """
+    result = await db.execute(
+        text("""
+            SELECT GREATEST(reltuples, 0)::bigint
+            FROM pg_class WHERE oid = to_regclass(:table)
+        """),
+        {"table": table}
+    )
+    return int(result.scalar() or 0)
@@ -0,0 +1,163 @@
+"""
+Resumable Streams
+
+Buffers a streamed chat answer in Redis, so a client that lost its
+connection can reconnect (to any worker) with Last-Event-ID, get the
+events it missed and follow the live generation, instead of sending
+the message again:
+- events: a Redis stream of encoded SSE frames with entry IDs 0-<seq>,
+  capped at CHAT_STREAM_MAX_EVENTS and expiring CHAT_STREAM_TTL seconds
+  after the last event
+- meta: the owner of the answer
+- reader lease: renewed while a client reads; generation stops once no
+  client has read for STREAM_RESUME_GRACE_SECONDS
+- producer lease: renewed while generation runs, so readers can tell a
+  lost producer from a slow one
+
+Usage:
+    stream = await ResumableStream.create(user_id)
+    run_in_background("chat-stream", stream.publish(events), key=("chat-stream", stream.stream_id))
+    return StreamingResponse(stream.frames(after=last_event_id), ...)
+"""
+import logging
+import uuid
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
+
+from app.core.chat_events import ChatEvent, ChatEventType
+from app.core.clients import get_redis_client
+from app.core.config import settings
+from app.core.constants import (
+    CHAT_STREAM_MAX_EVENTS,
+    CHAT_STREAM_PRODUCER_TTL,
+    CHAT_STREAM_READ_BLOCK_MS,
+    CHAT_STREAM_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+_FINAL_TYPES = {ChatEventType.DONE.value.encode(), ChatEventType.ERROR.value.encode()}
+
+STREAM_LOST_MESSAGE = "This answer can no longer be resumed. Please send your message again."
+
+
+class ResumableStream:
+    """One streamed answer, written by its producer and read by any worker."""
+    
+    def __init__(self, stream_id: str):
+        self.stream_id = stream_id
+        self.redis = get_redis_client()
+        prefix = f"chat_stream:{stream_id}"
+        self._events_key = f"{prefix}:events"
+        self._meta_key = f"{prefix}:meta"
+        self._reader_key = f"{prefix}:reader"
+        self._producer_key = f"{prefix}:producer"
+    
+    @classmethod
+    async def create(cls, user_id: int) -> "ResumableStream":
+        """Register a new answer for user_id (raises if Redis is unavailable)."""
+        stream = cls(uuid.uuid4().hex)
+        pipe = stream.redis.pipeline(transaction=False)
+        pipe.hset(stream._meta_key, "user_id", user_id)
+        pipe.expire(stream._meta_key, CHAT_STREAM_TTL)
+        # The first reader attaches right after; until then generation may start
+        pipe.set(stream._reader_key, 1, ex=settings.STREAM_RESUME_GRACE_SECONDS)
+        pipe.set(stream._producer_key, 1, ex=CHAT_STREAM_PRODUCER_TTL)
+        await pipe.execute()
+        return stream
+    
+    async def owner(self) -> Optional[int]:
+        """The user the answer belongs to (None once it expired)."""
+        user_id = await self.redis.hget(self._meta_key, "user_id")
+        return int(user_id) if user_id is not None else None
+    
+    # -------------------------------------------------------------------------
+    # Producer
+    # -------------------------------------------------------------------------
+    
+    async def publish(self, events: AsyncIterator[ChatEvent]) -> None:
+        """
+        Append events as they are generated.
+        
+        Stops early, closing events (which cancels the upstream completion),
+        once no client has read for the grace period.
+        """
+        seq = 0
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    seq += 1
+                    pipe = self.redis.pipeline(transaction=False)
+                    pipe.xadd(
+                        self._events_key,
+                        {"type": event.type.value, "frame": event.to_sse(seq)},
+                        id=f"0-{seq}",
+                        maxlen=CHAT_STREAM_MAX_EVENTS,
+                    )
+                    pipe.expire(self._events_key, CHAT_STREAM_TTL)
+                    pipe.expire(self._meta_key, CHAT_STREAM_TTL)
+                    pipe.set(self._producer_key, 1, ex=CHAT_STREAM_PRODUCER_TTL)
+                    if event.is_final:
+                        pipe.hset(self._meta_key, "final_seq", seq)
+                    pipe.exists(self._reader_key)
+                    reading = (await pipe.execute())[-1]
+                    if not reading and not event.is_final:
+                        logger.info(
+                            f"[Stream {self.stream_id}] No reader for "
+                            f"{settings.STREAM_RESUME_GRACE_SECONDS}s; stopping generation"
+                        )
+                        break
+        finally:
+            try:
+                await self.redis.delete(self._producer_key)
+            except Exception as e:
+                logger.warning(f"[Stream {self.stream_id}] Could not release producer lease: {e}")
+    
+    # -------------------------------------------------------------------------
+    # Readers
+    # -------------------------------------------------------------------------
+    
+    async def frames(self, after: int = 0) -> AsyncIterator[bytes]:
+        """
+        SSE frames of the events after sequence number after, then the live
+        ones as they are generated, up to the final event.
+        
+        If events were lost (trimmed, expired, or the producer is gone
+        without finishing) an error event ends the stream.
+        """
+        last_id = f"0-{after}"
+        expected = after + 1
+        while True:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(self._reader_key, 1, ex=settings.STREAM_RESUME_GRACE_SECONDS)
+            pipe.xread({self._events_key: last_id}, count=100, block=CHAT_STREAM_READ_BLOCK_MS)
+            result = (await pipe.execute())[-1]
+            
+            if not result:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.exists(self._producer_key)
+                pipe.hget(self._meta_key, "final_seq")
+                producing, final_seq = await pipe.execute()
+                if final_seq is not None:
+                    if expected > int(final_seq):
+                        return  # Reconnected after the final event: nothing left to send
+                    continue
+                if not producing:
+                    yield self._lost_frame()
+                    return
+                continue
+            
+            for entry_id, fields in result[0][1]:
+                seq = int(entry_id.split(b"-")[1])
+                if seq != expected:
+                    yield self._lost_frame()
+                    return
+                expected = seq + 1
+                last_id = entry_id
+                yield fields[b"frame"]
+                if fields[b"type"] in _FINAL_TYPES:
+                    return
+    
+    def _lost_frame(self) -> bytes:
+        logger.info(f"[Stream {self.stream_id}] Events missing; reader cannot resume")
+        return ChatEvent(ChatEventType.ERROR, {"message": STREAM_LOST_MESSAGE, "resumable": False}).to_sse()
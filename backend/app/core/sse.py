@@ -0,0 +1,192 @@
+"""
+Server-Sent Events
+
+Encoding and pacing for streamed chat responses:
+- encode_event: one SSE frame as bytes, from pre-encoded envelopes and
+  orjson (when installed) for the payload
+- coalesce_chunks: merge small text deltas into fewer, larger chunks by
+  time window or size
+- with_heartbeat: comment frames while a stream is idle, so proxies keep
+  the connection open, and an early end when the client disconnects
+
+Usage:
+    chunks = coalesce_chunks(stream_deltas(), window=0.03, max_bytes=512)
+    return StreamingResponse(with_heartbeat(frames(chunks), 15), media_type="text/event-stream")
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Deque, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Comment frame: ignored by EventSource, but keeps idle connections alive
+HEARTBEAT_FRAME = b": ping\n\n"
+
+_FRAME_END = b"\n\n"
+_EVENT_PREFIXES: Dict[str, bytes] = {}
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _event_prefix(event_type: str) -> bytes:
+    prefix = _EVENT_PREFIXES.get(event_type)
+    if prefix is None:
+        prefix = _EVENT_PREFIXES[event_type] = f"event: {event_type}\ndata: ".encode()
+    return prefix
+
+
+def encode_event(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """Encode one SSE event frame (with an id line if event_id is given)."""
+    frame = _event_prefix(event_type) + dumps(data) + _FRAME_END
+    if event_id is not None:
+        return b"id: %d\n" % event_id + frame
+    return frame
+
+
+async def _close(source: AsyncIterator, pending: Optional[asyncio.Task]) -> None:
+    """Stop a source early: cancel its in-flight item, then close it."""
+    if pending is not None and not pending.done():
+        pending.cancel()
+        try:
+            await pending
+        except (asyncio.CancelledError, Exception):
+            pass
+    aclose = getattr(source, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+class _Failed:
+    """The source of coalesce_chunks raised error."""
+    
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_END = object()
+
+
+async def coalesce_chunks(
+    items: AsyncIterator[Tuple[str, Any]],
+    window: float,
+    max_bytes: int
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Merge consecutive ("chunk", text) items.
+    
+    Buffered text is released once max_bytes are waiting or window
+    seconds after its first delta arrived, whichever comes first. Any
+    other item releases the buffer first and passes through unchanged,
+    so ordering is kept.
+    
+    The source is read by one pump task that does the merging, with the
+    window as a loop timer, so the consumer only wakes once per merged
+    chunk. Closing the result cancels the pump, which raises
+    CancelledError inside the source.
+    """
+    loop = asyncio.get_running_loop()
+    ready: Deque = deque()
+    wakeup = asyncio.Event()
+    buffer: List[str] = []
+    size = 0
+    timer: Optional[asyncio.TimerHandle] = None
+    
+    def release() -> None:
+        nonlocal size, timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        if buffer:
+            ready.append(("chunk", "".join(buffer)))
+            buffer.clear()
+            size = 0
+            wakeup.set()
+    
+    async def pump() -> None:
+        nonlocal size, timer
+        try:
+            async for kind, content in items:
+                if kind != "chunk":
+                    release()
+                    ready.append((kind, content))
+                    wakeup.set()
+                    continue
+                if not buffer:
+                    timer = loop.call_later(window, release)
+                buffer.append(content)
+                size += len(content.encode())
+                if size >= max_bytes:
+                    release()
+        except Exception as e:
+            release()
+            ready.append(_Failed(e))
+        finally:
+            release()
+            ready.append(_END)
+            wakeup.set()
+    
+    reader = asyncio.ensure_future(pump())
+    try:
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            while ready:
+                item = ready.popleft()
+                if item is _END:
+                    return
+                if isinstance(item, _Failed):
+                    raise item.error
+                yield item
+    finally:
+        if not reader.done():
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+        if timer is not None:
+            timer.cancel()
+
+
+async def with_heartbeat(
+    frames: AsyncIterator[bytes],
+    interval: float,
+    until: Optional[Awaitable] = None
+) -> AsyncIterator[bytes]:
+    """
+    Pass frames through, adding a heartbeat after each interval seconds without one.
+    
+    If until completes first (e.g. it waits for the client to disconnect),
+    the stream ends there and frames is closed, cancelling the item it was
+    producing.
+    """
+    pending = None
+    stop = asyncio.ensure_future(until) if until is not None else None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(frames.__anext__())
+            waiting = {pending} if stop is None else {pending, stop}
+            done, _ = await asyncio.wait(waiting, timeout=interval, return_when=asyncio.FIRST_COMPLETED)
+            if stop in done and pending not in done:
+                break
+            if not done:
+                yield HEARTBEAT_FRAME
+                continue
+            try:
+                frame = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+            yield frame
+    finally:
+        if stop is not None:
+            stop.cancel()
+        await _close(frames, pending)
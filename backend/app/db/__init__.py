@@ -15,8 +15,15 @@ from app.db.models import (
     UsageTracking,
     KnowledgeBase,
     VectorEmbedding,
+    VectorIndexState,
+    VectorIndexStats,
+    KnowledgeBaseCategoryStats,
+    ResponseCacheEntry,
     MissingKBItem,
     QuestionLog,
+    QuestionCluster,
+    QuestionEmbedding,
+    QuestionClusterDaily,
 )
 from app.core.constants import UserTier
 
@@ -33,6 +40,13 @@ __all__ = [
     "UsageTracking",
     "KnowledgeBase",
     "VectorEmbedding",
+    "VectorIndexState",
+    "VectorIndexStats",
+    "KnowledgeBaseCategoryStats",
+    "ResponseCacheEntry",
     "MissingKBItem",
     "QuestionLog",
+    "QuestionCluster",
+    "QuestionEmbedding",
+    "QuestionClusterDaily",
 ]
@@ -1,7 +1,10 @@
 """
 Database models
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Enum as SQLEnum, JSON
+from sqlalchemy import (
+    Column, Integer, String, DateTime, Date, Boolean, Text, Float, LargeBinary, Index,
+    Enum as SQLEnum, JSON,
+)
 from sqlalchemy.sql import func
 from datetime import datetime
 
@@ -50,6 +53,8 @@ class Conversation(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)
     title = Column(String(500), nullable=True)  # First message truncated
+    summary = Column(Text, nullable=True)  # Rolling summary of the older turns
+    summary_message_id = Column(Integer, nullable=True)  # Last chat_messages.id folded into summary
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -64,7 +69,13 @@ class ChatMessage(Base):
     message = Column(Text, nullable=False)
     response = Column(Text, nullable=True)
     tokens_used = Column(Integer, default=0)
+    is_truncated = Column(Boolean, default=False)  # Stream stopped when the client disconnected
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Newest turns of a conversation (conversation memory fallback)
+        Index("ix_chat_messages_conversation_recent", "conversation_id", "id"),
+    )
 
 
 class UsageTracking(Base):
@@ -113,6 +124,59 @@ class VectorEmbedding(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class VectorIndexState(Base):
+    """Single-row bookkeeping for the live vector index generation"""
+    __tablename__ = "vector_index_state"
+    
+    id = Column(Integer, primary_key=True)  # Always 1
+    generation = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every blue/green swap
+    kb_version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every live KB content write
+    build_started_at = Column(DateTime(timezone=True), nullable=True)  # Set while a shadow build runs
+    last_reindex_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class VectorIndexStats(Base):
+    """Per-namespace vector counts, maintained by triggers on vector_embeddings"""
+    __tablename__ = "vector_index_stats"
+    
+    namespace = Column(String, primary_key=True)  # NULL namespaces are counted as "default"
+    vector_count = Column(Integer, nullable=False, default=0)
+
+
+class KnowledgeBaseCategoryStats(Base):
+    """Per-category item counts, maintained by a trigger on knowledge_base"""
+    __tablename__ = "knowledge_base_category_stats"
+    
+    category = Column(String, primary_key=True)  # NULL categories are counted as ""
+    total_count = Column(Integer, nullable=False, default=0)
+    active_count = Column(Integer, nullable=False, default=0)
+
+
+class ResponseCacheEntry(Base):
+    """Semantic response cache entry (see SemanticCacheService)"""
+    __tablename__ = "response_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Note: embedding column is vector(1536) in database, added by migration and used via raw SQL
+    context_type = Column(String, nullable=False)
+    recipe = Column(String, nullable=False, default="")  # Detected recipe name, "" for none
+    instagram = Column(Boolean, nullable=False, default=False)  # Instagram prompt was injected
+    user_tier = Column(String, nullable=False, default="")
+    kb_version = Column(Integer, nullable=False)
+    question = Column(Text, nullable=False)
+    response = Column(Text, nullable=False)
+    sources = Column(JSON, nullable=True)
+    kb_confidence = Column(Float, nullable=True)
+    tokens_used = Column(Integer, default=0)  # Tokens the original completion cost
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        Index("ix_response_cache_key", "context_type", "recipe", "instagram", "user_tier", "kb_version"),
+    )
+
+
 class MissingKBItem(Base):
     """Track missing knowledge base items detected by Tay AI"""
     __tablename__ = "missing_kb_items"
@@ -126,6 +190,7 @@ class MissingKBItem(Base):
     is_resolved = Column(Boolean, default=False, index=True)  # Whether KB item was added
     resolved_at = Column(DateTime(timezone=True), nullable=True)
     resolved_by_kb_id = Column(Integer, nullable=True)  # KB item ID that resolved this
+    question_embedding = Column(LargeBinary, nullable=True)  # float32 blob, cached for auto-resolution
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Additional metadata (JSON)
@@ -138,14 +203,49 @@ class QuestionLog(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)
-    question = Column(Text, nullable=False, index=True)  # User's question
+    question = Column(Text, nullable=False)  # User's question
     normalized_question = Column(String, nullable=True, index=True)  # Normalized for grouping
     context_type = Column(String, nullable=True, index=True)  # Type of conversation context
     category = Column(String, nullable=True, index=True)  # Detected category
     user_tier = Column(String, nullable=True, index=True)  # User's tier at time of question
     tokens_used = Column(Integer, default=0)
     has_sources = Column(Boolean, default=False)  # Whether RAG found relevant sources
+    cluster_id = Column(Integer, nullable=True, index=True)  # QuestionCluster, set by the clustering job
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Additional metadata (JSON)
     extra_metadata = Column(JSON, nullable=True)  # Store RAG scores, sources count, etc. (renamed from 'metadata' - reserved)
+
+
+class QuestionCluster(Base):
+    """Group of paraphrased questions, built from question embeddings"""
+    __tablename__ = "question_clusters"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    centroid = Column(LargeBinary, nullable=False)  # Unit-length float32 vector
+    size = Column(Integer, nullable=False, default=0)
+    representative_log_id = Column(Integer, nullable=True)  # QuestionLog closest to the centroid
+    representative_question = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class QuestionEmbedding(Base):
+    """Embedding of a logged question (float32 blob; no pgvector required)"""
+    __tablename__ = "question_embeddings"
+    
+    question_log_id = Column(Integer, primary_key=True)
+    cluster_id = Column(Integer, nullable=False, index=True)
+    embedding = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class QuestionClusterDaily(Base):
+    """Per-cluster, per-day question counts backing the top-questions stats"""
+    __tablename__ = "question_cluster_daily"
+    
+    cluster_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    count = Column(Integer, nullable=False, default=0)
+    first_asked = Column(DateTime(timezone=True), nullable=False)
+    last_asked = Column(DateTime(timezone=True), nullable=False)
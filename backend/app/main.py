@@ -21,8 +21,13 @@ from fastapi.exceptions import RequestValidationError
 from app.core.config import settings
 from app.core.exceptions import TayAIError, to_http_exception
 from app.api.v1.router import api_router
+from app.core.background import start_periodic_task, stop_background_tasks
+from app.core.clients import reset_clients
+from app.core.http import close_http_clients, open_http_clients
 from app.db.database import init_db
 from app.middleware import RateLimitMiddleware
+from app.services.question_clustering_service import run_question_clustering
+from app.services.chat_service import question_log_writer
 
 # Configure logging
 logging.basicConfig(
@@ -54,9 +59,24 @@ async def lifespan(app: FastAPI):
         logger.error(f"Database initialization failed: {e}")
         raise
     
+    open_http_clients()
+    question_log_writer.start()
+    
+    if settings.QUESTION_CLUSTERING_INTERVAL_SECONDS > 0:
+        start_periodic_task(
+            "question-clustering",
+            run_question_clustering,
+            settings.QUESTION_CLUSTERING_INTERVAL_SECONDS,
+            initial_delay=60
+        )
+    
     yield
     # Shutdown
     logger.info("Shutting down TayAI API...")
+    await stop_background_tasks()
+    await question_log_writer.stop()
+    await close_http_clients()
+    reset_clients()
 
 
 # =============================================================================
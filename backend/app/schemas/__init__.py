@@ -36,6 +36,7 @@ from .chat import (
     ConversationMessage,
     ChatRequest,
     ChatResponse,
+    TokenUsageInfo,
     ChatHistoryResponse,
     SourceInfo,
     PersonaTestRequest,
@@ -99,6 +100,7 @@ __all__ = [
     "ConversationMessage",
     "ChatRequest",
     "ChatResponse",
+    "TokenUsageInfo",
     "ChatHistoryResponse",
     "SourceInfo",
     "PersonaTestRequest",
@@ -17,6 +17,7 @@ class ChatMessage(BaseModel):
     message: str
     response: Optional[str] = None
     tokens_used: int = 0
+    is_truncated: bool = False
     created_at: Optional[datetime] = None
     
     class Config:
@@ -62,13 +63,23 @@ class SourceInfo(BaseModel):
     chunk_id: str
 
 
+class TokenUsageInfo(BaseModel):
+    """Prompt/completion token split of a chat turn."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0  # Prompt tokens served from the provider's prompt cache
+    estimated: bool = False  # Counted locally where the provider reported no usage
+
+
 class ChatResponse(BaseModel):
     """Response from chat endpoint."""
     response: str
     tokens_used: int
+    usage: Optional[TokenUsageInfo] = None
     message_id: Optional[int] = None
     conversation_id: Optional[int] = None  # Session: use for subsequent messages
     sources: Optional[List[SourceInfo]] = None
+    cached: bool = False  # Served from the semantic response cache
 
 
 class ChatHistoryResponse(BaseModel):
@@ -84,7 +95,7 @@ class ConversationSummary(BaseModel):
     title: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
-
+    
     class Config:
         from_attributes = True
 
@@ -108,5 +119,7 @@ class PersonaTestResponse(BaseModel):
     response: str
     tokens_used: int
     context_type: str
+    route: Optional[str] = None
+    model: Optional[str] = None
     sources: List[Dict[str, Any]]
     system_prompt_preview: str
@@ -101,6 +101,13 @@ class KnowledgeStats(BaseModel):
     categories: List[Dict[str, Any]]
     vector_count: int
     index_dimension: int
+    vector_counts_exact: bool = False  # False when vector_count is a planner estimate
+    namespaces: Dict[str, int] = {}
+    index_size_bytes: Optional[int] = None
+    table_size_bytes: Optional[int] = None
+    index_generation: Optional[int] = None
+    last_reindex_at: Optional[datetime] = None
+    reindex_in_progress: bool = False
 
 
 class ReindexResponse(BaseModel):
@@ -103,7 +103,7 @@ class MissingKBStats(BaseModel):
 class QuestionStats(BaseModel):
     """Statistics about questions."""
     total_questions: int
-    top_questions: List[Dict[str, Any]]  # [{question, count, first_asked, last_asked}]
+    top_questions: List[Dict[str, Any]]  # [{cluster_id, question, count, first_asked, last_asked}]
     by_category: Dict[str, int]
     by_context_type: Dict[str, int]
     recent_questions: List[QuestionLog]
@@ -128,6 +128,7 @@ class MissingKBExport(BaseModel):
 class QuestionExport(BaseModel):
     """Export format for questions."""
     id: int
+    cluster_id: Optional[int] = None
     question: str
     normalized_question: Optional[str]
     category: Optional[str]
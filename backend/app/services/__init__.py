@@ -18,6 +18,11 @@ from .base import BaseService
 from .chat_service import ChatService
 from .rag_service import RAGService, ChunkConfig, RetrievalResult, ContextResult
 from .knowledge_service import KnowledgeService
+from .semantic_cache_service import SemanticCacheService
+from .conversation_memory_service import ConversationMemoryService
+from .conversation_summary_service import ConversationSummaryService
+from .question_clustering_service import QuestionClusteringService
+from .missing_kb_service import MissingKBService
 from .usage_service import UsageService
 from .user_service import UserService
 from .membership_service import MembershipService, MembershipPlatform, MembershipEvent
@@ -29,7 +34,12 @@ __all__ = [
     "ChatService",
     "RAGService",
     "KnowledgeService",
+    "SemanticCacheService",
     # Supporting services
+    "ConversationMemoryService",
+    "ConversationSummaryService",
+    "QuestionClusteringService",
+    "MissingKBService",
     "UsageService",
     "UserService",
     "MembershipService",
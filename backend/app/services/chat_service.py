@@ -8,16 +8,27 @@ Handles:
 4. Storing chat messages
 5. Streaming responses via SSE
 """
+import asyncio
 import logging
-import json
-from typing import List, Dict, Optional, AsyncGenerator
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, AsyncGenerator, Tuple, Union
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, delete
 
 from app.core.config import settings
-from app.core.clients import get_openai_client
-from app.core.performance import cache_result, measure_performance, optimize_query
+from app.core.exceptions import CircuitOpenError, ServerBusyError
+from app.core.llm_gateway import llm_gateway
+from app.core.llm_scheduler import llm_scheduler
+from app.core.model_routing import RoutedModel, RoutingSignals, model_router
+from app.core.performance import cache_client, cache_result, measure_performance, optimize_query
+from app.core.metrics import StageTimer, TokenUsage
+from app.core.banned_words import BannedWordScanner
+from app.core.background import run_in_background
+from app.core.batch_writer import BatchWriter
+from app.core.sse import coalesce_chunks
+from app.core.chat_events import ChatEvent, ChatEventType
 from app.core.constants import (
     MAX_CONVERSATION_HISTORY,
     DEFAULT_TEMPERATURE,
@@ -25,9 +36,13 @@ from app.core.constants import (
     DEFAULT_TOP_K,
     DEFAULT_SCORE_THRESHOLD,
     CHAT_HISTORY_DEFAULT_LIMIT,
-    BANNED_WORDS,
-    CONTEXTUAL_WORDS,
     RAG_MIN_CONFIDENCE,
+    QUESTION_LOG_BATCH_SIZE,
+    QUESTION_LOG_FLUSH_INTERVAL,
+    QUESTION_LOG_MAX_QUEUE,
+    SSE_COALESCE_WINDOW,
+    SSE_COALESCE_MAX_BYTES,
+    UserTier,
 )
 from app.core.prompts import (
     get_system_prompt,
@@ -39,17 +54,178 @@ from app.core.prompts import (
     get_recipe_prompt,
     detect_instagram_intent,
     get_instagram_intelligence_prompt,
+    get_persona_core_prompt,
+    get_context_mode_prompt,
+    get_confidence_mode_prompt,
+    get_user_context_prompt,
+    get_conversation_summary_prompt,
 )
+from app.core.prompts.context import CONTEXT_KEYWORDS
+from app.core.prompts.generation import INSTAGRAM_KEYWORDS
+from app.core.prompts.recipes import Recipe, RECIPE_KEYWORD_SETS
+from app.db.database import AsyncSessionLocal
 from app.db.models import ChatMessage, Conversation, MissingKBItem, QuestionLog, User
 from app.services.rag_service import RAGService, ContextResult
 from app.services.user_service import UserService
-from app.schemas.chat import ChatResponse
+from app.services.usage_service import UsageService
+from app.services.semantic_cache_service import SemanticCacheService, CacheKey, CachedResponse
+from app.services.conversation_memory_service import ConversationMemoryService
+from app.services.conversation_summary_service import ConversationSummaryService
+from app.schemas.chat import ChatResponse, TokenUsageInfo
+from app.utils.keywords import KeywordHits, KeywordMatcher
+from app.utils.conversation import trim_history_to_budget
+from app.utils.token_counter import count_message_tokens, count_tokens
 import re
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
 
+# =============================================================================
+# Keyword Classification
+# =============================================================================
+
+# KB namespace suggested for a missing-KB question (first match wins)
+NAMESPACE_KEYWORDS: Dict[str, List[str]] = {
+    "techniques": ["install", "lace", "melting", "plucking", "tinting", "bleaching", "wig construction", "bald cap"],
+    "vendor": ["vendor", "supplier", "hair", "quality", "sample", "moq", "shipping", "pricing", "bundle"],
+    "business": ["price", "pricing", "profit", "margin", "shopify", "brand", "niche", "packaging", "refund"],
+    "content": ["hook", "reel", "script", "story", "content", "caption", "post", "social media"],
+    "mindset": ["confidence", "imposter", "perfection", "block", "motivation", "fear", "consistency"],
+    "offers": ["tutorial", "mentorship", "course", "community", "masterclass", "trip", "offer"]
+}
+
+# Keywords overriding the context-derived question category (first match wins)
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "vendor": ["vendor", "supplier"],
+    "business": ["price", "cost"],
+    "content": ["content", "reel"],
+}
+
+# Every keyword set used to classify a user message, compiled into one
+# matcher so each message is scanned once
+MESSAGE_KEYWORDS = KeywordMatcher(
+    CONTEXT_KEYWORDS,
+    {"instagram": INSTAGRAM_KEYWORDS},
+    RECIPE_KEYWORD_SETS,
+    {("namespace", name): keywords for name, keywords in NAMESPACE_KEYWORDS.items()},
+    {("category", name): keywords for name, keywords in CATEGORY_KEYWORDS.items()},
+)
+
+# Phrases in a response indicating the answer isn't in the KB
+_MISSING_KB_INDICATORS = re.compile(
+    r"isn't in my brain|not in my brain|don't have that|don't have this|don't have the|"
+    r"can't find|don't have access to|isn't available|not available in"
+)
+_MISSING_KB_DETAIL_PATTERNS = [
+    re.compile(r"isn't in my brain[^.]*\.\s*([^.]*)"),
+    re.compile(r"don't have that[^.]*\.\s*([^.]*)"),
+    re.compile(r"don't have the ([^.]*)"),
+]
+
+
+# =============================================================================
+# Pre-generation Data Classes
+# =============================================================================
+
+@dataclass
+class MessageSignals:
+    """Keyword classification of a user message (independent of retrieval)."""
+    context_type: ConversationContext
+    recipe: Optional[Recipe]
+    instagram: bool
+    keywords: Optional[KeywordHits] = None
+
+
+def classify_message(message: str, context_type: Optional[ConversationContext] = None) -> MessageSignals:
+    """
+    Run the keyword classifiers over one scan of the message.
+    
+    A forced context_type is kept as-is. The scan is kept on the signals
+    so the logging classifiers (category, namespace) can reuse it.
+    """
+    hits = MESSAGE_KEYWORDS.scan(message)
+    return MessageSignals(
+        context_type=context_type or detect_conversation_context(message, hits),
+        recipe=detect_recipe(message, hits),
+        instagram=detect_instagram_intent(message, hits),
+        keywords=hits,
+    )
+
+
+@dataclass
+class GenerationPlan:
+    """Everything prepared before the LLM call."""
+    signals: MessageSignals
+    query_embedding: Optional[List[float]]
+    user_profile: Optional[dict]
+    context_result: Union[ContextResult, str]
+    kb_confidence: float
+    messages: List[Dict] = field(default_factory=list)
+    cache_key: Optional[CacheKey] = None
+    cached: Optional[CachedResponse] = None
+    route: Optional[RoutedModel] = None
+    timer: StageTimer = field(default_factory=StageTimer)
+    
+    @property
+    def context_type(self) -> ConversationContext:
+        return self.signals.context_type
+    
+    @property
+    def sources(self) -> List[Dict]:
+        return self.context_result.sources if isinstance(self.context_result, ContextResult) else []
+
+
+# =============================================================================
+# Background Writes
+# =============================================================================
+
+# Every chat turn logs a question: buffered and inserted in batches
+question_log_writer = BatchWriter(
+    "question-log",
+    QuestionLog.__table__,
+    batch_size=QUESTION_LOG_BATCH_SIZE,
+    flush_interval=QUESTION_LOG_FLUSH_INTERVAL,
+    max_queue=QUESTION_LOG_MAX_QUEUE,
+)
+
+
+async def _write_analytics_rows(rows: List) -> None:
+    """Insert missing-KB log rows in one transaction of their own."""
+    async with AsyncSessionLocal() as session:
+        session.add_all(rows)
+        await session.commit()
+
+
+async def _persist_truncated_turn(
+    user_id: int,
+    conversation_id: Optional[int],
+    message: str,
+    response: str,
+    usage: TokenUsage,
+    model: Optional[str] = None
+) -> None:
+    """Save a turn whose client disconnected mid-stream, with its own session."""
+    async with AsyncSessionLocal() as db:
+        service = ChatService(db)
+        conversation_id, message_id = await service._persist_turn(
+            user_id, conversation_id, message, response, usage, truncated=True, model=model
+        )
+    service.memory.append_turn(user_id, conversation_id, message_id, message, response)
+
+
+# Streamed response outcomes (admin stats)
+STREAMS_COMPLETED_KEY = "chat_stream:completed"
+STREAMS_COMPLETION_TOKENS_KEY = "chat_stream:completion_tokens"
+STREAMS_CANCELLED_KEY = "chat_stream:cancelled"
+STREAMS_CANCELLED_TOKENS_KEY = "chat_stream:cancelled_completion_tokens"
+STREAMS_TOKENS_SAVED_KEY = "chat_stream:tokens_saved"
+
+
+# =============================================================================
+# Chat Service
+# =============================================================================
+
 class ChatService:
     """Service for chat-related operations."""
     
@@ -62,6 +238,10 @@ class ChatService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.rag_service = RAGService(db=db)
+        self.semantic_cache = SemanticCacheService(db=db)
+        self.memory = ConversationMemoryService(db=db)
+        self.summaries = ConversationSummaryService(db=db)
+        self.usage = UsageService(db=db)
     
     # -------------------------------------------------------------------------
     # Message Processing
@@ -83,118 +263,104 @@ class ChatService:
         Args:
             user_id: The user's ID
             message: The user's message
-            conversation_history: Previous messages in conversation
+            conversation_history: Previous messages, for requests without a
+                conversation_id (a continued conversation uses the history
+                stored server-side)
             include_sources: Whether to include source info
+            conversation_id: Conversation to continue (None starts a new one)
         
         Returns:
             ChatResponse with AI response and metadata
+        
+        Raises:
+            ServerBusyError: The turn would wait too long for the LLM
         """
         try:
-            # Detect context type
-            context_type = detect_conversation_context(message)
-            logger.info(f"Context: {context_type.value} for: {message[:50]}...")
-            
-            # Retrieve RAG context
-            context_result = await self.rag_service.retrieve_context(
-                query=message,
-                top_k=DEFAULT_TOP_K,
-                score_threshold=DEFAULT_SCORE_THRESHOLD,
-                include_sources=True
-            )
-            
-            # Extract context string and confidence score
-            context = ""
-            kb_confidence = 0.0
-            
-            if isinstance(context_result, ContextResult):
-                context = context_result.context
-                kb_confidence = context_result.average_score if context_result.total_matches > 0 else 0.0
-            elif context_result:
-                context = context_result
-                kb_confidence = 0.5  # Default if we can't determine
-            
-            logger.info(f"KB confidence: {kb_confidence:.2f} (threshold: {RAG_MIN_CONFIDENCE})")
-            
-            # Fetch user profile data for personalization
-            user_profile = None
-            try:
-                user_service = UserService(self.db)
-                user = await user_service.get_user_by_id(user_id)
-                if user and user.profile_data:
-                    user_profile = user.profile_data
-            except Exception as e:
-                logger.warning(f"Failed to fetch user profile: {e}")
-            
-            # Build messages with confidence info and user profile
-            messages = self._build_messages(
-                message, context, conversation_history, context_type, user_tier, kb_confidence, user_profile
+            # Fail fast, before any retrieval work, while the completion queue is too long
+            llm_scheduler.check(user_id, user_tier)
+            continued = bool(conversation_id)
+            conversation_history, summary = await self._load_history(user_id, conversation_id, conversation_history)
+            plan = await self._prepare_generation(
+                message, user_id, conversation_history, user_tier, conversation_summary=summary
             )
+            if plan.route is not None:
+                # Before queueing for the routed model (a cache hit needs no model)
+                llm_gateway.check(plan.route.model)
+            context_type = plan.context_type
+            context_result = plan.context_result
+            kb_confidence = plan.kb_confidence
+            cached = plan.cached
+            logger.info(f"Context: {context_type.value} for: {message[:50]}...")
             
-            # Generate response (with banned word checking)
-            ai_response, tokens_used = await self._generate_response_with_ban_check(messages)
+            if cached:
+                ai_response, usage = cached.response, TokenUsage()
+            else:
+                logger.info(f"KB confidence: {kb_confidence:.2f} (threshold: {RAG_MIN_CONFIDENCE})")
+                
+                # Generate response (with banned word checking) once admitted by the scheduler
+                ticket = await plan.timer.run("queue", self._acquire_llm(user_id, user_tier, plan))
+                usage = TokenUsage()
+                try:
+                    ai_response, usage = await plan.timer.run(
+                        "generate", self._generate_response_with_ban_check(plan.messages, plan.route)
+                    )
+                finally:
+                    ticket.release(tokens_used=usage.total_tokens or None)
+                
+                if plan.cache_key:
+                    await self.semantic_cache.store(
+                        plan.query_embedding, plan.cache_key, message, ai_response,
+                        plan.sources, kb_confidence, usage.total_tokens
+                    )
+            tokens_used = usage.total_tokens
             
             # Log if low confidence (potential missing KB item)
             if kb_confidence < RAG_MIN_CONFIDENCE:
                 logger.info(f"Low confidence ({kb_confidence:.2f}) - may need KB content for: {message[:50]}...")
             
-            # Resolve or create conversation (session)
-            conv = None
-            if conversation_id:
-                r = await self.db.execute(
-                    select(Conversation).where(
-                        Conversation.id == conversation_id,
-                        Conversation.user_id == user_id,
-                    )
-                )
-                conv = r.scalar_one_or_none()
-            if conv is None:
-                title = (message[:500].strip() or "New chat")[:500]
-                conv = Conversation(user_id=user_id, title=title)
-                self.db.add(conv)
-                await self.db.flush()
-            else:
-                conv.updated_at = datetime.now(timezone.utc)
-            conversation_id = conv.id
-
-            # Save to database
-            chat_message = ChatMessage(
+            # Save the turn (conversation, message, usage) in one transaction
+            conversation_id, message_id = await self._persist_turn(
+                user_id, conversation_id, message, ai_response, usage, model=plan.route and plan.route.model
+            )
+            self.memory.append_turn(user_id, conversation_id, message_id, message, ai_response)
+            if continued:
+                self._maybe_summarize(user_id, conversation_id, conversation_history, message, ai_response)
+            
+            logger.info(
+                f"Processed message for user {user_id}, conversation_id={conversation_id}, "
+                f"tokens: {tokens_used} (prompt {usage.prompt_tokens}, {usage.cached_prompt_tokens} cached; "
+                f"completion {usage.completion_tokens}), "
+                f"stages (ms): {plan.timer.as_dict()}"
+            )
+            
+            # Log question and check for missing KB items (written in the background)
+            self._log_question_and_missing_kb(
                 user_id=user_id,
-                conversation_id=conversation_id,
-                message=message,
-                response=ai_response,
+                question=message,
+                ai_response=ai_response,
+                context_type=context_type,
+                context_result=context_result,
+                user_tier=user_tier,
                 tokens_used=tokens_used,
+                stage_timings=plan.timer.as_dict(),
+                token_usage=usage,
+                keywords=plan.signals.keywords,
             )
-            self.db.add(chat_message)
-            await self.db.commit()
-            await self.db.refresh(chat_message)
-
-            logger.info(f"Processed message for user {user_id}, conversation_id={conversation_id}, tokens: {tokens_used}")
-
-            # Log question and check for missing KB items (async logging)
-            try:
-                await self._log_question_and_missing_kb(
-                    user_id=user_id,
-                    question=message,
-                    ai_response=ai_response,
-                    context_type=context_type,
-                    context_result=context_result,
-                    user_tier=user_tier,
-                    tokens_used=tokens_used,
-                )
-            except Exception as log_error:
-                logger.error(f"Error in logging (non-fatal): {log_error}")
-                await self.db.rollback()
-
+            
             result = ChatResponse(
                 response=ai_response,
                 tokens_used=tokens_used,
-                message_id=chat_message.id,
+                usage=TokenUsageInfo(**usage.as_dict()),
+                message_id=message_id,
                 conversation_id=conversation_id,
+                cached=cached is not None,
             )
             if include_sources and isinstance(context_result, ContextResult):
                 result.sources = context_result.sources
             return result
-            
+        
+        except ServerBusyError:
+            raise
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             # Rollback any failed transaction
@@ -203,36 +369,385 @@ class ChatService:
             except Exception:
                 pass
             return ChatResponse(
-                response=FALLBACK_RESPONSES["error_graceful"],
+                response=self._fallback_response(e),
                 tokens_used=0,
                 message_id=None
             )
     
-    async def _generate_response_with_ban_check(self, messages: List[Dict]) -> tuple:
+    async def _load_history(
+        self,
+        user_id: int,
+        conversation_id: Optional[int],
+        conversation_history: Optional[List[Dict]]
+    ) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """
+        History for the prompt: server-side for a continued conversation, else as sent.
+        
+        Returns:
+            (turns not covered by the conversation summary, the summary)
+        """
+        if not conversation_id:
+            return conversation_history, None
+        summary, summarized_through = await self.memory.get_summary(user_id, conversation_id)
+        history = [
+            msg for msg in await self.memory.get_recent(user_id, conversation_id)
+            if msg.get("id", 0) > summarized_through
+        ]
+        return history or None, summary
+    
+    def _maybe_summarize(
+        self,
+        user_id: int,
+        conversation_id: int,
+        history: Optional[List[Dict]],
+        message: str,
+        response: str
+    ) -> None:
+        """Start a background summary once the unsummarized turns grow too long."""
+        unsummarized = (history or []) + [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response},
+        ]
+        if self.summaries.needs_summary(unsummarized):
+            self.summaries.schedule(user_id, conversation_id)
+    
+    async def _resolve_conversation(
+        self,
+        user_id: int,
+        conversation_id: Optional[int],
+        message: str
+    ) -> Conversation:
+        """The user's conversation conversation_id, or a new one titled by message."""
+        conv = None
+        if conversation_id:
+            r = await self.db.execute(
+                select(Conversation).where(
+                    Conversation.id == conversation_id,
+                    Conversation.user_id == user_id,
+                )
+            )
+            conv = r.scalar_one_or_none()
+        if conv is None:
+            title = (message[:500].strip() or "New chat")[:500]
+            conv = Conversation(user_id=user_id, title=title)
+            self.db.add(conv)
+            await self.db.flush()
+        else:
+            conv.updated_at = datetime.now(timezone.utc)
+        return conv
+    
+    async def _persist_turn(
+        self,
+        user_id: int,
+        conversation_id: Optional[int],
+        message: str,
+        response: str,
+        usage: TokenUsage,
+        truncated: bool = False,
+        model: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """
+        Save a turn: the conversation (created or touched), the message and
+        the user's usage increment, committed together.
+        
+        truncated marks a response cut short because the client disconnected.
+        model is the model that generated the response (priced in usage).
+        
+        Returns:
+            (conversation_id, message_id)
+        """
+        conversation = await self._resolve_conversation(user_id, conversation_id, message)
+        chat_message = ChatMessage(
+            user_id=user_id,
+            conversation_id=conversation.id,
+            message=message,
+            response=response,
+            tokens_used=usage.total_tokens,
+            is_truncated=truncated,
+        )
+        self.db.add(chat_message)
+        await self.usage.add_usage(
+            user_id,
+            tokens_used=usage.total_tokens,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_prompt_tokens=usage.cached_prompt_tokens,
+            model=model,
+        )
+        await self.db.commit()
+        self.usage.count_cached_message(user_id)
+        return conversation.id, chat_message.id
+    
+    async def _embed_query(self, message: str) -> Optional[List[float]]:
+        """Embed the user message; None if embedding fails (retrieval retries)."""
+        try:
+            return await self.rag_service.embed_query(message)
+        except Exception as e:
+            logger.warning(f"Failed to embed query: {e}")
+            return None
+    
+    async def _load_user_profile(self, user_id: Optional[int]) -> Optional[dict]:
+        """
+        Fetch the user's membership profile data (None if unavailable).
+        
+        Uses its own session so it can run while self.db is busy with
+        retrieval.
+        """
+        if user_id is None:
+            return None
+        try:
+            async with AsyncSessionLocal() as session:
+                user = await UserService(session).get_user_by_id(user_id)
+                if user and user.profile_data:
+                    return user.profile_data
+        except Exception as e:
+            logger.warning(f"Failed to fetch user profile: {e}")
+        return None
+    
+    async def _retrieve_context(
+        self,
+        message: str,
+        query_embedding: Optional[List[float]],
+        own_session: bool = False
+    ) -> Union[ContextResult, str]:
+        """
+        RAG retrieval for the message.
+        
+        With own_session it runs on a session of its own, so it can overlap
+        (and be cancelled during) queries on self.db.
+        """
+        kwargs = dict(
+            query=message,
+            top_k=DEFAULT_TOP_K,
+            score_threshold=DEFAULT_SCORE_THRESHOLD,
+            include_sources=True,
+            query_embedding=query_embedding
+        )
+        if not own_session:
+            return await self.rag_service.retrieve_context(**kwargs)
+        async with AsyncSessionLocal() as session:
+            return await RAGService(db=session).retrieve_context(**kwargs)
+    
+    async def _prepare_generation(
+        self,
+        message: str,
+        user_id: Optional[int],
+        conversation_history: Optional[List[Dict]] = None,
+        user_tier: Optional[str] = None,
+        context_type: Optional[ConversationContext] = None,
+        use_cache: bool = True,
+        conversation_summary: Optional[str] = None
+    ) -> GenerationPlan:
+        """
+        Run the pre-generation stages, overlapping the independent ones.
+        
+        Stage graph:
+            classify (keyword detectors, inline) --+
+            profile (own session) -----------------+--> build messages
+            embed --+--> retrieve -----------------+
+                    +--> [cache lookup]
+        
+        The cache lookup additionally waits for classify and profile, since
+        both feed the cache key / eligibility. While the cache may serve the
+        request, retrieval runs alongside the lookup on a session of its own;
+        a cache hit cancels it and skips message building.
+        
+        Args:
+            message: The user's message
+            user_id: User whose profile personalises the prompt (None to skip)
+            conversation_history: Previous messages in conversation
+            user_tier: User's membership tier
+            context_type: Forced context type (detected if None)
+            use_cache: Whether the semantic cache may serve this request
+            conversation_summary: Summary of the turns before conversation_history
+        
+        Returns:
+            GenerationPlan with per-stage timings and the model route
+        """
+        timer = StageTimer()
+        profile = asyncio.create_task(timer.run("profile", self._load_user_profile(user_id)))
+        retrieve: Optional[asyncio.Task] = None
+        
+        try:
+            # A few compiled-regex scans: cheaper inline than a thread hop
+            with timer.stage("classify"):
+                signals = classify_message(message, context_type)
+            
+            # Embed once: shared by the semantic cache and RAG retrieval
+            query_embedding = await timer.run("embed", self._embed_query(message))
+            
+            # Serve near-duplicate, non-personalised questions from cache
+            cache_key = None
+            if (
+                use_cache and query_embedding
+                and self.semantic_cache.is_cacheable_conversation(conversation_history, conversation_summary)
+            ):
+                retrieve = asyncio.create_task(
+                    timer.run("retrieve", self._retrieve_context(message, query_embedding, own_session=True))
+                )
+                if self.semantic_cache.is_cacheable_profile(await profile):
+                    cache_key = self.semantic_cache.build_key(
+                        signals.context_type, signals.recipe, signals.instagram, user_tier
+                    )
+                    cached = await timer.run("cache_lookup", self.semantic_cache.lookup(query_embedding, cache_key))
+                    if cached:
+                        return GenerationPlan(
+                            signals=signals,
+                            query_embedding=query_embedding,
+                            user_profile=None,
+                            context_result=ContextResult("", cached.sources, len(cached.sources), cached.kb_confidence),
+                            kb_confidence=cached.kb_confidence,
+                            cache_key=cache_key,
+                            cached=cached,
+                            timer=timer,
+                        )
+            
+            if retrieve is not None:
+                context_result = await retrieve
+            else:
+                context_result = await timer.run("retrieve", self._retrieve_context(message, query_embedding))
+            user_profile = await profile
+        finally:
+            for task in (profile, retrieve):
+                if task is not None and not task.done():
+                    task.cancel()
+        
+        # Extract context string and confidence score
+        context = ""
+        kb_confidence = 0.0
+        if isinstance(context_result, ContextResult):
+            context = context_result.context
+            kb_confidence = context_result.average_score if context_result.total_matches > 0 else 0.0
+        elif context_result:
+            context = context_result
+            kb_confidence = 0.5  # Default if we can't determine
+        
+        with timer.stage("build_messages"):
+            messages = self._build_messages(
+                message, context, conversation_history, signals.context_type,
+                user_tier, kb_confidence, user_profile, signals, conversation_summary
+            )
+        
+        route = model_router.route(RoutingSignals(
+            context_type=signals.context_type,
+            has_recipe=signals.recipe is not None,
+            kb_confidence=kb_confidence,
+            user_tier=user_tier,
+            message_chars=len(message),
+        ))
+        
+        return GenerationPlan(
+            signals=signals,
+            query_embedding=query_embedding,
+            user_profile=user_profile,
+            context_result=context_result,
+            kb_confidence=kb_confidence,
+            messages=messages,
+            cache_key=cache_key,
+            route=route,
+            timer=timer,
+        )
+    
+    async def _generate_response_with_ban_check(
+        self,
+        messages: List[Dict],
+        route: Optional[RoutedModel] = None
+    ) -> tuple:
         """
         Generate response and check for banned words.
         Regenerates up to MAX_REGENERATIONS times if banned words found.
+        
+        Collects the ban-checked stream, so a generation that hits a banned
+        word is aborted at that point instead of running to completion.
+        
+        Returns:
+            Tuple of (response text, TokenUsage summed over all attempts)
         """
-        total_tokens = 0
+        usage = TokenUsage()
+        parts: List[str] = []
+        
+        async for kind, content in self._stream_with_ban_check(messages, usage, route):
+            if kind == "reset":
+                parts = []
+            else:
+                parts.append(content)
+        
+        return "".join(parts), usage
+    
+    async def _stream_with_ban_check(
+        self,
+        messages: List[Dict],
+        usage: TokenUsage,
+        route: Optional[RoutedModel] = None
+    ) -> AsyncGenerator[tuple, None]:
+        """
+        Stream a response, enforcing banned words as tokens arrive.
+        
+        Output is scanned incrementally; on a banned word the upstream stream
+        is closed, a corrective instruction is appended to messages and the
+        generation restarts (up to MAX_REGENERATIONS times). Words with
+        contextual exceptions are checked once the stream completes.
         
+        Usage is taken from the provider's final chunk. An attempt that ends
+        without one (closed early, or a provider that omits it) is counted
+        with the local tokenizer instead.
+        
+        A generation that completes is recorded on its route (time to first
+        token, total time, usage).
+        
+        Args:
+            messages: Prompt messages (corrective instructions are appended)
+            usage: Accumulates token usage of every attempt
+            route: Model and max_tokens to use (default: the default route)
+        
+        Yields:
+            ("chunk", text) for output, and ("reset", banned words) when the
+            text yielded so far is discarded before a regeneration
+        """
+        route = route or model_router.default()
+        started = time.monotonic()
+        first_token_ms = None
         for attempt in range(self.MAX_REGENERATIONS + 1):
-            response = await get_openai_client().chat.completions.create(
-                model=settings.OPENAI_MODEL,
+            can_retry = attempt < self.MAX_REGENERATIONS
+            scanner = BannedWordScanner()
+            banned_found: List[str] = []
+            reported = False
+            
+            stream = await llm_gateway.chat_completion_stream(
+                model=route.model,
                 messages=messages,
                 temperature=self.TEMPERATURE,
-                max_tokens=self.MAX_TOKENS
+                max_tokens=route.max_tokens,
+                stream_options={"include_usage": True}
             )
+            try:
+                async for chunk in stream:
+                    if chunk.usage:
+                        usage.add(chunk.usage)
+                        reported = True
+                    if not (chunk.choices and chunk.choices[0].delta.content):
+                        continue
+                    content = chunk.choices[0].delta.content
+                    hit = scanner.feed(content)
+                    if hit and can_retry:
+                        banned_found = [hit]
+                        break
+                    if first_token_ms is None:
+                        first_token_ms = (time.monotonic() - started) * 1000
+                    yield "chunk", content
+            finally:
+                # Counted first: a cancelled close must not lose the tokens consumed
+                if not reported:
+                    usage.add_estimate(count_message_tokens(messages), count_tokens(scanner.text))
+                # Closing the response stops generation upstream
+                await stream.close()
             
-            ai_response = response.choices[0].message.content
-            total_tokens += response.usage.total_tokens
-            
-            # Check for banned words
-            banned_found = self._check_banned_words(ai_response)
-            
             if not banned_found:
-                return ai_response, total_tokens
+                banned_found = scanner.finish()
+            if not banned_found:
+                break
             
-            if attempt < self.MAX_REGENERATIONS:
+            if can_retry:
                 logger.warning(f"Banned words found: {banned_found}. Regenerating (attempt {attempt + 1})...")
                 # Add instruction to avoid banned words
                 messages.append({
@@ -240,30 +755,11 @@ class ChatService:
                     "content": f"Your previous response contained banned words: {', '.join(banned_found)}. "
                                f"Rewrite WITHOUT using these words. Be direct and real instead."
                 })
+                yield "reset", banned_found
             else:
                 logger.warning(f"Max regenerations reached. Returning response with banned words: {banned_found}")
         
-        return ai_response, total_tokens
-    
-    def _check_banned_words(self, text: str) -> List[str]:
-        """
-        Check text for banned words.
-        Returns list of banned words found.
-        """
-        text_lower = text.lower()
-        found = []
-        
-        for word in BANNED_WORDS:
-            if word.lower() in text_lower:
-                # Check contextual exceptions
-                if word.lower() in CONTEXTUAL_WORDS:
-                    # Check if any allowed context word is present
-                    allowed_contexts = CONTEXTUAL_WORDS[word.lower()]
-                    if any(ctx in text_lower for ctx in allowed_contexts):
-                        continue  # Allowed in this context
-                found.append(word)
-        
-        return found
+        model_router.record(route, first_token_ms, (time.monotonic() - started) * 1000, usage)
     
     def _build_messages(
         self,
@@ -273,68 +769,96 @@ class ChatService:
         context_type: ConversationContext,
         user_tier: Optional[str] = None,
         kb_confidence: float = 1.0,
-        user_profile: Optional[dict] = None
+        user_profile: Optional[dict] = None,
+        signals: Optional[MessageSignals] = None,
+        conversation_summary: Optional[str] = None
     ) -> List[Dict]:
-        """Build the message array for OpenAI API."""
-        messages = [
-            {"role": "system", "content": get_system_prompt(
+        """
+        Build the message array for OpenAI API.
+        
+        With PROMPT_LAYOUT=prefix_cache the system content is split and
+        ordered from most static to most dynamic (persona core, context
+        mode, Instagram/recipe, user profile, confidence, KB context) so
+        the provider's prompt cache can reuse the longest possible prefix
+        across users. The standard layout keeps the profile and confidence
+        blocks inside the persona prompt.
+        
+        A conversation summary goes right before the history it precedes,
+        and its tokens come out of the history budget.
+        """
+        signals = signals or classify_message(user_message, context_type)
+        prefix_cache = settings.PROMPT_LAYOUT == "prefix_cache"
+        
+        if prefix_cache:
+            system_blocks = [get_persona_core_prompt(), get_context_mode_prompt(context_type)]
+        else:
+            system_blocks = [get_system_prompt(
                 context_type=context_type,
                 user_tier=user_tier,
                 kb_confidence=kb_confidence,
                 user_profile=user_profile
-            )}
-        ]
+            )]
         
         # Check for Instagram-related intent and inject conditional system prompt
         # This overrides generic content advice for Instagram questions
-        is_instagram_intent = detect_instagram_intent(user_message)
-        if is_instagram_intent:
+        if signals.instagram:
             logger.info("Instagram intent detected - injecting Instagram Intelligence prompt")
-            messages.append({
-                "role": "system",
-                "content": get_instagram_intelligence_prompt()
-            })
+            system_blocks.append(get_instagram_intelligence_prompt())
         
-        # Detect and add recipe if applicable
-        recipe = detect_recipe(user_message)
+        # Add recipe if applicable
+        recipe = signals.recipe
         if recipe:
             logger.info(f"Recipe detected: {recipe.name}")
-            messages.append({
-                "role": "system",
-                "content": get_recipe_prompt(recipe)
-            })
+            system_blocks.append(get_recipe_prompt(recipe))
+        
+        if prefix_cache:
+            system_blocks.append(get_user_context_prompt(user_profile))
+            system_blocks.append(get_confidence_mode_prompt(kb_confidence))
         
         # Add RAG context with confidence info
         if context:
-            messages.append({
-                "role": "system",
-                "content": get_context_injection_prompt(context, user_message, kb_confidence)
-            })
+            system_blocks.append(get_context_injection_prompt(context, user_message, kb_confidence))
         elif kb_confidence < RAG_MIN_CONFIDENCE:
             # No context and low confidence - add clarifying instruction
-            messages.append({
-                "role": "system",
-                "content": (
-                    "NO KNOWLEDGE BASE MATCH for this question. "
-                    "Consider asking clarifying questions before giving a full answer. "
-                    "Don't give generic advice - be specific or ask what they need."
-                )
-            })
+            system_blocks.append(
+                "NO KNOWLEDGE BASE MATCH for this question. "
+                "Consider asking clarifying questions before giving a full answer. "
+                "Don't give generic advice - be specific or ask what they need."
+            )
+        
+        messages = [{"role": "system", "content": block} for block in system_blocks if block]
         
-        # Add conversation history
+        budget = self._history_token_budget(user_tier)
+        summary_prompt = get_conversation_summary_prompt(conversation_summary)
+        if summary_prompt:
+            messages.append({"role": "system", "content": summary_prompt})
+            budget = max(0, budget - count_tokens(summary_prompt))
+        
+        # Add conversation history (newest turns that fit the tier's token budget)
         if history:
-            for msg in history[-self.MAX_HISTORY:]:
-                if self._is_valid_message(msg):
-                    messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
+            valid = [
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in history[-self.MAX_HISTORY:]
+                if self._is_valid_message(msg)
+            ]
+            selected = trim_history_to_budget(valid, budget)
+            logger.info(f"History: {len(selected)}/{len(valid)} messages within {budget}-token budget")
+            messages.extend(selected)
         
         # Add current message
         messages.append({"role": "user", "content": user_message})
         
         return messages
     
+    @staticmethod
+    def _history_token_budget(user_tier: Optional[str]) -> int:
+        """Token budget for conversation history by membership tier."""
+        budgets = {
+            UserTier.BASIC.value: settings.HISTORY_TOKEN_BUDGET_BASIC,
+            UserTier.VIP.value: settings.HISTORY_TOKEN_BUDGET_VIP,
+        }
+        return budgets.get(user_tier, settings.HISTORY_TOKEN_BUDGET_BASIC)
+    
     @staticmethod
     def _is_valid_message(msg: Dict) -> bool:
         """Validate a message dictionary."""
@@ -361,7 +885,7 @@ class ChatService:
         query = optimize_query(query, limit=limit, offset=offset)
         result = await self.db.execute(query)
         return list(result.scalars().all())
-
+    
     @measure_performance
     async def get_conversations(
         self,
@@ -382,7 +906,7 @@ class ChatService:
         if has_more:
             rows = rows[:limit]
         return rows, has_more
-
+    
     @measure_performance
     async def get_conversation_messages(
         self,
@@ -408,7 +932,7 @@ class ChatService:
         )
         result = await self.db.execute(query)
         return list(result.scalars().all())
-
+    
     @measure_performance
     async def get_conversation_context(
         self,
@@ -437,6 +961,7 @@ class ChatService:
         count = result.rowcount or 0
         
         await self.db.commit()
+        self.memory.forget_user(user_id)
         logger.info(f"Cleared {count} messages for user {user_id}")
         
         return count
@@ -461,49 +986,30 @@ class ChatService:
         Returns:
             Dictionary with response and metadata
         """
-        # Detect context if not provided
-        if context_type is None:
-            context_type = detect_conversation_context(test_message)
-        
-        # Get RAG context
-        context_result = await self.rag_service.retrieve_context(
-            query=test_message,
-            top_k=DEFAULT_TOP_K,
-            include_sources=True
+        plan = await self._prepare_generation(
+            test_message, None, user_tier=user_tier, context_type=context_type, use_cache=False
         )
+        messages = plan.messages
         
-        context = (
-            context_result.context 
-            if isinstance(context_result, ContextResult) 
-            else context_result
-        )
-        
-        # Build messages and call API
-        messages = self._build_messages(test_message, context, None, context_type, user_tier)
-        
-        response = await get_openai_client().chat.completions.create(
-            model=settings.OPENAI_MODEL,
+        response = await llm_gateway.chat_completion(
+            model=plan.route.model,
             messages=messages,
             temperature=self.TEMPERATURE,
-            max_tokens=self.MAX_TOKENS
-        )
-        
-        sources = (
-            context_result.sources 
-            if isinstance(context_result, ContextResult) 
-            else []
+            max_tokens=plan.route.max_tokens
         )
         
         return {
             "response": response.choices[0].message.content,
             "tokens_used": response.usage.total_tokens,
-            "context_type": context_type.value,
-            "sources": sources,
+            "context_type": plan.context_type.value,
+            "route": plan.route.route,
+            "model": plan.route.model,
+            "sources": plan.sources,
             "system_prompt_preview": messages[0]["content"][:500] + "..."
         }
     
     # -------------------------------------------------------------------------
-    # Streaming Responses (SSE)
+    # Streaming Responses (SSE / WebSocket)
     # -------------------------------------------------------------------------
     
     async def process_message_stream(
@@ -512,123 +1018,147 @@ class ChatService:
         message: str,
         conversation_history: Optional[List[Dict]] = None,
         include_sources: bool = False,
-        user_tier: Optional[str] = None
-    ) -> AsyncGenerator[str, None]:
+        user_tier: Optional[str] = None,
+        conversation_id: Optional[int] = None
+    ) -> AsyncGenerator[ChatEvent, None]:
         """
-        Process a chat message and stream the response via SSE.
+        Process a chat message and stream the response as events.
         
-        Yields SSE-formatted events:
+        Yields ChatEvents, which each transport encodes once
+        (ChatEvent.to_sse / ChatEvent.to_ws):
         - 'start': Initial event with context info
-        - 'chunk': Text chunks as they arrive
+        - 'chunk': Text as it arrives, provider deltas coalesced over
+          SSE_COALESCE_WINDOW seconds or SSE_COALESCE_MAX_BYTES
+        - 'reset': Discard chunks so far (regenerating without banned words)
         - 'sources': Source information (if requested)
-        - 'done': Final event with message ID and token count
+        - 'done': Final event with message ID, conversation ID, token count
+          and usage split
         - 'error': Error event if something goes wrong
         
+        Closing the generator (or cancelling its task) while the answer is
+        streaming stops the upstream completion. The partial response is
+        then saved as truncated, with only the tokens consumed so far.
+        
         Args:
             user_id: The user's ID
             message: The user's message
-            conversation_history: Previous messages in conversation
+            conversation_history: Previous messages, for requests without a
+                conversation_id
             include_sources: Whether to include source info
-            
+            conversation_id: Conversation to continue (None starts a new one)
+        
         Yields:
-            SSE-formatted event strings
+            ChatEvent objects
         """
         try:
+            llm_scheduler.check(user_id, user_tier)
+            
             # Detect context type
             context_type = detect_conversation_context(message)
             logger.info(f"[Stream] Context: {context_type.value} for: {message[:50]}...")
             
             # Send start event
-            yield self._format_sse_event("start", {
+            yield ChatEvent(ChatEventType.START, {
                 "context_type": context_type.value,
                 "message": "Processing your message..."
             })
             
-            # Retrieve RAG context
-            context_result = await self.rag_service.retrieve_context(
-                query=message,
-                top_k=DEFAULT_TOP_K,
-                score_threshold=DEFAULT_SCORE_THRESHOLD,
-                include_sources=True
+            continued = bool(conversation_id)
+            conversation_history, summary = await self._load_history(user_id, conversation_id, conversation_history)
+            plan = await self._prepare_generation(
+                message, user_id, conversation_history, user_tier,
+                context_type=context_type, conversation_summary=summary
             )
+            if plan.route is not None:
+                llm_gateway.check(plan.route.model)
+            context_result = plan.context_result
+            cached = plan.cached
             
-            # Extract context string
-            context = (
-                context_result.context 
-                if isinstance(context_result, ContextResult) 
-                else context_result
-            )
-            
-            # Build messages
-            messages = self._build_messages(
-                message, context, conversation_history, context_type, user_tier
-            )
-            
-            # Call OpenAI with streaming
-            stream = await get_openai_client().chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=messages,
-                temperature=self.TEMPERATURE,
-                max_tokens=self.MAX_TOKENS,
-                stream=True
-            )
+            usage = TokenUsage()
+            if cached:
+                full_response = cached.response
+                yield ChatEvent(ChatEventType.CHUNK, {"content": full_response, "cached": True})
+            else:
+                full_response = ""
+                ticket = await plan.timer.run("queue", self._acquire_llm(user_id, user_tier, plan))
+                try:
+                    with plan.timer.stage("generate"):
+                        deltas = coalesce_chunks(
+                            self._stream_with_ban_check(plan.messages, usage, plan.route),
+                            SSE_COALESCE_WINDOW,
+                            SSE_COALESCE_MAX_BYTES,
+                        )
+                        try:
+                            async for kind, content in deltas:
+                                if kind == "reset":
+                                    # Client discards the partial text before the regeneration
+                                    full_response = ""
+                                    yield ChatEvent(ChatEventType.RESET, {"reason": "banned_words"})
+                                else:
+                                    full_response += content
+                                    yield ChatEvent(ChatEventType.CHUNK, {"content": content})
+                        except (asyncio.CancelledError, GeneratorExit):
+                            # Client went away: closing the deltas closes the upstream stream
+                            try:
+                                await deltas.aclose()
+                            finally:
+                                self._save_truncated_turn(
+                                    user_id, conversation_id, message, full_response, usage, plan.route.model
+                                )
+                            raise
+                finally:
+                    ticket.release(tokens_used=usage.total_tokens or None)
+                self._record_stream_completed(usage.completion_tokens)
             
-            # Collect full response for saving
-            full_response = ""
+            tokens_used = usage.total_tokens
             
-            # Stream chunks
-            async for chunk in stream:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    yield self._format_sse_event("chunk", {"content": content})
-            
-            # Estimate tokens (actual count not available in streaming)
-            estimated_tokens = len(full_response.split()) * 1.3  # Rough estimate
+            if plan.cache_key and not cached:
+                await self.semantic_cache.store(
+                    plan.query_embedding, plan.cache_key, message, full_response,
+                    plan.sources, plan.kb_confidence, tokens_used
+                )
             
-            # Save to database
-            chat_message = ChatMessage(
-                user_id=user_id,
-                message=message,
-                response=full_response,
-                tokens_used=int(estimated_tokens)
+            # Save the turn (conversation, message, usage) in one transaction
+            conversation_id, message_id = await self._persist_turn(
+                user_id, conversation_id, message, full_response, usage, model=plan.route and plan.route.model
             )
-            self.db.add(chat_message)
-            await self.db.commit()
-            await self.db.refresh(chat_message)
+            self.memory.append_turn(user_id, conversation_id, message_id, message, full_response)
+            if continued:
+                self._maybe_summarize(user_id, conversation_id, conversation_history, message, full_response)
             
-            # Log question and check for missing KB items (async logging)
-            await self._log_question_and_missing_kb(
+            # Log question and check for missing KB items (written in the background)
+            self._log_question_and_missing_kb(
                 user_id=user_id,
                 question=message,
                 ai_response=full_response,
                 context_type=context_type,
                 context_result=context_result,
                 user_tier=user_tier,
-                tokens_used=int(estimated_tokens)
+                tokens_used=tokens_used,
+                stage_timings=plan.timer.as_dict(),
+                token_usage=usage,
+                keywords=plan.signals.keywords
             )
             
             # Send sources if requested
             if include_sources and isinstance(context_result, ContextResult):
-                sources_data = [
-                    {
-                        "title": s.title,
-                        "category": s.category,
-                        "score": s.score,
-                        "chunk_id": s.chunk_id
-                    }
-                    for s in context_result.sources
-                ]
-                yield self._format_sse_event("sources", {"sources": sources_data})
+                yield ChatEvent(ChatEventType.SOURCES, {"sources": context_result.sources})
             
             # Send done event
-            yield self._format_sse_event("done", {
-                "message_id": chat_message.id,
-                "tokens_used": int(estimated_tokens)
+            yield ChatEvent(ChatEventType.DONE, {
+                "message_id": message_id,
+                "conversation_id": conversation_id,
+                "tokens_used": tokens_used,
+                "usage": usage.as_dict(),
+                "cached": cached is not None
             })
             
-            logger.info(f"[Stream] Completed for user {user_id}, tokens: {estimated_tokens}")
-            
+            logger.info(
+                f"[Stream] Completed for user {user_id}, tokens: {tokens_used} "
+                f"(prompt {usage.prompt_tokens}, {usage.cached_prompt_tokens} cached; "
+                f"completion {usage.completion_tokens}{', estimated' if usage.estimated else ''})"
+            )
+        
         except Exception as e:
             logger.error(f"[Stream] Error: {e}")
             # Rollback transaction if it's in a failed state
@@ -636,30 +1166,121 @@ class ChatService:
                 await self.db.rollback()
             except Exception as rollback_error:
                 logger.error(f"Error during rollback: {rollback_error}")
-            yield self._format_sse_event("error", {
-                "message": FALLBACK_RESPONSES["error_graceful"]
-            })
+            error = {"message": self._fallback_response(e)}
+            if isinstance(e, ServerBusyError):
+                error["retry_after"] = e.retry_after
+            yield ChatEvent(ChatEventType.ERROR, error)
     
     @staticmethod
-    def _format_sse_event(event_type: str, data: dict) -> str:
+    def _fallback_response(error: Exception) -> str:
+        """Mentor-voice reply for a failed turn (immediate while the circuit is open)."""
+        if isinstance(error, CircuitOpenError):
+            return FALLBACK_RESPONSES["service_unavailable"]
+        if isinstance(error, ServerBusyError):
+            return FALLBACK_RESPONSES["busy"]
+        return FALLBACK_RESPONSES["error_graceful"]
+    
+    @staticmethod
+    async def _acquire_llm(user_id: int, user_tier: Optional[str], plan: GenerationPlan):
+        """Wait for the scheduler to admit the plan's completion (prompt + max_tokens reserved)."""
+        tokens = count_message_tokens(plan.messages) + plan.route.max_tokens
+        return await llm_scheduler.acquire(user_id, user_tier, tokens)
+    
+    def _save_truncated_turn(
+        self,
+        user_id: int,
+        conversation_id: Optional[int],
+        message: str,
+        response: str,
+        usage: TokenUsage,
+        model: Optional[str] = None
+    ) -> None:
         """
-        Format data as an SSE event.
+        Save the partial response of a disconnected stream in the background.
         
-        Args:
-            event_type: The event name (start, chunk, done, error)
-            data: The event data
-            
-        Returns:
-            SSE-formatted string
+        Runs in its own task and session: the request's session may already
+        be closing, and the stream's task is being cancelled.
+        """
+        logger.info(
+            f"[Stream] Client disconnected for user {user_id}; generation stopped "
+            f"after {usage.completion_tokens} completion tokens"
+        )
+        self._record_stream_cancelled(usage.completion_tokens)
+        run_in_background(
+            "chat-truncated-turn",
+            _persist_truncated_turn(user_id, conversation_id, message, response, usage, model),
+        )
+    
+    # -------------------------------------------------------------------------
+    # Stream Metrics
+    # -------------------------------------------------------------------------
+    
+    @staticmethod
+    def _record_stream_completed(completion_tokens: int) -> None:
+        if not cache_client:
+            return
+        try:
+            pipe = cache_client.pipeline()
+            pipe.incr(STREAMS_COMPLETED_KEY)
+            pipe.incrby(STREAMS_COMPLETION_TOKENS_KEY, completion_tokens)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Stream counter update failed: {e}")
+    
+    @staticmethod
+    def _record_stream_cancelled(completion_tokens: int) -> None:
+        """
+        Count a stream stopped by a disconnect.
+        
+        Tokens saved are estimated as the average completion length of
+        completed streams minus what the cancelled one had consumed.
         """
-        json_data = json.dumps(data)
-        return f"event: {event_type}\ndata: {json_data}\n\n"
+        if not cache_client:
+            return
+        try:
+            completed, total = (
+                int(v or 0) for v in cache_client.mget(STREAMS_COMPLETED_KEY, STREAMS_COMPLETION_TOKENS_KEY)
+            )
+            saved = max(0, round(total / completed) - completion_tokens) if completed else 0
+            pipe = cache_client.pipeline()
+            pipe.incr(STREAMS_CANCELLED_KEY)
+            pipe.incrby(STREAMS_CANCELLED_TOKENS_KEY, completion_tokens)
+            pipe.incrby(STREAMS_TOKENS_SAVED_KEY, saved)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Stream counter update failed: {e}")
+    
+    @staticmethod
+    def get_stream_stats() -> Dict:
+        """Completed vs disconnected streams and the completion tokens saved."""
+        completed = completion_tokens = cancelled = cancelled_tokens = tokens_saved = 0
+        if cache_client:
+            try:
+                values = cache_client.mget(
+                    STREAMS_COMPLETED_KEY, STREAMS_COMPLETION_TOKENS_KEY, STREAMS_CANCELLED_KEY,
+                    STREAMS_CANCELLED_TOKENS_KEY, STREAMS_TOKENS_SAVED_KEY
+                )
+                completed, completion_tokens, cancelled, cancelled_tokens, tokens_saved = (
+                    int(v or 0) for v in values
+                )
+            except Exception as e:
+                logger.warning(f"Could not read stream counters: {e}")
+        
+        streams = completed + cancelled
+        return {
+            "completed": completed,
+            "cancelled": cancelled,
+            "cancel_rate": round(cancelled / streams, 4) if streams else 0.0,
+            "avg_completion_tokens": round(completion_tokens / completed, 1) if completed else 0.0,
+            "cancelled_completion_tokens": cancelled_tokens,
+            "tokens_saved": tokens_saved,
+        }
     
     # -------------------------------------------------------------------------
     # Logging & Analytics
     # -------------------------------------------------------------------------
     
-    async def _log_question_and_missing_kb(
+    def _log_question_and_missing_kb(
         self,
         user_id: int,
         question: str,
@@ -667,13 +1288,22 @@ class ChatService:
         context_type: ConversationContext,
         context_result: ContextResult,
         user_tier: Optional[str] = None,
-        tokens_used: int = 0
+        tokens_used: int = 0,
+        stage_timings: Optional[Dict[str, float]] = None,
+        token_usage: Optional[TokenUsage] = None,
+        keywords: Optional[KeywordHits] = None
     ) -> None:
         """
         Log the question and detect/log missing KB items.
         
         This creates the knowledge feedback loop:
         User → Tay AI detects missing info → logs it → Annika uploads → PostgreSQL pgvector updates → Tay AI gets smarter
+        
+        The rows are built here and written in the background (the question
+        log through question_log_writer), so the response does not wait on
+        these inserts.
+        
+        keywords is the MESSAGE_KEYWORDS scan of the question, if already made.
         """
         try:
             # Always log the question
@@ -681,9 +1311,9 @@ class ChatService:
             has_sources = isinstance(context_result, ContextResult) and len(context_result.sources) > 0
             
             # Determine category from context
-            category = self._determine_category(question, context_type)
+            category = self._determine_category(question, context_type, keywords)
             
-            question_log = QuestionLog(
+            question_log_writer.add(dict(
                 user_id=user_id,
                 question=question,
                 normalized_question=normalized_question,
@@ -692,18 +1322,21 @@ class ChatService:
                 user_tier=user_tier,
                 tokens_used=tokens_used,
                 has_sources=has_sources,
+                created_at=datetime.now(timezone.utc),
                 extra_metadata={
                     "rag_score_avg": (
-                        sum(s.score for s in context_result.sources) / len(context_result.sources)
+                        sum(s["score"] for s in context_result.sources) / len(context_result.sources)
                         if has_sources else None
                     ),
-                    "sources_count": len(context_result.sources) if has_sources else 0
+                    "sources_count": len(context_result.sources) if has_sources else 0,
+                    "stage_timings_ms": stage_timings,
+                    "token_usage": token_usage.as_dict() if token_usage else None,
+                    "prompt_layout": settings.PROMPT_LAYOUT,
                 }
-            )
-            self.db.add(question_log)
+            ))
             
             # Check if AI response indicates missing knowledge
-            missing_kb_data = self._detect_missing_kb(question, ai_response, context_result)
+            missing_kb_data = self._detect_missing_kb(question, ai_response, context_result, keywords)
             
             if missing_kb_data:
                 missing_kb_item = MissingKBItem(
@@ -719,22 +1352,20 @@ class ChatService:
                         "has_sources": has_sources
                     }
                 )
-                self.db.add(missing_kb_item)
+                run_in_background("missing-kb-log", _write_analytics_rows([missing_kb_item]))
                 logger.info(f"Missing KB item logged: {missing_kb_data['missing_detail'][:100]}")
-            
-            # Commit both logs
-            await self.db.commit()
-            
+        
         except Exception as e:
             # Don't fail the request if logging fails
             logger.error(f"Error logging question/missing KB: {e}")
-            try:
-                await self.db.rollback()
-            except Exception:
-                pass
     
     @staticmethod
-    def _detect_missing_kb(question: str, ai_response: str, context_result: ContextResult) -> Optional[Dict]:
+    def _detect_missing_kb(
+        question: str,
+        ai_response: str,
+        context_result: ContextResult,
+        keywords: Optional[KeywordHits] = None
+    ) -> Optional[Dict]:
         """
         Detect if the AI response indicates missing knowledge.
         
@@ -748,25 +1379,13 @@ class ChatService:
         Returns dict with missing_detail and suggested_namespace if detected, None otherwise.
         """
         # Check for missing KB indicators in response
-        missing_indicators = [
-            r"isn't in my brain",
-            r"not in my brain",
-            r"don't have that",
-            r"don't have this",
-            r"don't have the",
-            r"can't find",
-            r"don't have access to",
-            r"isn't available",
-            r"not available in",
-        ]
-        
         response_lower = ai_response.lower()
-        has_missing_indicator = any(re.search(pattern, response_lower) for pattern in missing_indicators)
+        has_missing_indicator = _MISSING_KB_INDICATORS.search(response_lower) is not None
         
         # Check RAG context quality
         has_good_sources = isinstance(context_result, ContextResult) and (
             len(context_result.sources) == 0 or
-            any(s.score < 0.7 for s in context_result.sources)  # Low confidence scores
+            any(s["score"] < 0.7 for s in context_result.sources)  # Low confidence scores
         )
         
         if has_missing_indicator or has_good_sources:
@@ -775,26 +1394,20 @@ class ChatService:
             
             # Try to extract more specific detail from response
             # Look for phrases after "isn't in my brain" or similar
-            detail_patterns = [
-                r"isn't in my brain[^.]*\.\s*([^.]*)",
-                r"don't have that[^.]*\.\s*([^.]*)",
-                r"don't have the ([^.]*)",
-            ]
-            
-            for pattern in detail_patterns:
-                match = re.search(pattern, response_lower)
+            for pattern in _MISSING_KB_DETAIL_PATTERNS:
+                match = pattern.search(response_lower)
                 if match:
                     missing_detail = f"{question} - Specifically: {match.group(1)}"
                     break
             
             # Suggest namespace based on question content
-            suggested_namespace = ChatService._suggest_namespace(question)
+            suggested_namespace = ChatService._suggest_namespace(question, keywords)
             
             return {
                 "missing_detail": missing_detail.strip(),
                 "suggested_namespace": suggested_namespace,
                 "rag_score": (
-                    min(s.score for s in context_result.sources) if 
+                    min(s["score"] for s in context_result.sources) if 
                     isinstance(context_result, ContextResult) and context_result.sources else None
                 )
             }
@@ -802,22 +1415,13 @@ class ChatService:
         return None
     
     @staticmethod
-    def _suggest_namespace(question: str) -> Optional[str]:
+    def _suggest_namespace(question: str, keywords: Optional[KeywordHits] = None) -> Optional[str]:
         """Suggest a KB namespace based on question content."""
-        question_lower = question.lower()
-        
-        # Namespace keywords mapping
-        namespace_keywords = {
-            "techniques": ["install", "lace", "melting", "plucking", "tinting", "bleaching", "wig construction", "bald cap"],
-            "vendor": ["vendor", "supplier", "hair", "quality", "sample", "moq", "shipping", "pricing", "bundle"],
-            "business": ["price", "pricing", "profit", "margin", "shopify", "brand", "niche", "packaging", "refund"],
-            "content": ["hook", "reel", "script", "story", "content", "caption", "post", "social media"],
-            "mindset": ["confidence", "imposter", "perfection", "block", "motivation", "fear", "consistency"],
-            "offers": ["tutorial", "mentorship", "course", "community", "masterclass", "trip", "offer"]
-        }
+        if keywords is None:
+            keywords = MESSAGE_KEYWORDS.scan(question)
         
-        for namespace, keywords in namespace_keywords.items():
-            if any(keyword in question_lower for keyword in keywords):
+        for namespace in NAMESPACE_KEYWORDS:
+            if keywords.any(("namespace", namespace)):
                 return namespace
         
         return "faqs"  # Default to FAQs
@@ -848,9 +1452,14 @@ class ChatService:
         return normalized
     
     @staticmethod
-    def _determine_category(question: str, context_type: ConversationContext) -> Optional[str]:
+    def _determine_category(
+        question: str,
+        context_type: ConversationContext,
+        keywords: Optional[KeywordHits] = None
+    ) -> Optional[str]:
         """Determine question category based on content and context."""
-        question_lower = question.lower()
+        if keywords is None:
+            keywords = MESSAGE_KEYWORDS.scan(question)
         
         # Map context types to categories
         context_category_map = {
@@ -864,11 +1473,9 @@ class ChatService:
         category = context_category_map.get(context_type)
         
         # Override with specific keywords if found
-        if "vendor" in question_lower or "supplier" in question_lower:
-            category = "vendor"
-        elif "price" in question_lower or "cost" in question_lower:
-            category = "business"
-        elif "content" in question_lower or "reel" in question_lower:
-            category = "content"
+        for name in CATEGORY_KEYWORDS:
+            if keywords.any(("category", name)):
+                category = name
+                break
         
         return category
@@ -0,0 +1,196 @@
+"""
+Conversation Memory Service - Server-side history for chat sessions.
+
+Handles:
+1. Loading the recent turns of a conversation for the prompt
+2. Keeping a capped, expiring Redis list of turns per conversation
+3. Falling back to the chat_messages table when the list is cold
+4. Caching the conversation's rolling summary
+
+Clients only need to send the new message and conversation_id; the
+history comes from what the server stored, not from the request.
+"""
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.core.constants import CONVERSATION_MEMORY_MAX_MESSAGES, CONVERSATION_MEMORY_TTL
+from app.core.performance import cache_client
+from app.db.models import ChatMessage, Conversation
+
+logger = logging.getLogger(__name__)
+
+
+def _memory_key(user_id: int, conversation_id: int) -> str:
+    # Scoped by user so a foreign conversation_id never reads another user's thread
+    return f"conversation_memory:{user_id}:{conversation_id}"
+
+
+def _summary_key(user_id: int, conversation_id: int) -> str:
+    return f"{_memory_key(user_id, conversation_id)}:summary"
+
+
+class ConversationMemoryService:
+    """Service for server-side conversation history."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.max_messages = CONVERSATION_MEMORY_MAX_MESSAGES
+        self.ttl = CONVERSATION_MEMORY_TTL
+    
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+    
+    async def get_recent(self, user_id: int, conversation_id: int) -> List[Dict[str, str]]:
+        """
+        Recent turns of a conversation, oldest first.
+        
+        Served from Redis when the conversation is warm; otherwise loaded
+        from chat_messages (newest rows by the (conversation_id, id) index)
+        and written back to Redis.
+        
+        Args:
+            user_id: Owner of the conversation
+            conversation_id: The conversation
+        
+        Returns:
+            Messages as {"id", "role", "content"} dicts, id being the
+            chat_messages row the turn belongs to
+        """
+        key = _memory_key(user_id, conversation_id)
+        if cache_client:
+            try:
+                cached = cache_client.lrange(key, 0, -1)
+                if cached:
+                    cache_client.expire(key, self.ttl)
+                    return [json.loads(item) for item in cached]
+            except Exception as e:
+                logger.warning(f"Conversation memory read failed: {e}")
+        
+        history = await self._load_from_db(user_id, conversation_id)
+        self._write(key, history)
+        return history
+    
+    async def _load_from_db(self, user_id: int, conversation_id: int) -> List[Dict[str, str]]:
+        # Each row holds one user message and its response (two turns)
+        result = await self.db.execute(
+            select(ChatMessage.id, ChatMessage.message, ChatMessage.response)
+            .where(
+                ChatMessage.conversation_id == conversation_id,
+                ChatMessage.user_id == user_id,
+            )
+            .order_by(ChatMessage.id.desc())
+            .limit((self.max_messages + 1) // 2)
+        )
+        history = []
+        for message_id, message, response in reversed(result.all()):
+            history.append({"id": message_id, "role": "user", "content": message})
+            if response:
+                history.append({"id": message_id, "role": "assistant", "content": response})
+        return history[-self.max_messages:]
+    
+    async def get_summary(self, user_id: int, conversation_id: int) -> Tuple[Optional[str], int]:
+        """
+        The conversation's rolling summary.
+        
+        Returns:
+            (summary or None, id of the last chat_messages row it covers or 0)
+        """
+        key = _summary_key(user_id, conversation_id)
+        if cache_client:
+            try:
+                cached = cache_client.get(key)
+                if cached:
+                    data = json.loads(cached)
+                    return data["summary"], data["through"]
+            except Exception as e:
+                logger.warning(f"Conversation summary read failed: {e}")
+        
+        result = await self.db.execute(
+            select(Conversation.summary, Conversation.summary_message_id).where(
+                Conversation.id == conversation_id,
+                Conversation.user_id == user_id,
+            )
+        )
+        row = result.first()
+        summary, through = (row[0], row[1] or 0) if row else (None, 0)
+        self.cache_summary(user_id, conversation_id, summary, through)
+        return summary, through
+    
+    # -------------------------------------------------------------------------
+    # Writing
+    # -------------------------------------------------------------------------
+    
+    def append_turn(
+        self,
+        user_id: int,
+        conversation_id: int,
+        message_id: int,
+        message: str,
+        response: str
+    ) -> None:
+        """
+        Add a completed turn to a warm conversation.
+        
+        A cold conversation is left alone (RPUSHX); it is rebuilt from the
+        database in full on the next read.
+        """
+        if not cache_client:
+            return
+        key = _memory_key(user_id, conversation_id)
+        try:
+            pipe = cache_client.pipeline()
+            pipe.rpushx(key, json.dumps({"id": message_id, "role": "user", "content": message}))
+            if response:
+                pipe.rpushx(key, json.dumps({"id": message_id, "role": "assistant", "content": response}))
+            pipe.ltrim(key, -self.max_messages, -1)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Conversation memory write failed: {e}")
+    
+    def cache_summary(
+        self,
+        user_id: int,
+        conversation_id: int,
+        summary: Optional[str],
+        through: int
+    ) -> None:
+        """Cache a conversation's summary (None caches "no summary yet")."""
+        if not cache_client:
+            return
+        try:
+            cache_client.setex(
+                _summary_key(user_id, conversation_id),
+                self.ttl,
+                json.dumps({"summary": summary, "through": through}),
+            )
+        except Exception as e:
+            logger.warning(f"Conversation summary write failed: {e}")
+    
+    def forget_user(self, user_id: int) -> None:
+        """Drop every cached conversation of a user (e.g. history cleared)."""
+        if not cache_client:
+            return
+        try:
+            keys = list(cache_client.scan_iter(match=f"conversation_memory:{user_id}:*"))
+            if keys:
+                cache_client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Conversation memory clear failed: {e}")
+    
+    def _write(self, key: str, history: List[Dict[str, str]]) -> None:
+        if not cache_client or not history:
+            return
+        try:
+            pipe = cache_client.pipeline()
+            pipe.delete(key)
+            pipe.rpush(key, *(json.dumps(msg) for msg in history))
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Conversation memory write failed: {e}")
@@ -0,0 +1,155 @@
+"""
+Conversation Summary Service - Rolling summaries of long conversations.
+
+Handles:
+1. Deciding when a conversation's unsummarized turns are too long
+2. Folding the older turns into Conversation.summary with a cheaper model
+3. Running that work in the background, off the request path
+
+The prompt then carries the summary plus the most recent turns, so its
+size stays roughly flat however long a session runs.
+"""
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, or_
+
+from app.core.background import run_in_background
+from app.core.llm_gateway import llm_gateway
+from app.core.config import settings
+from app.core.constants import (
+    CONVERSATION_SUMMARY_KEEP_TURNS,
+    CONVERSATION_SUMMARY_BATCH_TURNS,
+    CONVERSATION_SUMMARY_MAX_TOKENS,
+    HISTORY_MESSAGE_MAX_TOKENS,
+)
+from app.db.database import AsyncSessionLocal
+from app.db.models import ChatMessage, Conversation
+from app.services.conversation_memory_service import ConversationMemoryService
+from app.utils.token_counter import count_message_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a mentoring chat between a user and TayAI, "
+    "a hair business mentor. Merge the existing summary with the new turns into one "
+    "updated summary. Keep facts about the user (business stage, goals, numbers, "
+    "products, constraints), questions asked, advice given and anything left open. "
+    "Drop greetings and filler. Write compact third-person notes, no preamble."
+)
+
+
+class ConversationSummaryService:
+    """Service for rolling conversation summaries."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.memory = ConversationMemoryService(db=db)
+    
+    @staticmethod
+    def needs_summary(unsummarized: List[Dict]) -> bool:
+        """Whether the turns not yet in the summary exceed the trigger size."""
+        trigger = settings.CONVERSATION_SUMMARY_TRIGGER_TOKENS
+        return trigger > 0 and count_message_tokens(unsummarized) > trigger
+    
+    def schedule(self, user_id: int, conversation_id: int) -> None:
+        """Summarize the conversation in the background (at most one run at a time)."""
+        run_in_background(
+            "conversation-summary",
+            summarize_conversation(user_id, conversation_id),
+            key=("conversation-summary", conversation_id),
+        )
+    
+    async def summarize(self, user_id: int, conversation_id: int) -> bool:
+        """
+        Fold the older unsummarized turns into the conversation's summary.
+        
+        The newest CONVERSATION_SUMMARY_KEEP_TURNS turns are left out, as
+        they are still sent verbatim. The write only applies if no newer
+        summary was stored meanwhile.
+        
+        Returns:
+            Whether the summary was updated
+        """
+        result = await self.db.execute(
+            select(Conversation.summary, Conversation.summary_message_id).where(
+                Conversation.id == conversation_id,
+                Conversation.user_id == user_id,
+            )
+        )
+        row = result.first()
+        if row is None:
+            return False
+        summary, through = row[0], row[1] or 0
+        
+        result = await self.db.execute(
+            select(ChatMessage.id, ChatMessage.message, ChatMessage.response)
+            .where(
+                ChatMessage.conversation_id == conversation_id,
+                ChatMessage.user_id == user_id,
+                ChatMessage.id > through,
+            )
+            .order_by(ChatMessage.id)
+            .limit(CONVERSATION_SUMMARY_BATCH_TURNS + CONVERSATION_SUMMARY_KEEP_TURNS)
+        )
+        turns = result.all()[:-CONVERSATION_SUMMARY_KEEP_TURNS]
+        if not turns:
+            return False
+        
+        new_summary = await self._generate_summary(summary, turns)
+        if not new_summary:
+            return False
+        new_through = turns[-1][0]
+        
+        result = await self.db.execute(
+            update(Conversation)
+            .where(
+                Conversation.id == conversation_id,
+                or_(Conversation.summary_message_id.is_(None), Conversation.summary_message_id < new_through),
+            )
+            .values(summary=new_summary, summary_message_id=new_through)
+        )
+        await self.db.commit()
+        if not result.rowcount:
+            return False
+        
+        self.memory.cache_summary(user_id, conversation_id, new_summary, new_through)
+        logger.info(
+            f"Summarized {len(turns)} turns of conversation {conversation_id} "
+            f"(through message {new_through})"
+        )
+        return True
+    
+    async def _generate_summary(self, summary: Optional[str], turns: List) -> Optional[str]:
+        lines = []
+        for _, message, response in turns:
+            lines.append(f"User: {truncate_to_tokens(message, HISTORY_MESSAGE_MAX_TOKENS)}")
+            if response:
+                lines.append(f"TayAI: {truncate_to_tokens(response, HISTORY_MESSAGE_MAX_TOKENS)}")
+        
+        response = await llm_gateway.chat_completion(
+            model=settings.CONVERSATION_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": (
+                    f"Existing summary:\n{summary or '(none)'}\n\n"
+                    "New turns:\n" + "\n".join(lines)
+                )},
+            ],
+            temperature=0.2,
+            max_tokens=CONVERSATION_SUMMARY_MAX_TOKENS,
+        )
+        if response.usage:
+            logger.info(
+                f"Conversation summary tokens: prompt {response.usage.prompt_tokens}, "
+                f"completion {response.usage.completion_tokens}"
+            )
+        content = response.choices[0].message.content
+        return content.strip() if content else None
+
+
+async def summarize_conversation(user_id: int, conversation_id: int) -> bool:
+    """Background entry point: summarize a conversation with its own session."""
+    async with AsyncSessionLocal() as db:
+        return await ConversationSummaryService(db).summarize(user_id, conversation_id)
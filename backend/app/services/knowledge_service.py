@@ -9,12 +9,15 @@ Handles:
 """
 import json
 import logging
+from datetime import datetime
 from typing import List, Optional, Dict, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from app.db.models import KnowledgeBase
+from app.core.constants import MISSING_KB_RESOLVE_CHUNK_BATCH
+from app.core.query_helpers import trigger_exists
+from app.db.models import KnowledgeBase, KnowledgeBaseCategoryStats
 from app.schemas.knowledge import (
     KnowledgeBaseItem,
     KnowledgeBaseCreate,
@@ -22,10 +25,14 @@ from app.schemas.knowledge import (
     BulkUploadResult,
     KnowledgeStats
 )
-from app.services.rag_service import RAGService
+from app.services.rag_service import RAGService, LIVE_TABLE, SHADOW_TABLE
+from app.services.missing_kb_service import MissingKBService
 
 logger = logging.getLogger(__name__)
 
+# Row trigger maintaining knowledge_base_category_stats (migration f_index_stats)
+CATEGORY_STATS_TRIGGER = "trg_knowledge_base_category_stats"
+
 
 class KnowledgeService:
     """Service for knowledge base operations."""
@@ -40,9 +47,17 @@ class KnowledgeService:
     
     async def create_knowledge_item(
         self,
-        item: KnowledgeBaseCreate
+        item: KnowledgeBaseCreate,
+        resolve_missing_kb: bool = True
     ) -> KnowledgeBaseItem:
-        """Create a new knowledge base item and index in PostgreSQL pgvector."""
+        """
+        Create a new knowledge base item and index in PostgreSQL pgvector.
+        
+        Args:
+            item: Item to create
+            resolve_missing_kb: Match the new chunks against open missing KB
+                items right away (bulk callers match once at the end)
+        """
         # Create database record
         db_item = KnowledgeBase(
             title=item.title,
@@ -77,7 +92,10 @@ class KnowledgeService:
         await self.db.refresh(db_item)
         
         logger.info(f"Created item {db_item.id} with {len(chunk_ids)} chunks")
-        return self._to_schema(db_item)
+        created = self._to_schema(db_item)
+        if resolve_missing_kb:
+            await self._resolve_missing_kb()
+        return created
     
     async def get_knowledge_item(self, item_id: int) -> Optional[KnowledgeBaseItem]:
         """Get a single knowledge base item by ID."""
@@ -142,7 +160,9 @@ class KnowledgeService:
             await self.db.commit()
             logger.info(f"Re-indexed item {item_id}")
         
-        return self._to_schema(db_item)
+        updated = self._to_schema(db_item)
+        await self._resolve_missing_kb()
+        return updated
     
     async def delete_knowledge_item(self, item_id: int) -> bool:
         """Delete a knowledge base item from DB and PostgreSQL pgvector."""
@@ -198,15 +218,17 @@ class KnowledgeService:
         
         for i, item in enumerate(items):
             try:
-                created = await self.create_knowledge_item(item)
+                created = await self.create_knowledge_item(item, resolve_missing_kb=False)
                 created_ids.append(created.id)
                 success_count += 1
             except Exception as e:
                 error_count += 1
                 errors.append({"index": i, "title": item.title, "error": str(e)})
                 logger.error(f"Error creating '{item.title}': {e}")
+            await self._resolve_missing_kb(min_chunks=MISSING_KB_RESOLVE_CHUNK_BATCH)
         
         logger.info(f"Bulk create: {success_count} success, {error_count} errors")
+        await self._resolve_missing_kb()
         
         return BulkUploadResult(
             total=len(items),
@@ -216,52 +238,149 @@ class KnowledgeService:
             created_ids=created_ids
         )
     
-    async def reindex_all(self) -> Tuple[int, int]:
-        """Reindex all knowledge base items in PostgreSQL pgvector."""
+    async def reindex_all(self, shadow: bool = True) -> Tuple[int, int]:
+        """
+        Reindex all active knowledge base items in PostgreSQL pgvector.
+        
+        With shadow=True (default) the new vectors are written to a shadow
+        generation that is indexed and swapped in atomically, so retrieval
+        keeps serving the previous generation for the whole rebuild. If any
+        item fails, the shadow is discarded and the live index is untouched.
+        
+        Args:
+            shadow: Build into a shadow generation instead of upserting in place
+        
+        Missing KB items are not matched here: the rebuilt content is what
+        was already indexed, and edits made during the build were matched
+        when they were saved.
+        
+        Returns:
+            Tuple of (success_count, error_count)
+        """
+        self.rag_service.track_indexed_chunks = False
+        try:
+            return await self._reindex_items(shadow)
+        finally:
+            self.rag_service.track_indexed_chunks = True
+    
+    async def _reindex_items(self, shadow: bool) -> Tuple[int, int]:
+        build_started_at = await self.rag_service.begin_shadow_build() if shadow else None
+        
         result = await self.db.execute(
             select(KnowledgeBase).where(KnowledgeBase.is_active == True)
         )
         items = result.scalars().all()
         
+        target_table = SHADOW_TABLE if shadow else LIVE_TABLE
         success_count = 0
         error_count = 0
         
-        for item in items:
-            try:
-                content_id = f"kb_{item.id}"
-                success, _ = await self.rag_service.index_content(
-                    content=item.content,
-                    metadata={
-                        "title": item.title,
-                        "category": item.category or "",
-                        "id": item.id,
-                        "source": "knowledge_base"
-                    },
-                    content_id=content_id,
-                    chunk_content=True,
-                    knowledge_base_id=item.id
-                )
-                
-                if success:
-                    item.vector_id = content_id
+        try:
+            for item in items:
+                if await self._index_item(item, target_table):
                     success_count += 1
                 else:
                     error_count += 1
-            except Exception as e:
-                logger.error(f"Error reindexing item {item.id}: {e}")
-                error_count += 1
+            
+            if shadow:
+                if error_count:
+                    await self.rag_service.abort_shadow_build()
+                    logger.error(f"Reindex aborted: {error_count} items failed to index")
+                    return success_count, error_count
+                await self.rag_service.swap_shadow_build()
+                await self._catch_up_since(build_started_at)
+                await self.rag_service.drop_retired_generation()
+        except Exception:
+            if shadow:
+                await self.rag_service.abort_shadow_build()
+            raise
         
         await self.db.commit()
         logger.info(f"Reindex: {success_count} success, {error_count} errors")
         
         return success_count, error_count
     
+    async def _index_item(self, item: KnowledgeBase, target_table: str = LIVE_TABLE) -> bool:
+        """Index a single knowledge base item into the given generation table."""
+        content_id = f"kb_{item.id}"
+        try:
+            success, _ = await self.rag_service.index_content(
+                content=item.content,
+                metadata={
+                    "title": item.title,
+                    "category": item.category or "",
+                    "id": item.id,
+                    "source": "knowledge_base"
+                },
+                content_id=content_id,
+                chunk_content=True,
+                knowledge_base_id=item.id,
+                target_table=target_table,
+                replace=target_table == LIVE_TABLE
+            )
+        except Exception as e:
+            logger.error(f"Error reindexing item {item.id}: {e}")
+            return False
+        
+        if success:
+            item.vector_id = content_id
+        return success
+    
+    async def _catch_up_since(self, since: datetime) -> None:
+        """
+        Apply knowledge base edits made while a shadow generation was building.
+        
+        Those edits went to the old live table, so items changed since the
+        build started are re-indexed and vectors of deleted items pruned.
+        """
+        result = await self.db.execute(
+            select(KnowledgeBase).where(
+                KnowledgeBase.is_active == True,
+                func.coalesce(KnowledgeBase.updated_at, KnowledgeBase.created_at) >= since
+            )
+        )
+        changed = result.scalars().all()
+        for item in changed:
+            await self._index_item(item)
+        
+        pruned = await self.rag_service.prune_orphaned_vectors()
+        if changed or pruned:
+            logger.info(f"Reindex catch-up: {len(changed)} re-indexed, {pruned} orphaned vectors pruned")
+    
+    async def _resolve_missing_kb(self, min_chunks: int = 1) -> None:
+        """
+        Resolve missing KB items closed by the chunks indexed so far.
+        
+        Runs after the indexing work is committed; a failure here is logged
+        and never fails the indexing job itself. Bulk jobs call it with
+        min_chunks while indexing, so only a bounded batch of chunk vectors
+        is held at a time.
+        """
+        if len(self.rag_service.indexed_chunks) < min_chunks:
+            return
+        chunks, self.rag_service.indexed_chunks = self.rag_service.indexed_chunks, []
+        try:
+            await MissingKBService(self.db, self.rag_service).resolve_with_chunks(chunks)
+        except Exception as e:
+            logger.warning(f"Missing KB auto-resolution failed: {e}")
+            await self.db.rollback()
+    
     # -------------------------------------------------------------------------
     # Statistics & Search
     # -------------------------------------------------------------------------
     
     async def get_categories(self) -> List[Dict]:
-        """Get all categories with item counts."""
+        """Get all categories with active item counts."""
+        if await self._category_stats_maintained():
+            result = await self.db.execute(
+                select(KnowledgeBaseCategoryStats)
+                .where(KnowledgeBaseCategoryStats.active_count > 0)
+            )
+            return [
+                {"category": row.category or "uncategorized", "count": row.active_count}
+                for row in result.scalars().all()
+            ]
+        
         result = await self.db.execute(
             select(
                 KnowledgeBase.category,
@@ -277,15 +396,29 @@ class KnowledgeService:
         ]
     
     async def get_stats(self) -> KnowledgeStats:
-        """Get statistics about the knowledge base."""
-        total = (await self.db.execute(
-            select(func.count(KnowledgeBase.id))
-        )).scalar()
-        
-        active = (await self.db.execute(
-            select(func.count(KnowledgeBase.id))
-            .where(KnowledgeBase.is_active == True)
-        )).scalar()
+        """
+        Get statistics about the knowledge base.
+        
+        Reads trigger-maintained counters when available, so the cost does
+        not grow with the size of the knowledge base.
+        """
+        if await self._category_stats_maintained():
+            totals = (await self.db.execute(
+                select(
+                    func.coalesce(func.sum(KnowledgeBaseCategoryStats.total_count), 0),
+                    func.coalesce(func.sum(KnowledgeBaseCategoryStats.active_count), 0)
+                )
+            )).first()
+            total, active = int(totals[0]), int(totals[1])
+        else:
+            total = (await self.db.execute(
+                select(func.count(KnowledgeBase.id))
+            )).scalar()
+            
+            active = (await self.db.execute(
+                select(func.count(KnowledgeBase.id))
+                .where(KnowledgeBase.is_active == True)
+            )).scalar()
         
         categories = await self.get_categories()
         
@@ -300,9 +433,20 @@ class KnowledgeService:
             active_items=active,
             categories=categories,
             vector_count=index_stats.get("total_vectors", 0),
-            index_dimension=index_stats.get("dimension", 0)
+            index_dimension=index_stats.get("dimension", 0),
+            vector_counts_exact=index_stats.get("counts_exact", False),
+            namespaces=index_stats.get("namespaces", {}),
+            index_size_bytes=index_stats.get("index_size_bytes"),
+            table_size_bytes=index_stats.get("table_size_bytes"),
+            index_generation=index_stats.get("generation"),
+            last_reindex_at=index_stats.get("last_reindex_at"),
+            reindex_in_progress=index_stats.get("reindex_in_progress", False)
         )
     
+    async def _category_stats_maintained(self) -> bool:
+        """Whether knowledge_base_category_stats is kept current by its trigger."""
+        return await trigger_exists(self.db, "knowledge_base", CATEGORY_STATS_TRIGGER)
+    
     async def search_knowledge(
         self,
         query: str,
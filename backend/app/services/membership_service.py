@@ -16,6 +16,7 @@ from datetime import datetime, timedelta, timezone
 
 from app.core.config import settings
 from app.core.constants import UserTier
+from app.core.http import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -64,8 +65,14 @@ class MembershipService:
     with external membership platforms.
     """
     
-    def __init__(self, platform: MembershipPlatform = MembershipPlatform.CUSTOM):
+    def __init__(
+        self,
+        platform: MembershipPlatform = MembershipPlatform.CUSTOM,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
         self.platform = platform
+        # Pooled client shared across requests (app.core.http)
+        self.http_client = http_client or get_http_client("membership")
         self.api_url = settings.MEMBERSHIP_PLATFORM_API_URL
         # Use Skool-specific secret if available, otherwise use generic API key
         if platform == MembershipPlatform.SKOOL and settings.SKOOL_WEBHOOK_SECRET:
@@ -266,22 +273,20 @@ class MembershipService:
             return None
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.api_url}/users",
-                    params={"email": email},
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    return None
-                else:
-                    logger.error(f"Platform API error: {response.status_code}")
-                    return None
-                    
+            response = await self.http_client.get(
+                f"{self.api_url}/users",
+                params={"email": email},
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                return None
+            else:
+                logger.error(f"Platform API error: {response.status_code}")
+                return None
+            
         except Exception as e:
             logger.error(f"Failed to fetch user from platform: {e}")
             return None
@@ -0,0 +1,130 @@
+"""
+Missing KB Service - Close knowledge gaps automatically.
+
+Handles:
+1. Caching embeddings of unresolved missing-KB questions
+2. Matching them against freshly indexed chunks in one matrix product
+3. Marking matched items resolved with the KB item that closed the gap
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+
+from app.core.constants import MISSING_KB_RESOLVE_SIMILARITY, MISSING_KB_MATCH_BATCH_SIZE
+from app.db.models import MissingKBItem
+from app.services.rag_service import RAGService
+from app.utils.vectors import to_blob, stack_blobs, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+class MissingKBService:
+    """Service for missing knowledge base items."""
+    
+    def __init__(self, db: AsyncSession, rag_service: Optional[RAGService] = None):
+        self.db = db
+        self.rag_service = rag_service or RAGService(db=db)
+        self.dimension = self.rag_service.embedding_dimension
+        self.threshold = MISSING_KB_RESOLVE_SIMILARITY
+    
+    # -------------------------------------------------------------------------
+    # Auto-resolution
+    # -------------------------------------------------------------------------
+    
+    async def resolve_with_chunks(self, chunks: Sequence[Tuple[Optional[int], np.ndarray]]) -> int:
+        """
+        Resolve unresolved items answered by newly indexed chunks.
+        
+        Each question is embedded once (the vector is cached on the row) and
+        scored against every new chunk in a single matrix product per batch
+        of items. An item is resolved by the KB item owning its best chunk if
+        that chunk's similarity reaches the RAG confidence threshold.
+        
+        Args:
+            chunks: (knowledge_base_id, embedding) pairs, as collected in
+                RAGService.indexed_chunks
+        
+        Returns:
+            Number of items marked resolved
+        """
+        chunks = [(kb_id, vector) for kb_id, vector in chunks if kb_id is not None]
+        if not chunks:
+            return 0
+        
+        kb_ids = np.array([kb_id for kb_id, _ in chunks], dtype=np.int64)
+        chunk_matrix = normalize_rows(np.vstack([vector for _, vector in chunks]).astype(np.float32, copy=False))
+        
+        resolved = 0
+        last_id = 0
+        while True:
+            items = (await self.db.execute(
+                select(MissingKBItem.id, MissingKBItem.question, MissingKBItem.question_embedding)
+                .where(MissingKBItem.is_resolved == False)
+                .where(MissingKBItem.id > last_id)
+                .order_by(MissingKBItem.id)
+                .limit(MISSING_KB_MATCH_BATCH_SIZE)
+            )).all()
+            if not items:
+                break
+            last_id = items[-1].id
+            
+            questions = await self._question_matrix(items)
+            sims = questions @ chunk_matrix.T
+            best = sims.argmax(axis=1)
+            scores = sims[np.arange(len(items)), best]
+            
+            matched = [
+                (items[i].id, int(kb_ids[best[i]]), float(scores[i]))
+                for i in np.flatnonzero(scores >= self.threshold)
+            ]
+            if matched:
+                await self._mark_resolved(matched)
+                resolved += len(matched)
+            await self.db.commit()
+            
+            if len(items) < MISSING_KB_MATCH_BATCH_SIZE:
+                break
+        
+        if resolved:
+            logger.info(f"Auto-resolved {resolved} missing KB items against {len(chunks)} new chunks")
+        return resolved
+    
+    async def _question_matrix(self, items) -> np.ndarray:
+        """Stack cached question embeddings, embedding and caching any missing ones."""
+        pending = [item for item in items if item.question_embedding is None]
+        fresh: Dict[int, bytes] = {}
+        if pending:
+            vectors = await self.rag_service.embed_texts([item.question for item in pending])
+            fresh = {item.id: to_blob(vector) for item, vector in zip(pending, vectors)}
+            await self.db.execute(
+                update(MissingKBItem),
+                [{"id": item_id, "question_embedding": blob} for item_id, blob in fresh.items()]
+            )
+        
+        blobs = [item.question_embedding or fresh[item.id] for item in items]
+        return normalize_rows(stack_blobs(blobs, self.dimension))
+    
+    async def _mark_resolved(self, matched: List[Tuple[int, int, float]]) -> None:
+        """Mark (item_id, kb_id, score) matches resolved, recording the match."""
+        now = datetime.now(timezone.utc)
+        result = await self.db.execute(
+            select(MissingKBItem).where(MissingKBItem.id.in_([item_id for item_id, _, _ in matched]))
+        )
+        items = {item.id: item for item in result.scalars().all()}
+        
+        for item_id, kb_id, score in matched:
+            item = items.get(item_id)
+            if item is None or item.is_resolved:
+                continue
+            item.is_resolved = True
+            item.resolved_at = now
+            item.resolved_by_kb_id = kb_id
+            item.extra_metadata = {
+                **(item.extra_metadata or {}),
+                "auto_resolved": True,
+                "match_score": round(score, 4),
+            }
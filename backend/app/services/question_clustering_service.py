@@ -0,0 +1,364 @@
+"""
+Question Clustering Service - Group paraphrased questions for analytics.
+
+Handles:
+1. Embedding new QuestionLog rows in batches
+2. Incremental assignment to the nearest cluster centroid (NumPy)
+3. Periodic re-clustering (k-means refinement + merging near-duplicates)
+4. Maintaining the per-cluster, per-day rollup read by the stats endpoints
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.constants import (
+    QUESTION_CLUSTER_SIMILARITY,
+    QUESTION_CLUSTER_MERGE_SIMILARITY,
+    QUESTION_CLUSTER_BATCH_SIZE,
+    QUESTION_RECLUSTER_MAX_POINTS,
+    QUESTION_RECLUSTER_ITERATIONS,
+)
+from app.db.database import AsyncSessionLocal
+from app.db.models import QuestionLog, QuestionCluster, QuestionEmbedding, QuestionClusterDaily
+from app.services.rag_service import RAGService
+from app.utils.vectors import (
+    to_blob,
+    stack_blobs,
+    normalize_rows,
+    assign_to_centroids,
+    kmeans_refine,
+    merge_close_centroids,
+)
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock so concurrent workers never cluster the same rows twice
+CLUSTERING_LOCK_SQL = "SELECT pg_try_advisory_xact_lock(hashtext('question_clustering'))"
+
+
+class QuestionClusteringService:
+    """Service for question embedding and clustering."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.rag_service = RAGService(db=db)
+        self.dimension = self.rag_service.embedding_dimension
+    
+    # -------------------------------------------------------------------------
+    # Incremental Assignment
+    # -------------------------------------------------------------------------
+    
+    async def cluster_new_questions(self, batch_size: int = QUESTION_CLUSTER_BATCH_SIZE) -> int:
+        """
+        Embed one batch of unclustered questions and assign them to clusters.
+        
+        Returns:
+            Number of questions clustered (0 if none pending or another
+            worker holds the clustering lock)
+        """
+        if not (await self.db.execute(text(CLUSTERING_LOCK_SQL))).scalar():
+            await self.db.rollback()
+            return 0
+        
+        rows = (await self.db.execute(
+            select(QuestionLog.id, QuestionLog.question, QuestionLog.normalized_question, QuestionLog.created_at)
+            .where(QuestionLog.cluster_id.is_(None))
+            .order_by(QuestionLog.id)
+            .limit(batch_size)
+        )).all()
+        if not rows:
+            await self.db.rollback()
+            return 0
+        
+        vectors = await self.rag_service.embed_texts(
+            [row.normalized_question or row.question for row in rows]
+        )
+        embeddings = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        
+        clusters = list((await self.db.execute(
+            select(QuestionCluster).order_by(QuestionCluster.id)
+        )).scalars().all())
+        centroids = stack_blobs([c.centroid for c in clusters], self.dimension)
+        counts = np.array([c.size for c in clusters], dtype=np.int64)
+        
+        labels, centroids, counts = assign_to_centroids(
+            embeddings, centroids, counts, QUESTION_CLUSTER_SIMILARITY
+        )
+        
+        # Persist centroid updates and new clusters
+        for j in np.unique(labels):
+            if j < len(clusters):
+                clusters[j].centroid = to_blob(centroids[j])
+                clusters[j].size = int(counts[j])
+        for j in range(len(clusters), len(centroids)):
+            first = rows[int(np.flatnonzero(labels == j)[0])]
+            clusters.append(QuestionCluster(
+                centroid=to_blob(centroids[j]),
+                size=int(counts[j]),
+                representative_log_id=first.id,
+                representative_question=first.question,
+            ))
+            self.db.add(clusters[-1])
+        await self.db.flush()
+        
+        cluster_ids = [clusters[int(j)].id for j in labels]
+        self.db.add_all([
+            QuestionEmbedding(question_log_id=row.id, cluster_id=cluster_id, embedding=to_blob(vector))
+            for row, cluster_id, vector in zip(rows, cluster_ids, embeddings)
+        ])
+        await self.db.execute(
+            update(QuestionLog),
+            [{"id": row.id, "cluster_id": cluster_id} for row, cluster_id in zip(rows, cluster_ids)]
+        )
+        await self._add_to_rollup(rows, cluster_ids)
+        
+        await self.db.commit()
+        logger.info(f"Clustered {len(rows)} questions into {len(np.unique(labels))} clusters ({len(clusters)} total)")
+        return len(rows)
+    
+    async def _add_to_rollup(self, rows, cluster_ids: List[int]) -> None:
+        """Upsert per-day counts for newly clustered rows."""
+        buckets: Dict[Tuple[int, object], list] = defaultdict(list)
+        for row, cluster_id in zip(rows, cluster_ids):
+            buckets[(cluster_id, row.created_at.astimezone(timezone.utc).date())].append(row.created_at)
+        
+        stmt = insert(QuestionClusterDaily).values([
+            {
+                "cluster_id": cluster_id,
+                "day": day,
+                "count": len(times),
+                "first_asked": min(times),
+                "last_asked": max(times),
+            }
+            for (cluster_id, day), times in buckets.items()
+        ])
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[QuestionClusterDaily.cluster_id, QuestionClusterDaily.day],
+            set_={
+                "count": QuestionClusterDaily.count + stmt.excluded.count,
+                "first_asked": func.least(QuestionClusterDaily.first_asked, stmt.excluded.first_asked),
+                "last_asked": func.greatest(QuestionClusterDaily.last_asked, stmt.excluded.last_asked),
+            }
+        ))
+    
+    # -------------------------------------------------------------------------
+    # Periodic Re-clustering
+    # -------------------------------------------------------------------------
+    
+    async def recluster(self) -> Dict[str, int]:
+        """
+        Refine centroids over recent questions and merge near-duplicate clusters.
+        
+        Incremental assignment never revisits earlier decisions, so clusters
+        drift and paraphrase groups that started apart stay apart. This pass
+        re-seats every recent embedding, merges clusters whose centroids
+        converged, and rebuilds the rollup.
+        
+        Returns:
+            Dict with clusters before/after and embeddings reassigned
+        """
+        if not (await self.db.execute(text(CLUSTERING_LOCK_SQL))).scalar():
+            await self.db.rollback()
+            return {"clusters_before": 0, "clusters_after": 0, "reassigned": 0}
+        
+        clusters = list((await self.db.execute(
+            select(QuestionCluster).order_by(QuestionCluster.id)
+        )).scalars().all())
+        points = (await self.db.execute(
+            select(QuestionEmbedding.question_log_id, QuestionEmbedding.cluster_id, QuestionEmbedding.embedding)
+            .order_by(QuestionEmbedding.question_log_id.desc())
+            .limit(QUESTION_RECLUSTER_MAX_POINTS)
+        )).all()
+        if not clusters or not points:
+            await self.db.rollback()
+            return {"clusters_before": len(clusters), "clusters_after": len(clusters), "reassigned": 0}
+        
+        index_of = {c.id: j for j, c in enumerate(clusters)}
+        embeddings = stack_blobs([p.embedding for p in points], self.dimension)
+        labels, centroids = kmeans_refine(
+            embeddings,
+            stack_blobs([c.centroid for c in clusters], self.dimension),
+            QUESTION_RECLUSTER_ITERATIONS
+        )
+        
+        mapping = merge_close_centroids(
+            centroids, np.bincount(labels, minlength=len(clusters)), QUESTION_CLUSTER_MERGE_SIMILARITY
+        )
+        labels = np.array([mapping[j] for j in labels], dtype=np.int64)
+        
+        # Move points whose cluster changed
+        moved = [
+            {"question_log_id": p.question_log_id, "cluster_id": clusters[int(j)].id}
+            for p, j in zip(points, labels)
+            if index_of.get(p.cluster_id) != int(j)
+        ]
+        if moved:
+            await self.db.execute(update(QuestionEmbedding), moved)
+        
+        # Fold merged clusters (including members outside the refined window)
+        merged = {clusters[j].id: clusters[target].id for j, target in enumerate(mapping) if target != j}
+        for source_id, target_id in merged.items():
+            await self.db.execute(
+                update(QuestionEmbedding)
+                .where(QuestionEmbedding.cluster_id == source_id)
+                .values(cluster_id=target_id)
+            )
+        
+        # Recompute centroids and representatives from the refined members
+        for j in np.unique(labels):
+            members = np.flatnonzero(labels == j)
+            centroid = normalize_rows(embeddings[members].sum(axis=0))[0]
+            closest = members[int((embeddings[members] @ centroid).argmax())]
+            clusters[int(j)].centroid = to_blob(centroid)
+            clusters[int(j)].representative_log_id = points[int(closest)].question_log_id
+        
+        await self.db.execute(delete(QuestionCluster).where(QuestionCluster.id.in_(list(merged))))
+        await self.db.flush()
+        await self._sync_after_recluster()
+        
+        await self.db.commit()
+        after = len(clusters) - len(merged)
+        logger.info(f"Reclustered {len(points)} questions: {len(clusters)} -> {after} clusters, {len(moved)} moved")
+        return {"clusters_before": len(clusters), "clusters_after": after, "reassigned": len(moved)}
+    
+    async def _sync_after_recluster(self) -> None:
+        """Propagate cluster ids to question_logs and rebuild sizes and rollup."""
+        await self.db.execute(text("""
+            UPDATE question_logs ql
+            SET cluster_id = qe.cluster_id
+            FROM question_embeddings qe
+            WHERE qe.question_log_id = ql.id
+              AND ql.cluster_id IS DISTINCT FROM qe.cluster_id
+        """))
+        await self.db.execute(text("""
+            UPDATE question_clusters c
+            SET size = s.n, updated_at = now()
+            FROM (SELECT cluster_id, COUNT(*) AS n FROM question_embeddings GROUP BY cluster_id) s
+            WHERE c.id = s.cluster_id
+        """))
+        await self.db.execute(text("""
+            DELETE FROM question_clusters c
+            WHERE NOT EXISTS (SELECT 1 FROM question_embeddings qe WHERE qe.cluster_id = c.id)
+        """))
+        await self.db.execute(text("""
+            UPDATE question_clusters c
+            SET representative_question = ql.question
+            FROM question_logs ql
+            WHERE ql.id = c.representative_log_id
+              AND c.representative_question IS DISTINCT FROM ql.question
+        """))
+        await self.db.execute(text("DELETE FROM question_cluster_daily"))
+        await self.db.execute(text("""
+            INSERT INTO question_cluster_daily (cluster_id, day, count, first_asked, last_asked)
+            SELECT cluster_id, (created_at AT TIME ZONE 'UTC')::date, COUNT(*), MIN(created_at), MAX(created_at)
+            FROM question_logs
+            WHERE cluster_id IS NOT NULL
+            GROUP BY 1, 2
+        """))
+
+
+    # -------------------------------------------------------------------------
+    # Analytics
+    # -------------------------------------------------------------------------
+    
+    async def get_top_clusters(self, since: datetime, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Most-asked question clusters since a date, read from the daily rollup.
+        
+        Counts are bucketed by UTC day, so the window starts at midnight of
+        the since date. Each cluster is described by its representative
+        question log.
+        
+        Args:
+            since: Start of the reporting window
+            limit: Maximum clusters to return (None for all)
+        
+        Returns:
+            List of dicts ordered by count, empty if nothing is clustered yet
+        """
+        query = (
+            select(
+                QuestionCluster.id.label("cluster_id"),
+                QuestionCluster.representative_question,
+                QuestionLog.id.label("sample_id"),
+                QuestionLog.normalized_question,
+                QuestionLog.category,
+                QuestionLog.context_type,
+                QuestionLog.user_id,
+                QuestionLog.user_tier,
+                func.sum(QuestionClusterDaily.count).label("count"),
+                func.min(QuestionClusterDaily.first_asked).label("first_asked"),
+                func.max(QuestionClusterDaily.last_asked).label("last_asked"),
+            )
+            .join(QuestionCluster, QuestionCluster.id == QuestionClusterDaily.cluster_id)
+            .outerjoin(QuestionLog, QuestionLog.id == QuestionCluster.representative_log_id)
+            .where(QuestionClusterDaily.day >= since.astimezone(timezone.utc).date())
+            .group_by(QuestionCluster.id, QuestionLog.id)
+            .order_by(func.sum(QuestionClusterDaily.count).desc())
+        )
+        if limit:
+            query = query.limit(limit)
+        
+        try:
+            result = await self.db.execute(query)
+        except Exception as e:
+            logger.warning(f"Could not read question cluster rollup: {e}")
+            await self.db.rollback()
+            return []
+        
+        return [
+            {
+                "cluster_id": row.cluster_id,
+                "question": row.representative_question or "",
+                "normalized_question": row.normalized_question,
+                "category": row.category,
+                "context_type": row.context_type,
+                "user_id": row.user_id,
+                "user_tier": row.user_tier,
+                "sample_id": row.sample_id,
+                "count": int(row.count),
+                "first_asked": row.first_asked,
+                "last_asked": row.last_asked,
+            }
+            for row in result.all()
+        ]
+
+
+# =============================================================================
+# Background Job
+# =============================================================================
+
+_last_recluster_at = 0.0
+
+
+async def run_question_clustering(max_batches: int = 10, force_recluster: bool = False) -> Dict[str, int]:
+    """
+    One pass of the clustering job: drain pending questions, then recluster
+    if QUESTION_RECLUSTER_INTERVAL_HOURS has elapsed (or force_recluster).
+    """
+    global _last_recluster_at
+    clustered = 0
+    summary: Dict[str, int] = {}
+    
+    async with AsyncSessionLocal() as db:
+        service = QuestionClusteringService(db)
+        for _ in range(max_batches):
+            count = await service.cluster_new_questions()
+            clustered += count
+            if count < QUESTION_CLUSTER_BATCH_SIZE:
+                break
+        
+        due = time.monotonic() - _last_recluster_at >= settings.QUESTION_RECLUSTER_INTERVAL_HOURS * 3600
+        if force_recluster or (due and clustered):
+            summary = await service.recluster()
+            _last_recluster_at = time.monotonic()
+    
+    return {"clustered": clustered, **summary}
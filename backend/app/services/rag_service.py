@@ -8,21 +8,78 @@ Handles the core RAG pipeline:
 """
 import re
 import logging
+from datetime import datetime
 from typing import List, Dict, Tuple, Optional, Union
 from dataclasses import dataclass, field
 import json
 
+import numpy as np
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text, select, delete
 from sqlalchemy.dialects.postgresql import JSONB
 
 from app.core.config import settings
-from app.core.clients import get_openai_client
+from app.core.llm_gateway import llm_gateway
+from app.core.constants import VECTOR_REINDEX_STALE_SECONDS
+from app.core.exceptions import TayAIError
+from app.core.query_helpers import trigger_exists, estimate_row_count
 from app.db.models import VectorEmbedding
 
 logger = logging.getLogger(__name__)
 
 
+# =============================================================================
+# Index Generations
+# =============================================================================
+
+# Retrieval always reads LIVE_TABLE. A full reindex is built into SHADOW_TABLE
+# and swapped in by renaming; the previous generation is kept as RETIRED_TABLE
+# until it is garbage-collected.
+LIVE_TABLE = "vector_embeddings"
+SHADOW_TABLE = "vector_embeddings_next"
+RETIRED_TABLE = "vector_embeddings_prev"
+
+# Canonical index names on the live table. Shadow indexes are created with a
+# "_next" suffix and renamed to these during the swap.
+PRIMARY_KEY_NAME = "vector_embeddings_pkey"
+ANN_INDEX_NAME = "ix_vector_embeddings_embedding_ann"
+SECONDARY_INDEXES = {
+    "ix_vector_embeddings_knowledge_base_id": "knowledge_base_id",
+    "ix_vector_embeddings_namespace": "namespace",
+    "ix_vector_embeddings_parent_id": "parent_id",
+}
+SHADOW_SUFFIX = "_next"
+RETIRED_SUFFIX = "_prev"
+
+# Statement-level triggers that keep vector_index_stats in step with the live
+# table (installed by migration f_index_stats, re-created on each shadow).
+STATS_TRIGGER_NAMES = (
+    "trg_vector_index_stats_ins",
+    "trg_vector_index_stats_upd",
+    "trg_vector_index_stats_del",
+)
+
+
+def _upsert_sql(table: str) -> str:
+    """Build the vector upsert statement for a generation table."""
+    return f"""
+        INSERT INTO {table}
+            (id, knowledge_base_id, embedding, content, meta_data, namespace, chunk_index, parent_id)
+        VALUES
+            (:id, :kb_id, CAST(:embedding AS vector), :content, CAST(:meta_data AS jsonb),
+             :namespace, :chunk_index, :parent_id)
+        ON CONFLICT (id) DO UPDATE SET
+            knowledge_base_id = EXCLUDED.knowledge_base_id,
+            embedding = EXCLUDED.embedding,
+            content = EXCLUDED.content,
+            meta_data = EXCLUDED.meta_data,
+            namespace = EXCLUDED.namespace,
+            chunk_index = EXCLUDED.chunk_index,
+            parent_id = EXCLUDED.parent_id
+    """
+
+
 # =============================================================================
 # Data Classes
 # =============================================================================
@@ -71,6 +128,11 @@ class RAGService:
         self.chunk_config = chunk_config or ChunkConfig()
         self.embedding_model = settings.OPENAI_EMBEDDING_MODEL
         self.embedding_dimension = 1536  # text-embedding-3-small dimension
+        # (knowledge_base_id, float32 embedding) of every KB chunk written by this
+        # instance while track_indexed_chunks is set, consumed by post-indexing
+        # jobs such as missing KB auto-resolution
+        self.track_indexed_chunks = True
+        self.indexed_chunks: List[Tuple[int, np.ndarray]] = []
     
     # -------------------------------------------------------------------------
     # Context Retrieval
@@ -83,7 +145,8 @@ class RAGService:
         score_threshold: float = 0.7,
         filter_metadata: Optional[Dict] = None,
         include_sources: bool = False,
-        namespace: Optional[str] = None
+        namespace: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> Union[str, ContextResult]:
         """
         Retrieve relevant context from knowledge base.
@@ -95,6 +158,7 @@ class RAGService:
             filter_metadata: Optional metadata filters
             include_sources: Whether to return detailed source info
             namespace: Optional namespace filter
+            query_embedding: Precomputed embedding of query (see embed_query)
         
         Returns:
             Context string or ContextResult with sources
@@ -104,7 +168,7 @@ class RAGService:
             return ContextResult("", [], 0, 0.0) if include_sources else ""
         
         try:
-            embedding = await self._generate_embedding(query)
+            embedding = query_embedding or await self._generate_embedding(query)
             
             # Build SQL query for vector similarity search
             # Using cosine distance (1 - cosine similarity)
@@ -145,7 +209,8 @@ class RAGService:
                         params[f"key_{key}"] = key
                         params[f"value_{key}"] = str(value)
             
-            query_sql += " ORDER BY similarity DESC LIMIT :top_k"
+            # Order by raw distance so the planner can use the ANN index
+            query_sql += f" ORDER BY embedding <=> '{embedding_str}'::vector LIMIT :top_k"
             params["top_k"] = top_k
             
             result = await self.db.execute(text(query_sql), params)
@@ -175,8 +240,8 @@ class RAGService:
             
             sources = [
                 {
-                    "title": m.meta_data.get("title", "Unknown") if m.meta_data else "Unknown",
-                    "category": m.meta_data.get("category", "") if m.meta_data else "",
+                    "title": m.metadata.get("title", "Unknown") if m.metadata else "Unknown",
+                    "category": m.metadata.get("category", "") if m.metadata else "",
                     "score": round(m.score, 3),
                     "chunk_id": m.chunk_id
                 }
@@ -186,7 +251,7 @@ class RAGService:
             if include_sources:
                 return ContextResult(context, sources, len(matches), round(avg_score, 3))
             return context
-            
+        
         except Exception as e:
             logger.error(f"Error retrieving context: {e}")
             # Rollback transaction if it's in a failed state
@@ -199,8 +264,8 @@ class RAGService:
     
     def _format_context(self, result: RetrievalResult) -> str:
         """Format a single context piece."""
-        title = result.meta_data.get("title", "") if result.meta_data else ""
-        category = result.meta_data.get("category", "") if result.meta_data else ""
+        title = result.metadata.get("title", "") if result.metadata else ""
+        category = result.metadata.get("category", "") if result.metadata else ""
         
         header = ""
         if title:
@@ -215,9 +280,20 @@ class RAGService:
     # Embedding Generation
     # -------------------------------------------------------------------------
     
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a user query once so callers can share it between retrieval
+        and other vector lookups (e.g. the semantic response cache).
+        """
+        return await self._generate_embedding(query)
+    
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts in one API call."""
+        return await self._generate_embeddings_batch(texts)
+    
     async def _generate_embedding(self, text: str) -> List[float]:
         """Generate embedding vector for text."""
-        response = await get_openai_client().embeddings.create(
+        response = await llm_gateway.embeddings(
             model=self.embedding_model,
             input=text
         )
@@ -225,7 +301,7 @@ class RAGService:
     
     async def _generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for multiple texts in batch."""
-        response = await get_openai_client().embeddings.create(
+        response = await llm_gateway.embeddings(
             model=self.embedding_model,
             input=texts
         )
@@ -242,7 +318,9 @@ class RAGService:
         content_id: str,
         chunk_content: bool = True,
         namespace: Optional[str] = None,
-        knowledge_base_id: Optional[int] = None
+        knowledge_base_id: Optional[int] = None,
+        target_table: str = LIVE_TABLE,
+        replace: bool = False
     ) -> Tuple[bool, List[str]]:
         """
         Index content in PostgreSQL with pgvector.
@@ -254,6 +332,9 @@ class RAGService:
             chunk_content: Whether to chunk the content
             namespace: Optional namespace
             knowledge_base_id: Optional knowledge base ID
+            target_table: Generation table to write to (live or shadow)
+            replace: Remove chunks of content_id that are not part of the new
+                version, in the same transaction as the upsert
         
         Returns:
             Tuple of (success, list of chunk IDs)
@@ -264,42 +345,46 @@ class RAGService:
         
         try:
             if chunk_content:
-                return await self._index_chunked(content, metadata, content_id, namespace, knowledge_base_id)
-            return await self._index_single(content, metadata, content_id, namespace, knowledge_base_id)
+                rows = await self._build_chunk_rows(content, metadata, content_id, namespace, knowledge_base_id)
+            else:
+                rows = await self._build_single_row(content, metadata, content_id, namespace, knowledge_base_id)
+            
+            if not rows:
+                logger.warning(f"No chunks generated for: {content_id}")
+                return False, []
+            
+            chunk_ids = await self._write_vectors(rows, content_id, target_table, replace)
+            if self.track_indexed_chunks:
+                self.indexed_chunks.extend(
+                    (row["kb_id"], np.asarray(json.loads(row["embedding"]), dtype=np.float32))
+                    for row in rows if row["kb_id"] is not None
+                )
+            logger.info(f"Indexed {len(chunk_ids)} vectors for: {content_id}")
+            return True, chunk_ids
         except Exception as e:
             logger.error(f"Error indexing content: {e}")
+            await self.db.rollback()
             return False, []
     
-    async def _index_chunked(
+    async def _build_chunk_rows(
         self,
         content: str,
         metadata: Dict,
         content_id: str,
         namespace: Optional[str] = None,
         knowledge_base_id: Optional[int] = None
-    ) -> Tuple[bool, List[str]]:
-        """Index content as multiple chunks."""
+    ) -> List[Dict]:
+        """Chunk content and embed every chunk, returning rows ready to upsert."""
         chunks = self._chunk_content(content, metadata.get("title", ""))
-        
         if not chunks:
-            logger.warning(f"No chunks generated for: {content_id}")
-            return False, []
+            return []
         
         # Generate embeddings in batch
         texts = [c["text"] for c in chunks]
         embeddings = await self._generate_embeddings_batch(texts)
         
-        # Prepare and insert vectors
-        chunk_ids = []
-        
+        rows = []
         for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            chunk_id = f"{content_id}_chunk_{i}"
-            chunk_ids.append(chunk_id)
-            
-            # Convert embedding to PostgreSQL vector format
-            embedding_str = "[" + ",".join(map(str, embedding)) + "]"
-            
-            # Prepare metadata with chunk info
             chunk_metadata = {
                 **metadata,
                 "content": chunk["text"],
@@ -307,87 +392,70 @@ class RAGService:
                 "total_chunks": len(chunks),
                 "parent_id": content_id
             }
-            
-            # Insert or update vector embedding
-            insert_sql = """
-                INSERT INTO vector_embeddings 
-                    (id, knowledge_base_id, embedding, content, meta_data, namespace, chunk_index, parent_id)
-                VALUES 
-                    (:id, :kb_id, :embedding::vector, :content, :meta_data::jsonb, :namespace, :chunk_index, :parent_id)
-                ON CONFLICT (id) DO UPDATE SET
-                    embedding = EXCLUDED.embedding,
-                    content = EXCLUDED.content,
-                    meta_data = EXCLUDED.meta_data,
-                    namespace = EXCLUDED.namespace,
-                    chunk_index = EXCLUDED.chunk_index,
-                    parent_id = EXCLUDED.parent_id
-            """
-            
-            await self.db.execute(
-                text(insert_sql),
-                {
-                    "id": chunk_id,
-                    "kb_id": knowledge_base_id,
-                    "embedding": embedding_str,
-                    "content": chunk["text"],
-                    "meta_data": json.dumps(chunk_metadata),
-                    "namespace": namespace,
-                    "chunk_index": i,
-                    "parent_id": content_id
-                }
-            )
-        
-        await self.db.commit()
-        logger.info(f"Indexed {len(chunk_ids)} chunks for: {content_id}")
-        return True, chunk_ids
+            rows.append({
+                "id": f"{content_id}_chunk_{i}",
+                "kb_id": knowledge_base_id,
+                "embedding": "[" + ",".join(map(str, embedding)) + "]",
+                "content": chunk["text"],
+                "meta_data": json.dumps(chunk_metadata),
+                "namespace": namespace,
+                "chunk_index": i,
+                "parent_id": content_id
+            })
+        return rows
     
-    async def _index_single(
+    async def _build_single_row(
         self,
         content: str,
         metadata: Dict,
         content_id: str,
         namespace: Optional[str] = None,
         knowledge_base_id: Optional[int] = None
-    ) -> Tuple[bool, List[str]]:
-        """Index content as a single vector."""
+    ) -> List[Dict]:
+        """Embed content as a single vector row."""
         embedding = await self._generate_embedding(content)
-        
-        # Convert embedding to PostgreSQL vector format
-        embedding_str = "[" + ",".join(map(str, embedding)) + "]"
-        
-        # Prepare metadata
         full_metadata = {**metadata, "content": content}
+        return [{
+            "id": content_id,
+            "kb_id": knowledge_base_id,
+            "embedding": "[" + ",".join(map(str, embedding)) + "]",
+            "content": content,
+            "meta_data": json.dumps(full_metadata),
+            "namespace": namespace,
+            "chunk_index": None,
+            "parent_id": content_id
+        }]
+    
+    async def _write_vectors(
+        self,
+        rows: List[Dict],
+        content_id: str,
+        table: str,
+        replace: bool
+    ) -> List[str]:
+        """
+        Upsert prepared rows in one transaction.
         
-        # Insert or update vector embedding
-        insert_sql = """
-            INSERT INTO vector_embeddings 
-                (id, knowledge_base_id, embedding, content, meta_data, namespace, parent_id)
-            VALUES 
-                (:id, :kb_id, :embedding::vector, :content, :meta_data::jsonb, :namespace, :parent_id)
-            ON CONFLICT (id) DO UPDATE SET
-                embedding = EXCLUDED.embedding,
-                content = EXCLUDED.content,
-                    meta_data = EXCLUDED.meta_data,
-                namespace = EXCLUDED.namespace,
-                parent_id = EXCLUDED.parent_id
+        Embeddings are generated before this is called, so the only work done
+        while the transaction is open is the write itself.
         """
+        chunk_ids = [row["id"] for row in rows]
         
-        await self.db.execute(
-            text(insert_sql),
-            {
-                "id": content_id,
-                "kb_id": knowledge_base_id,
-                "embedding": embedding_str,
-                "content": content,
-                "meta_data": json.dumps(full_metadata),
-                "namespace": namespace,
-                "parent_id": content_id
-            }
-        )
+        if replace:
+            await self.db.execute(
+                text(f"""
+                    DELETE FROM {table}
+                    WHERE (parent_id = :content_id OR id = :content_id)
+                      AND NOT (id = ANY(:keep_ids))
+                """),
+                {"content_id": content_id, "keep_ids": chunk_ids}
+            )
         
+        await self.db.execute(text(_upsert_sql(table)), rows)
+        if table == LIVE_TABLE:
+            await self._bump_kb_version()
         await self.db.commit()
-        logger.info(f"Indexed single vector: {content_id}")
-        return True, [content_id]
+        return chunk_ids
     
     # -------------------------------------------------------------------------
     # Content Management
@@ -415,6 +483,7 @@ class RAGService:
                 text("DELETE FROM vector_embeddings WHERE id = :id"),
                 {"id": content_id}
             )
+            await self._bump_kb_version()
             
             await self.db.commit()
             logger.info(f"Deleted content: {content_id}")
@@ -432,12 +501,18 @@ class RAGService:
         namespace: Optional[str] = None,
         knowledge_base_id: Optional[int] = None
     ) -> bool:
-        """Update existing content (delete and re-index)."""
-        await self.delete_content(content_id, namespace)
+        """
+        Update existing content without leaving a gap in the live index.
+        
+        New embeddings are generated first; stale chunks are then removed and
+        the new ones upserted in a single transaction, so concurrent retrieval
+        sees either the old or the new version of the item, never neither.
+        """
         success, _ = await self.index_content(
-            content, metadata, content_id, 
-            namespace=namespace, 
-            knowledge_base_id=knowledge_base_id
+            content, metadata, content_id,
+            namespace=namespace,
+            knowledge_base_id=knowledge_base_id,
+            replace=True
         )
         return success
     
@@ -478,7 +553,7 @@ class RAGService:
                 params[f"key_{key}"] = key
                 params[f"value_{key}"] = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
         
-        query_sql += " ORDER BY similarity DESC LIMIT :top_k"
+        query_sql += f" ORDER BY embedding <=> '{embedding_str}'::vector LIMIT :top_k"
         params["top_k"] = top_k
         
         result = await self.db.execute(text(query_sql), params)
@@ -494,30 +569,261 @@ class RAGService:
         ]
     
     async def get_index_stats(self) -> Dict:
-        """Get statistics about the vector embeddings."""
+        """
+        Get statistics about the vector embeddings without scanning them.
+        
+        Counts come from the trigger-maintained vector_index_stats table. If
+        the triggers are not installed, the total falls back to the planner's
+        pg_class.reltuples estimate and per-namespace counts are omitted.
+        """
         if not self.db:
             return {}
         
         try:
-            # Get total count
-            count_result = await self.db.execute(text("SELECT COUNT(*) as count FROM vector_embeddings"))
-            total_count = count_result.scalar() or 0
+            counts_exact = await trigger_exists(self.db, LIVE_TABLE, STATS_TRIGGER_NAMES[0])
+            if counts_exact:
+                ns_result = await self.db.execute(text(
+                    "SELECT namespace, vector_count FROM vector_index_stats WHERE vector_count > 0"
+                ))
+                namespaces = {row.namespace: int(row.vector_count) for row in ns_result.fetchall()}
+                total_count = sum(namespaces.values())
+            else:
+                namespaces = {}
+                total_count = await estimate_row_count(self.db, LIVE_TABLE)
             
-            # Get namespace counts
-            ns_result = await self.db.execute(
-                text("SELECT namespace, COUNT(*) as count FROM vector_embeddings GROUP BY namespace")
-            )
-            namespaces = {row.namespace or "default": row.count for row in ns_result.fetchall()}
+            size_row = (await self.db.execute(
+                text("""
+                    SELECT pg_total_relation_size(to_regclass(:table)) AS total_bytes,
+                           pg_indexes_size(to_regclass(:table)) AS index_bytes
+                """),
+                {"table": LIVE_TABLE}
+            )).first()
+            state_row = (await self.db.execute(text(
+                "SELECT generation, last_reindex_at, build_started_at FROM vector_index_state WHERE id = 1"
+            ))).first()
             
             return {
                 "total_vectors": total_count,
                 "dimension": self.embedding_dimension,
-                "namespaces": namespaces
+                "namespaces": namespaces,
+                "counts_exact": counts_exact,
+                "table_size_bytes": int(size_row.total_bytes or 0) if size_row else 0,
+                "index_size_bytes": int(size_row.index_bytes or 0) if size_row else 0,
+                "generation": state_row.generation if state_row else None,
+                "last_reindex_at": state_row.last_reindex_at if state_row else None,
+                "reindex_in_progress": bool(state_row and state_row.build_started_at),
             }
         except Exception as e:
             logger.error(f"Error getting index stats: {e}")
+            await self.db.rollback()
             return {}
     
+    # -------------------------------------------------------------------------
+    # Blue/Green Generations
+    # -------------------------------------------------------------------------
+    
+    async def begin_shadow_build(self) -> datetime:
+        """
+        Claim the rebuild slot and create an empty shadow generation.
+        
+        The shadow table copies the live column layout and primary key only;
+        secondary and ANN indexes are built after the bulk load.
+        
+        Returns:
+            Database timestamp at which the build started
+        
+        Raises:
+            TayAIError: If another rebuild is already in progress
+        """
+        await self.db.execute(text(
+            "INSERT INTO vector_index_state (id, generation) VALUES (1, 1) ON CONFLICT (id) DO NOTHING"
+        ))
+        claimed = await self.db.execute(
+            text("""
+                UPDATE vector_index_state
+                SET build_started_at = now()
+                WHERE id = 1
+                  AND (build_started_at IS NULL
+                       OR build_started_at < now() - make_interval(secs => :stale))
+                RETURNING build_started_at
+            """),
+            {"stale": VECTOR_REINDEX_STALE_SECONDS}
+        )
+        build_started_at = claimed.scalar()
+        if build_started_at is None:
+            await self.db.rollback()
+            raise TayAIError(
+                "A knowledge base reindex is already in progress",
+                code="ALREADY_EXISTS"
+            )
+        
+        await self.db.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+        await self.db.execute(text(
+            f"CREATE TABLE {SHADOW_TABLE} (LIKE {LIVE_TABLE} INCLUDING DEFAULTS)"
+        ))
+        await self.db.execute(text(
+            f"ALTER TABLE {SHADOW_TABLE} ADD CONSTRAINT {PRIMARY_KEY_NAME}{SHADOW_SUFFIX} PRIMARY KEY (id)"
+        ))
+        await self.db.commit()
+        logger.info("Started shadow vector index build")
+        return build_started_at
+    
+    async def swap_shadow_build(self) -> int:
+        """
+        Index the shadow generation and make it live in one transaction.
+        
+        Index builds happen before the swap so the exclusive lock taken by the
+        renames is only held for a catalog update. The replaced generation is
+        kept as RETIRED_TABLE until drop_retired_generation() is called.
+        
+        Returns:
+            Number of vectors in the new live generation
+        """
+        await self._build_shadow_indexes()
+        await self.db.execute(text(f"ANALYZE {SHADOW_TABLE}"))
+        await self.db.commit()
+        
+        await self.db.execute(text("SET LOCAL lock_timeout = '10s'"))
+        await self._install_stats_triggers(SHADOW_TABLE)
+        await self.db.execute(text(f"DROP TABLE IF EXISTS {RETIRED_TABLE}"))
+        await self.db.execute(text(f"ALTER TABLE {LIVE_TABLE} RENAME TO {RETIRED_TABLE}"))
+        for name in await self._index_names(RETIRED_TABLE):
+            retired_name = name[:63 - len(RETIRED_SUFFIX)] + RETIRED_SUFFIX
+            await self.db.execute(text(f'ALTER INDEX "{name}" RENAME TO "{retired_name}"'))
+        await self.db.execute(text(f"ALTER TABLE {SHADOW_TABLE} RENAME TO {LIVE_TABLE}"))
+        for name in await self._index_names(LIVE_TABLE):
+            if name.endswith(SHADOW_SUFFIX):
+                await self.db.execute(text(
+                    f'ALTER INDEX "{name}" RENAME TO "{name[:-len(SHADOW_SUFFIX)]}"'
+                ))
+        
+        vector_count = (await self.db.execute(text(f"SELECT COUNT(*) FROM {LIVE_TABLE}"))).scalar() or 0
+        await self.db.execute(text("""
+            UPDATE vector_index_state
+            SET generation = generation + 1,
+                kb_version = kb_version + 1,
+                last_reindex_at = now(),
+                build_started_at = NULL
+            WHERE id = 1
+        """))
+        await self.db.commit()
+        logger.info(f"Swapped in new vector index generation ({vector_count} vectors)")
+        return vector_count
+    
+    async def abort_shadow_build(self) -> None:
+        """Discard the shadow generation and release the rebuild slot."""
+        await self.db.rollback()
+        await self.db.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+        await self.db.execute(text(
+            "UPDATE vector_index_state SET build_started_at = NULL WHERE id = 1"
+        ))
+        await self.db.commit()
+        logger.warning("Aborted shadow vector index build; live generation unchanged")
+    
+    async def drop_retired_generation(self) -> None:
+        """Garbage-collect the generation replaced by the last swap."""
+        await self.db.execute(text(f"DROP TABLE IF EXISTS {RETIRED_TABLE}"))
+        await self.db.commit()
+    
+    async def prune_orphaned_vectors(self) -> int:
+        """Delete vectors whose knowledge base item no longer exists."""
+        result = await self.db.execute(text(f"""
+            DELETE FROM {LIVE_TABLE} v
+            WHERE v.knowledge_base_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM knowledge_base kb WHERE kb.id = v.knowledge_base_id)
+        """))
+        await self.db.commit()
+        return result.rowcount or 0
+    
+    async def _build_shadow_indexes(self) -> None:
+        """Create secondary and ANN indexes on the loaded shadow table."""
+        for name, column in SECONDARY_INDEXES.items():
+            await self.db.execute(text(
+                f"CREATE INDEX {name}{SHADOW_SUFFIX} ON {SHADOW_TABLE} ({column})"
+            ))
+        
+        # Prefer HNSW; older pgvector releases only ship IVFFlat
+        ann_name = f"{ANN_INDEX_NAME}{SHADOW_SUFFIX}"
+        try:
+            async with self.db.begin_nested():
+                await self.db.execute(text(
+                    f"CREATE INDEX {ann_name} ON {SHADOW_TABLE} "
+                    f"USING hnsw (embedding vector_cosine_ops)"
+                ))
+        except Exception as e:
+            logger.info(f"HNSW index unavailable ({e}); falling back to IVFFlat")
+            rows = (await self.db.execute(text(f"SELECT COUNT(*) FROM {SHADOW_TABLE}"))).scalar() or 0
+            lists = max(1, rows // 1000)
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(text(
+                        f"CREATE INDEX {ann_name} ON {SHADOW_TABLE} "
+                        f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})"
+                    ))
+            except Exception as e:
+                logger.warning(f"Could not build ANN index, retrieval will scan: {e}")
+    
+    async def _install_stats_triggers(self, table: str) -> None:
+        """
+        Attach the stats triggers to a shadow table and reset the counters
+        to its contents, so counts stay exact once it becomes live.
+        
+        Skipped when the trigger function has not been installed.
+        """
+        installed = (await self.db.execute(
+            text("SELECT to_regproc('vector_index_stats_apply') IS NOT NULL")
+        )).scalar()
+        if not installed:
+            return
+        
+        ins, upd, dele = STATS_TRIGGER_NAMES
+        await self.db.execute(text(f"""
+            CREATE TRIGGER {ins} AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE vector_index_stats_apply()
+        """))
+        await self.db.execute(text(f"""
+            CREATE TRIGGER {upd} AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE vector_index_stats_apply()
+        """))
+        await self.db.execute(text(f"""
+            CREATE TRIGGER {dele} AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE vector_index_stats_apply()
+        """))
+        
+        # Lock the live table first so no counted write slips in between
+        await self.db.execute(text(f"LOCK TABLE {LIVE_TABLE} IN ACCESS EXCLUSIVE MODE"))
+        await self.db.execute(text("DELETE FROM vector_index_stats"))
+        await self.db.execute(text(f"""
+            INSERT INTO vector_index_stats (namespace, vector_count)
+            SELECT COALESCE(namespace, 'default'), COUNT(*) FROM {table} GROUP BY 1
+        """))
+    
+    async def _bump_kb_version(self) -> None:
+        """
+        Advance the KB content version in the current transaction.
+        
+        Anything derived from KB content (e.g. cached responses) is keyed by
+        this version and stops matching as soon as the write commits.
+        """
+        await self.db.execute(text("""
+            INSERT INTO vector_index_state (id, generation, kb_version) VALUES (1, 1, 1)
+            ON CONFLICT (id) DO UPDATE SET kb_version = vector_index_state.kb_version + 1
+        """))
+    
+    async def _index_names(self, table: str) -> List[str]:
+        """List index names on a table in the current schema."""
+        result = await self.db.execute(
+            text("""
+                SELECT indexname FROM pg_indexes
+                WHERE schemaname = current_schema() AND tablename = :table
+            """),
+            {"table": table}
+        )
+        return [row.indexname for row in result.fetchall()]
+    
     # -------------------------------------------------------------------------
     # Content Chunking
     # -------------------------------------------------------------------------
@@ -0,0 +1,267 @@
+"""
+Semantic Cache Service - Reuse answers to near-duplicate questions.
+
+Handles:
+1. Deciding whether a request may be served from cache
+2. Looking up a previous answer by query-embedding similarity
+3. Storing fresh answers for later reuse
+4. Hit / miss / tokens-saved accounting
+
+Entries are keyed by everything that shapes the prompt apart from the
+question itself (context type, recipe, Instagram intent, tier) plus the KB
+content version, so any knowledge base edit invalidates them.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.performance import cache_client
+from app.core.prompts import ConversationContext
+from app.core.prompts.recipes import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Redis counters
+HITS_KEY = "semantic_cache:hits"
+MISSES_KEY = "semantic_cache:misses"
+TOKENS_SAVED_KEY = "semantic_cache:tokens_saved"
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass
+class CacheKey:
+    """Prompt-shaping attributes a cached answer must match exactly."""
+    context_type: str
+    recipe: str
+    instagram: bool
+    user_tier: str
+
+
+@dataclass
+class CachedResponse:
+    """A cache hit."""
+    id: int
+    response: str
+    sources: List[Dict]
+    kb_confidence: float
+    tokens_used: int
+    similarity: float
+
+
+# =============================================================================
+# Semantic Cache Service
+# =============================================================================
+
+class SemanticCacheService:
+    """Service for the semantic response cache."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl_hours = settings.SEMANTIC_CACHE_TTL_HOURS
+    
+    @property
+    def enabled(self) -> bool:
+        return settings.SEMANTIC_CACHE_ENABLED
+    
+    # -------------------------------------------------------------------------
+    # Keys & Eligibility
+    # -------------------------------------------------------------------------
+    
+    def is_cacheable_conversation(
+        self,
+        conversation_history: Optional[List[Dict]],
+        conversation_summary: Optional[str] = None
+    ) -> bool:
+        """
+        Whether a request's conversation allows serving / storing it in the
+        cache: answers that depend on earlier turns are never shared.
+        """
+        return self.enabled and not conversation_history and not conversation_summary
+    
+    @staticmethod
+    def is_cacheable_profile(user_profile: Optional[dict]) -> bool:
+        """Whether the user's profile allows a shared answer (answers using it are personalised)."""
+        return not user_profile
+    
+    @staticmethod
+    def build_key(
+        context_type: ConversationContext,
+        recipe: Optional[Recipe],
+        instagram: bool,
+        user_tier: Optional[str]
+    ) -> CacheKey:
+        """Build the cache key from a message's classification."""
+        return CacheKey(
+            context_type=context_type.value,
+            recipe=recipe.name if recipe else "",
+            instagram=instagram,
+            user_tier=user_tier or "",
+        )
+    
+    # -------------------------------------------------------------------------
+    # Lookup & Store
+    # -------------------------------------------------------------------------
+    
+    async def lookup(self, embedding: List[float], key: CacheKey) -> Optional[CachedResponse]:
+        """
+        Find the closest cached answer for the same key and KB version.
+        
+        Returns:
+            CachedResponse if one is above the similarity threshold
+        """
+        embedding_str = "[" + ",".join(map(str, embedding)) + "]"
+        
+        try:
+            async with self.db.begin_nested():
+                result = await self.db.execute(
+                    text(f"""
+                        SELECT id, response, sources, kb_confidence, tokens_used,
+                               1 - (embedding <=> '{embedding_str}'::vector) AS similarity
+                        FROM response_cache
+                        WHERE context_type = :context_type
+                          AND recipe = :recipe
+                          AND instagram = :instagram
+                          AND user_tier = :user_tier
+                          AND kb_version = (SELECT COALESCE(MAX(kb_version), 0) FROM vector_index_state)
+                          AND created_at > now() - make_interval(hours => :ttl_hours)
+                        ORDER BY embedding <=> '{embedding_str}'::vector
+                        LIMIT 1
+                    """),
+                    {**key.__dict__, "ttl_hours": self.ttl_hours}
+                )
+                row = result.first()
+                
+                if row is None or float(row.similarity) < self.threshold:
+                    self._incr(MISSES_KEY)
+                    return None
+                
+                await self.db.execute(
+                    text("""
+                        UPDATE response_cache
+                        SET hit_count = hit_count + 1, last_hit_at = now()
+                        WHERE id = :id
+                    """),
+                    {"id": row.id}
+                )
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return None
+        
+        sources = row.sources if isinstance(row.sources, list) else json.loads(row.sources) if row.sources else []
+        self._incr(HITS_KEY)
+        self._incr(TOKENS_SAVED_KEY, row.tokens_used or 0)
+        logger.info(f"Semantic cache hit {row.id} (similarity {float(row.similarity):.3f})")
+        
+        return CachedResponse(
+            id=row.id,
+            response=row.response,
+            sources=sources,
+            kb_confidence=float(row.kb_confidence or 0.0),
+            tokens_used=row.tokens_used or 0,
+            similarity=float(row.similarity),
+        )
+    
+    async def store(
+        self,
+        embedding: List[float],
+        key: CacheKey,
+        question: str,
+        response: str,
+        sources: List[Dict],
+        kb_confidence: float,
+        tokens_used: int
+    ) -> None:
+        """
+        Store a fresh answer. Runs in a savepoint of the caller's transaction
+        and is committed with it; failures are logged and ignored.
+        """
+        embedding_str = "[" + ",".join(map(str, embedding)) + "]"
+        
+        try:
+            async with self.db.begin_nested():
+                await self.db.execute(
+                    text("DELETE FROM response_cache WHERE created_at < now() - make_interval(hours => :ttl_hours)"),
+                    {"ttl_hours": self.ttl_hours}
+                )
+                await self.db.execute(
+                    text(f"""
+                        INSERT INTO response_cache
+                            (context_type, recipe, instagram, user_tier, kb_version, question,
+                             response, sources, kb_confidence, tokens_used, hit_count, embedding)
+                        VALUES
+                            (:context_type, :recipe, :instagram, :user_tier,
+                             (SELECT COALESCE(MAX(kb_version), 0) FROM vector_index_state),
+                             :question, :response, CAST(:sources AS json), :kb_confidence,
+                             :tokens_used, 0, '{embedding_str}'::vector)
+                    """),
+                    {
+                        **key.__dict__,
+                        "question": question,
+                        "response": response,
+                        "sources": json.dumps(sources),
+                        "kb_confidence": kb_confidence,
+                        "tokens_used": tokens_used,
+                    }
+                )
+        except Exception as e:
+            logger.warning(f"Semantic cache store failed: {e}")
+    
+    async def clear(self) -> int:
+        """Remove all cache entries."""
+        result = await self.db.execute(text("DELETE FROM response_cache"))
+        await self.db.commit()
+        return result.rowcount or 0
+    
+    # -------------------------------------------------------------------------
+    # Statistics
+    # -------------------------------------------------------------------------
+    
+    async def get_stats(self) -> Dict:
+        """Hit rate and tokens saved since counters were last reset."""
+        hits = misses = tokens_saved = 0
+        if cache_client:
+            try:
+                values = cache_client.mget(HITS_KEY, MISSES_KEY, TOKENS_SAVED_KEY)
+                hits, misses, tokens_saved = (int(v or 0) for v in values)
+            except Exception as e:
+                logger.warning(f"Could not read semantic cache counters: {e}")
+        
+        entries = 0
+        try:
+            entries = (await self.db.execute(text(
+                "SELECT COUNT(*) FROM response_cache "
+                "WHERE created_at > now() - make_interval(hours => :ttl_hours)"
+            ), {"ttl_hours": self.ttl_hours})).scalar() or 0
+        except Exception as e:
+            logger.warning(f"Could not count semantic cache entries: {e}")
+            await self.db.rollback()
+        
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "ttl_hours": self.ttl_hours,
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "tokens_saved": tokens_saved,
+        }
+    
+    @staticmethod
+    def _incr(key: str, amount: int = 1) -> None:
+        if not cache_client or not amount:
+            return
+        try:
+            cache_client.incrby(key, amount)
+        except Exception as e:
+            logger.debug(f"Semantic cache counter update failed: {e}")
@@ -2,8 +2,9 @@
 Usage service - Business logic for usage tracking and rate limiting
 """
 import logging
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from datetime import datetime, timedelta, timezone
 from app.db.models import UsageTracking, User
 from app.core.constants import UserTier
@@ -11,7 +12,7 @@ from app.core.config import settings
 from app.core.exceptions import UsageLimitExceededError
 from app.schemas.usage import UsageStatus
 from app.services.user_service import UserService
-from app.utils.cost_calculator import estimate_cost_from_total_tokens
+from app.utils.cost_calculator import estimate_cost_from_total_tokens, estimate_cost_from_tokens
 import redis
 
 logger = logging.getLogger(__name__)
@@ -116,52 +117,36 @@ class UsageService:
         
         return True
     
-    async def record_usage(self, user_id: int, tokens_used: int = 0):
+    async def record_usage(
+        self,
+        user_id: int,
+        tokens_used: int = 0,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        cached_prompt_tokens: int = 0,
+        model: Optional[str] = None
+    ):
         """
         Record usage for a user.
         
-        Calculates and tracks API costs based on token usage.
+        Calculates and tracks API costs based on token usage. With the
+        prompt/completion split the cost is exact for the model's pricing;
+        with only tokens_used it is estimated from the default ratio.
+        
+        Args:
+            user_id: The user's ID
+            tokens_used: Total tokens (derived from the split if omitted)
+            prompt_tokens: Prompt tokens, if known
+            completion_tokens: Completion tokens, if known
+            cached_prompt_tokens: Prompt tokens served from the prompt cache
+            model: Model used (default: OPENAI_MODEL)
         """
         try:
-            now = datetime.now(timezone.utc)
-            period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            # Calculate API cost
-            cost_usd = estimate_cost_from_total_tokens(tokens_used)
-            cost_micro_dollars = int(cost_usd * 1_000_000)  # Store in micro-dollars for precision
-            
-            # Get or create usage tracking record
-            result = await self.db.execute(
-                select(UsageTracking)
-                .where(
-                    UsageTracking.user_id == user_id,
-                    UsageTracking.period_start == period_start
-                )
+            await self.add_usage(
+                user_id, tokens_used, prompt_tokens, completion_tokens, cached_prompt_tokens, model
             )
-            usage = result.scalar_one_or_none()
-            
-            if usage:
-                usage.messages_count += 1
-                usage.tokens_used += tokens_used
-                usage.api_cost += cost_micro_dollars
-            else:
-                usage = UsageTracking(
-                    user_id=user_id,
-                    period_start=period_start,
-                    period_end=period_end,
-                    messages_count=1,
-                    tokens_used=tokens_used,
-                    api_cost=cost_micro_dollars
-                )
-                self.db.add(usage)
-            
             await self.db.commit()
-            
-            # Update Redis cache
-            cache_key = f"usage:{user_id}:{period_start.strftime('%Y-%m')}"
-            redis_client.incr(cache_key)
-            redis_client.expire(cache_key, 3600)
+            self.count_cached_message(user_id)
         except Exception as e:
             logger.error(f"Error recording usage: {e}")
             try:
@@ -169,6 +154,70 @@ class UsageService:
             except Exception:
                 pass
     
+    async def add_usage(
+        self,
+        user_id: int,
+        tokens_used: int = 0,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        cached_prompt_tokens: int = 0,
+        model: Optional[str] = None
+    ) -> None:
+        """
+        Add one message's usage to the current transaction, without committing.
+        
+        The period row is incremented in place (one UPDATE), and only
+        created when missing. Call count_cached_message once committed.
+        Arguments as for record_usage.
+        """
+        now = datetime.now(timezone.utc)
+        period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        
+        # Calculate API cost
+        model = model or settings.OPENAI_MODEL
+        if prompt_tokens is not None and completion_tokens is not None:
+            tokens_used = tokens_used or prompt_tokens + completion_tokens
+            cost_usd = estimate_cost_from_tokens(
+                prompt_tokens, completion_tokens, model=model, cached_input_tokens=cached_prompt_tokens
+            )
+        else:
+            cost_usd = estimate_cost_from_total_tokens(tokens_used, model=model)
+        cost_micro_dollars = int(cost_usd * 1_000_000)  # Store in micro-dollars for precision
+        
+        result = await self.db.execute(
+            update(UsageTracking)
+            .where(
+                UsageTracking.user_id == user_id,
+                UsageTracking.period_start == period_start
+            )
+            .values(
+                messages_count=UsageTracking.messages_count + 1,
+                tokens_used=UsageTracking.tokens_used + tokens_used,
+                api_cost=UsageTracking.api_cost + cost_micro_dollars,
+            )
+        )
+        if not result.rowcount:
+            self.db.add(UsageTracking(
+                user_id=user_id,
+                period_start=period_start,
+                period_end=period_end,
+                messages_count=1,
+                tokens_used=tokens_used,
+                api_cost=cost_micro_dollars
+            ))
+    
+    @staticmethod
+    def count_cached_message(user_id: int) -> None:
+        """Count a committed message in the cached monthly usage."""
+        try:
+            period_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            cache_key = f"usage:{user_id}:{period_start.strftime('%Y-%m')}"
+            redis_client.incr(cache_key)
+            redis_client.expire(cache_key, 3600)
+        except Exception as e:
+            logger.warning(f"Failed to update cached usage: {e}")
+    
     async def get_usage_status(self, user_id: int, tier: str) -> UsageStatus:
         """Get current usage status for user"""
         now = datetime.now(timezone.utc)
@@ -17,7 +17,7 @@ from .text import (
     validate_message_content,
     truncate_text,
 )
-from .conversation import convert_conversation_history
+from .conversation import convert_conversation_history, trim_history_to_budget
 from .tokens import create_user_tokens
 # Import usage dependency lazily to avoid circular import
 # from .usage import check_usage_limit_dependency
@@ -33,6 +33,7 @@ __all__ = [
     "truncate_text",
     # Conversation utilities
     "convert_conversation_history",
+    "trim_history_to_budget",
     # Token utilities
     "create_user_tokens",
     # Usage utilities - import directly from app.utils.usage to avoid circular import
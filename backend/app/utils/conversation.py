@@ -4,9 +4,16 @@ Conversation Utilities
 Provides functions for:
 - Converting conversation history formats
 - Formatting conversation data
+- Fitting conversation history into a token budget
 """
 from typing import List, Dict, Optional
+from app.core.constants import (
+    HISTORY_MESSAGE_MAX_TOKENS,
+    HISTORY_MIN_TRUNCATED_TOKENS,
+    HISTORY_TRUNCATION_MARKER,
+)
 from app.schemas.chat import ConversationMessage
+from app.utils.token_counter import TOKENS_PER_MESSAGE, count_tokens, truncate_to_tokens
 
 
 def convert_conversation_history(
@@ -17,7 +24,7 @@ def convert_conversation_history(
     
     Args:
         history: List of ConversationMessage objects or None
-        
+    
     Returns:
         List of dicts with 'role' and 'content' keys, or None
     """
@@ -29,3 +36,48 @@ def convert_conversation_history(
         for msg in history
     ]
 
+
+
+def trim_history_to_budget(
+    history: List[Dict[str, str]],
+    budget: int,
+    max_message_tokens: int = HISTORY_MESSAGE_MAX_TOKENS,
+    model: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """
+    Select the most recent history that fits in a token budget.
+    
+    Walks history newest-first, keeping messages until the budget is
+    spent. Messages longer than max_message_tokens, or than what is left
+    of the budget, are truncated with a marker; one that would be cut
+    below HISTORY_MIN_TRUNCATED_TOKENS ends the selection instead.
+    
+    Args:
+        history: Messages (dicts with 'role' and 'content'), oldest first
+        budget: Token budget, including per-message formatting overhead
+        max_message_tokens: Largest content size of a single message
+        model: Model whose tokenizer to use (default: OPENAI_MODEL)
+    
+    Returns:
+        The selected messages, oldest first
+    """
+    marker_tokens = count_tokens(HISTORY_TRUNCATION_MARKER, model)
+    remaining = budget
+    selected = []
+    
+    for msg in reversed(history):
+        content = msg.get("content") or ""
+        tokens = count_tokens(content, model)
+        limit = min(max_message_tokens, remaining - TOKENS_PER_MESSAGE)
+        
+        if tokens > limit:
+            if limit < HISTORY_MIN_TRUNCATED_TOKENS:
+                break
+            content = truncate_to_tokens(content, limit - marker_tokens, model) + HISTORY_TRUNCATION_MARKER
+            tokens = count_tokens(content, model)
+        
+        selected.append({**msg, "content": content})
+        remaining -= tokens + TOKENS_PER_MESSAGE
+    
+    selected.reverse()
+    return selected
@@ -4,6 +4,8 @@ Cost Calculator Utilities
 Provides functions for calculating API costs based on token usage.
 Uses OpenAI pricing as reference.
 """
+from typing import Optional, Tuple
+
 from app.core.config import settings
 
 
@@ -12,11 +14,39 @@ from app.core.config import settings
 GPT4_INPUT_PRICE_PER_1K = 0.03   # $0.03 per 1K input tokens
 GPT4_OUTPUT_PRICE_PER_1K = 0.06  # $0.06 per 1K output tokens
 
+# Per-model prices per 1K tokens: (input, cached input, output).
+# Looked up by longest matching prefix of the model name; models not
+# listed use GPT-4 pricing.
+MODEL_PRICING_PER_1K = {
+    "gpt-4": (0.03, 0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.01, 0.03),
+    "gpt-4o": (0.0025, 0.00125, 0.01),
+    "gpt-4o-mini": (0.00015, 0.000075, 0.0006),
+    "gpt-4.1": (0.002, 0.0005, 0.008),
+    "gpt-4.1-mini": (0.0004, 0.0001, 0.0016),
+    "gpt-4.1-nano": (0.0001, 0.000025, 0.0004),
+    "gpt-3.5-turbo": (0.0005, 0.0005, 0.0015),
+}
+
 # Default ratio: assume 70% input, 30% output for estimation
 DEFAULT_INPUT_RATIO = 0.7
 DEFAULT_OUTPUT_RATIO = 0.3
 
 
+def get_model_pricing(model: Optional[str] = None) -> Tuple[float, float, float]:
+    """
+    Get (input, cached input, output) prices per 1K tokens for a model.
+    
+    Args:
+        model: Model name, e.g. "gpt-4o-2024-08-06" (None: GPT-4 pricing)
+    """
+    if model:
+        matches = [name for name in MODEL_PRICING_PER_1K if model.startswith(name)]
+        if matches:
+            return MODEL_PRICING_PER_1K[max(matches, key=len)]
+    return (GPT4_INPUT_PRICE_PER_1K, GPT4_INPUT_PRICE_PER_1K, GPT4_OUTPUT_PRICE_PER_1K)
+
+
 def estimate_cost_from_total_tokens(
     total_tokens: int,
     input_ratio: float = DEFAULT_INPUT_RATIO,
@@ -33,7 +63,7 @@ def estimate_cost_from_total_tokens(
         total_tokens: Total number of tokens used
         input_ratio: Ratio of tokens that are input (default 0.7)
         output_ratio: Ratio of tokens that are output (default 0.3)
-        model: Model name (currently uses GPT-4 pricing)
+        model: Model name for pricing (default: GPT-4 pricing)
         
     Returns:
         Estimated cost in USD
@@ -41,10 +71,7 @@ def estimate_cost_from_total_tokens(
     if total_tokens <= 0:
         return 0.0
     
-    # Use model-specific pricing if model is provided
-    # For now, default to GPT-4 pricing
-    input_price = GPT4_INPUT_PRICE_PER_1K
-    output_price = GPT4_OUTPUT_PRICE_PER_1K
+    input_price, _, output_price = get_model_pricing(model)
     
     # Calculate input and output tokens
     input_tokens = int(total_tokens * input_ratio)
@@ -62,23 +89,26 @@ def estimate_cost_from_total_tokens(
 def estimate_cost_from_tokens(
     input_tokens: int,
     output_tokens: int,
-    model: str = None
+    model: str = None,
+    cached_input_tokens: int = 0
 ) -> float:
     """
     Calculate API cost from separate input and output token counts.
     
     Args:
-        input_tokens: Number of input tokens
+        input_tokens: Number of input tokens (including cached ones)
         output_tokens: Number of output tokens
-        model: Model name (currently uses GPT-4 pricing)
+        model: Model name for pricing (default: GPT-4 pricing)
+        cached_input_tokens: Input tokens served from the provider's
+            prompt cache, billed at the cached rate
         
     Returns:
         Cost in USD
     """
-    input_price = GPT4_INPUT_PRICE_PER_1K
-    output_price = GPT4_OUTPUT_PRICE_PER_1K
+    input_price, cached_price, output_price = get_model_pricing(model)
     
-    input_cost = (input_tokens / 1000) * input_price
+    input_cost = ((input_tokens - cached_input_tokens) / 1000) * input_price
+    input_cost += (cached_input_tokens / 1000) * cached_price
     output_cost = (output_tokens / 1000) * output_price
     
     total_cost = input_cost + output_cost
@@ -0,0 +1,121 @@
+"""
+Keyword Matching
+
+Finds which of many keyword sets occur in a text in a single pass.
+All keywords are compiled into one trie-shaped regular expression, so a
+message is scanned once however many keywords and sets there are.
+
+Matching has the same semantics as `keyword in text.lower()`: plain
+substring matching, so "loc" matches "local". Keywords containing
+upper-case letters can never match a lower-cased text and are ignored.
+
+Usage:
+    matcher = KeywordMatcher({"pricing": ["price", "charge"]}, {"hair": ["wig"]})
+    hits = matcher.scan("How much should I charge for a wig install?")
+    hits.any("pricing")      # True
+    hits.count("hair")       # 1
+"""
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Mapping, Tuple
+
+_END = ""  # Trie key marking the end of a keyword
+
+
+def _build_trie(keywords: Iterable[str]) -> dict:
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[_END] = keyword
+    return trie
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for a trie node that matches the longest keyword it can."""
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(node.items())
+        if char != _END
+    ]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if _END in node:
+        # Greedy optional: prefer continuing to a longer keyword
+        pattern = "(?:" + pattern + ")?"
+    return pattern
+
+
+def _prefix_keywords(trie: dict, keyword: str) -> Tuple[str, ...]:
+    """Keywords that are prefixes of keyword (including itself)."""
+    found = []
+    node = trie
+    for char in keyword:
+        node = node[char]
+        if _END in node:
+            found.append(node[_END])
+    return tuple(found)
+
+
+class KeywordHits:
+    """Result of one scan: which keywords of each set were found."""
+    
+    def __init__(self, found: FrozenSet[str], matched: Dict[Hashable, List[str]]):
+        self.found = found
+        self._matched = matched
+    
+    def any(self, name: Hashable) -> bool:
+        """Whether any keyword of the set occurs."""
+        return name in self._matched
+    
+    def count(self, name: Hashable) -> int:
+        """How many of the set's keywords occur (duplicates count twice)."""
+        return len(self._matched.get(name, ()))
+    
+    def matched(self, name: Hashable) -> List[str]:
+        """The set's keywords that occur (duplicates repeated)."""
+        return self._matched.get(name, [])
+
+
+class KeywordMatcher:
+    """
+    Compiled matcher over named keyword sets.
+    
+    Set names must be unique across all mappings passed in. The regex
+    finds the longest keyword starting at each position; every shorter
+    keyword starting there is one of its prefixes, so those are looked up
+    from a table built at compile time rather than searched for.
+    """
+    
+    def __init__(self, *keyword_sets: Mapping[Hashable, Iterable[str]]):
+        self._members: Dict[str, List[Hashable]] = defaultdict(list)
+        for sets in keyword_sets:
+            for name, keywords in sets.items():
+                for keyword in keywords:
+                    if keyword and keyword == keyword.lower():
+                        self._members[keyword].append(name)
+        self._members = dict(self._members)
+        
+        trie = _build_trie(self._members)
+        self._prefixes = {keyword: _prefix_keywords(trie, keyword) for keyword in self._members}
+        self._pattern = re.compile("(?=(" + _trie_pattern(trie) + "))") if trie else None
+    
+    def find(self, text: str) -> FrozenSet[str]:
+        """All keywords occurring in text."""
+        if self._pattern is None:
+            return frozenset()
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            found.update(self._prefixes[match.group(1)])
+        return frozenset(found)
+    
+    def scan(self, text: str) -> KeywordHits:
+        """Match every keyword set against text in one pass."""
+        found = self.find(text)
+        matched: Dict[Hashable, List[str]] = defaultdict(list)
+        for keyword in found:
+            for name in self._members[keyword]:
+                matched[name].append(keyword)
+        return KeywordHits(found, dict(matched))
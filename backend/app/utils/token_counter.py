@@ -0,0 +1,95 @@
+"""
+Token Counting Utilities
+
+Local token counts for chat completions, used when the provider does not
+report usage (e.g. a stream closed early). Uses tiktoken when installed
+and falls back to a character-based estimate otherwise.
+"""
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+# Average characters per token for English text (fallback estimate)
+CHARS_PER_TOKEN = 4
+
+# Chat format overhead (per the OpenAI cookbook for gpt-3.5/gpt-4 models)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens in a piece of text.
+    
+    Args:
+        text: Text to count
+        model: Model whose tokenizer to use (default: OPENAI_MODEL)
+    
+    Returns:
+        Token count (exact with tiktoken, estimated otherwise)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model or settings.OPENAI_MODEL)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Cut text down to at most max_tokens tokens, keeping the start.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Token limit
+        model: Model whose tokenizer to use (default: OPENAI_MODEL)
+    
+    Returns:
+        The text, or its longest prefix within the limit
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model or settings.OPENAI_MODEL)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def count_message_tokens(messages: List[Dict], model: Optional[str] = None) -> int:
+    """
+    Count the prompt tokens of a chat completion request.
+    
+    Args:
+        messages: Chat messages as sent to the API
+        model: Model whose tokenizer to use (default: OPENAI_MODEL)
+    
+    Returns:
+        Prompt token count, including per-message formatting overhead
+    """
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_tokens(message.get("role", ""), model)
+        total += count_tokens(message.get("content") or "", model)
+    return total
@@ -0,0 +1,155 @@
+"""
+Vector Utilities
+
+NumPy helpers for embedding storage and incremental clustering.
+Embeddings are stored as float32 blobs so they work on databases
+without the pgvector extension.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def to_blob(vector: Sequence[float]) -> bytes:
+    """Serialize a vector to a float32 byte string."""
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    """Deserialize a float32 byte string to a 1-D array."""
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def stack_blobs(blobs: Sequence[bytes], dimension: int) -> np.ndarray:
+    """Deserialize many blobs into an (n, dimension) matrix."""
+    if not blobs:
+        return np.empty((0, dimension), dtype=np.float32)
+    return np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(blobs), dimension)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so dot products are cosine similarities."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def assign_to_centroids(
+    embeddings: np.ndarray,
+    centroids: np.ndarray,
+    counts: np.ndarray,
+    threshold: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Incrementally assign embeddings to the nearest centroid.
+    
+    Each row joins the most similar centroid if the cosine similarity is at
+    least threshold, updating that centroid's running mean; otherwise it
+    starts a new cluster. Rows are scored against all existing centroids in
+    one matrix product; only rows that miss fall back to a per-row pass so
+    that later rows in the batch can join clusters opened by earlier ones.
+    
+    Args:
+        embeddings: (n, d) matrix of new embeddings
+        centroids: (k, d) matrix of unit-length centroids
+        counts: (k,) member count per centroid
+        threshold: Minimum cosine similarity to join a cluster
+    
+    Returns:
+        Tuple of (labels, centroids, counts). labels[i] indexes the returned
+        centroids; indices >= k are newly created clusters.
+    """
+    embeddings = normalize_rows(embeddings)
+    dimension = embeddings.shape[1]
+    centroids = np.asarray(centroids, dtype=np.float32).reshape(-1, dimension).copy()
+    counts = np.asarray(counts, dtype=np.int64).copy()
+    labels = np.full(len(embeddings), -1, dtype=np.int64)
+    
+    if len(centroids):
+        sims = embeddings @ centroids.T
+        best = sims.argmax(axis=1)
+        hit = sims[np.arange(len(embeddings)), best] >= threshold
+        labels[hit] = best[hit]
+    
+    for i in np.flatnonzero(labels < 0):
+        if len(centroids):
+            sims = centroids @ embeddings[i]
+            j = int(sims.argmax())
+            if sims[j] >= threshold:
+                labels[i] = j
+                continue
+        centroids = np.vstack([centroids, embeddings[i]])
+        counts = np.append(counts, 0)
+        labels[i] = len(centroids) - 1
+    
+    # Running-mean update for every touched centroid
+    for j in np.unique(labels):
+        members = embeddings[labels == j]
+        total = centroids[j] * counts[j] + members.sum(axis=0)
+        counts[j] += len(members)
+        centroids[j] = normalize_rows(total)[0]
+    
+    return labels, centroids, counts
+
+
+def kmeans_refine(
+    embeddings: np.ndarray,
+    centroids: np.ndarray,
+    iterations: int = 5
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Refine centroids with a few spherical k-means iterations.
+    
+    Seeded with the existing centroids so cluster identity is preserved;
+    centroids that end up with no members keep their previous position.
+    
+    Returns:
+        Tuple of (labels, centroids)
+    """
+    embeddings = normalize_rows(embeddings)
+    centroids = normalize_rows(centroids).copy()
+    labels = np.zeros(len(embeddings), dtype=np.int64)
+    
+    for _ in range(iterations):
+        labels = (embeddings @ centroids.T).argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, embeddings)
+        occupied = np.bincount(labels, minlength=len(centroids)) > 0
+        centroids[occupied] = normalize_rows(sums[occupied])
+    
+    return labels, centroids
+
+
+def merge_close_centroids(
+    centroids: np.ndarray,
+    counts: np.ndarray,
+    threshold: float
+) -> List[int]:
+    """
+    Find clusters whose centroids are near-duplicates.
+    
+    Larger clusters absorb smaller ones, so the surviving id is the one
+    admins have most likely seen already.
+    
+    Returns:
+        mapping where mapping[j] is the index cluster j merges into
+        (mapping[j] == j for survivors)
+    """
+    centroids = normalize_rows(centroids)
+    mapping = list(range(len(centroids)))
+    if len(centroids) < 2:
+        return mapping
+    
+    sims = centroids @ centroids.T
+    for j in np.argsort(-np.asarray(counts), kind="stable"):
+        if mapping[j] != j:
+            continue
+        close = np.flatnonzero(sims[j] >= threshold)
+        for other in close:
+            if other != j and mapping[other] == other and counts[other] <= counts[j]:
+                mapping[other] = int(j)
+    
+    return mapping
@@ -0,0 +1,125 @@
+"""
+Benchmark for keyword classification of chat messages.
+
+Compares the compiled single-pass matcher (classify_message plus the
+category and namespace classifiers) with the previous approach of
+testing every keyword with `kw in message.lower()`, and checks both
+give identical results on every sample message.
+
+Usage (from backend/):
+    python -m benchmarks.bench_keywords
+"""
+import timeit
+
+from app.core.prompts import ALL_RECIPES, CONTEXT_KEYWORDS, ConversationContext
+from app.core.prompts.generation import INSTAGRAM_KEYWORDS
+from app.core.prompts.recipes import RECIPE_CONTEXT_KEYWORDS
+from app.services.chat_service import (
+    CATEGORY_KEYWORDS,
+    NAMESPACE_KEYWORDS,
+    ChatService,
+    classify_message,
+)
+
+MESSAGES = [
+    "hi",
+    "How do I price my services?",
+    "My hair is breaking and dry, what product should I buy?",
+    "How much should I charge for a frontal wig install when I'm just starting out?",
+    "Can you audit my shopify store? My wig sales are down and my restock flopped.",
+    "Write a caption for my reel, my instagram reach dropped after the algorithm changes",
+    "I'm fully booked and want passive income, should I create a digital product or a course?",
+    "Which vendor has the best bundle quality and what's the MOQ and shipping cost?",
+    "I keep procrastinating on content because of fear and imposter syndrome",
+    "How do I sell without sounding salesy? I need a sales funnel and a landing page.",
+    " ".join(["My clients keep cancelling and my bookings are slow, what should I post?"] * 20),
+]
+NUMBER = 2000
+
+# Context priority used for tie-breaking by detect_conversation_context
+_PRIORITY = [
+    ConversationContext.TROUBLESHOOTING,
+    ConversationContext.PRODUCT_RECOMMENDATION,
+    ConversationContext.BUSINESS_MENTORSHIP,
+    ConversationContext.HAIR_EDUCATION,
+]
+_RECIPE_BOOSTS = {
+    "content_audit": ("CONTENT INTELLIGENCE & AUDIT (Instagram Reels 2025-2026)", 15),
+    "advanced_sales_funnels": ("ADVANCED SALES, FUNNELS & SCALE INTELLIGENCE (For Booked-Out Stylists, Educators & Brand Builders)", 14),
+    "advanced_stylist": ("ADVANCED SERVICE PROVIDERS - EDUCATOR / PASSIVE INCOME STAGE (Booked-Out → Scaling Beyond Services)", 13),
+    "beginner_stylist": ("SERVICE PROVIDERS / HAIRSTYLISTS BEGINNER STAGE (Filling Bookings + Building Foundations)", 13),
+    "ecommerce": ("WIG & HAIR PRODUCT E-COMMERCE (Shopify-First | Organic-Led | Profit-Protected)", 12),
+    "instagram": ("INSTAGRAM INTELLIGENCE (2025-2026)", 10),
+}
+
+
+def reference_classify(message: str):
+    """Keyword classification by repeated substring tests (previous approach)."""
+    message_lower = message.lower()
+    
+    scores = {c: sum(1 for kw in kws if kw in message_lower) for c, kws in CONTEXT_KEYWORDS.items()}
+    context = ConversationContext.GENERAL
+    if max(scores.values()) > 0:
+        context = next(c for c in _PRIORITY if scores[c] == max(scores.values()))
+    
+    contexts = {
+        name: any(kw in message_lower for kw in kws)
+        for name, kws in RECIPE_CONTEXT_KEYWORDS.items()
+    }
+    best_match, best_score = None, 0
+    for recipe in ALL_RECIPES:
+        score = sum(len(t.split()) for t in recipe.triggers if t.lower() in message_lower)
+        for name, (recipe_name, boost) in _RECIPE_BOOSTS.items():
+            if recipe.name == recipe_name and contexts[name]:
+                score += boost
+        if recipe.name == "CAPTIONS + REELS" and contexts["instagram"]:
+            score = max(0, score - 5)
+        if score > best_score:
+            best_match, best_score = recipe, score
+    
+    instagram = any(kw in message_lower for kw in INSTAGRAM_KEYWORDS)
+    namespace = next(
+        (ns for ns, kws in NAMESPACE_KEYWORDS.items() if any(kw in message_lower for kw in kws)),
+        "faqs"
+    )
+    category = next(
+        (name for name, kws in CATEGORY_KEYWORDS.items() if any(kw in message_lower for kw in kws)),
+        None
+    )
+    return context, best_match, instagram, namespace, category
+
+
+def compiled_classify(message: str):
+    """Keyword classification from one compiled scan."""
+    signals = classify_message(message)
+    category = ChatService._determine_category(message, ConversationContext.GENERAL, signals.keywords)
+    return (
+        signals.context_type,
+        signals.recipe,
+        signals.instagram,
+        ChatService._suggest_namespace(message, signals.keywords),
+        category,
+    )
+
+
+def bench(label: str, classify, messages) -> None:
+    def run():
+        for message in messages:
+            classify(message)
+    
+    loops = NUMBER // len(messages) or 1
+    seconds = min(timeit.repeat(run, number=loops, repeat=3))
+    per_call_us = seconds / (loops * len(messages)) * 1e6
+    print(f"{label:<28} {per_call_us:8.2f} us/message")
+
+
+if __name__ == "__main__":
+    for message in MESSAGES:
+        assert compiled_classify(message) == reference_classify(message), message[:60]
+    print(f"Identical results on {len(MESSAGES)} messages")
+    
+    short = MESSAGES[:-1]
+    bench("substring tests", reference_classify, short)
+    bench("compiled matcher", compiled_classify, short)
+    bench("substring tests (long)", reference_classify, MESSAGES[-1:])
+    bench("compiled matcher (long)", compiled_classify, MESSAGES[-1:])
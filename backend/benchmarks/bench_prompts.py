@@ -0,0 +1,51 @@
+"""
+Microbenchmark for system prompt generation.
+
+Compares the memoized default-persona path of get_system_prompt with a
+full render (persona compiled and prompt assembled on every call, as
+before memoization).
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompts
+"""
+import timeit
+
+from app.core.prompts import ConversationContext, PersonaConfig, get_system_prompt
+
+PROFILE = {
+    "onboarding": {
+        "user_name": "Jasmine",
+        "business_type": "Wig installs",
+        "focus": "Getting booked",
+        "goals": "Fully booked by summer",
+        "experience_level": "Beginner",
+    }
+}
+CASES = [
+    (ConversationContext.BUSINESS_MENTORSHIP, 0.82, None),
+    (ConversationContext.HAIR_EDUCATION, 0.41, PROFILE),
+    (ConversationContext.GENERAL, 1.0, PROFILE),
+]
+NUMBER = 20000
+
+
+def bench(label: str, persona) -> None:
+    def run():
+        for context_type, confidence, profile in CASES:
+            get_system_prompt(
+                persona=persona,
+                context_type=context_type,
+                kb_confidence=confidence,
+                user_profile=profile,
+            )
+    
+    run()  # warm the cache
+    loops = NUMBER // len(CASES)
+    seconds = min(timeit.repeat(run, number=loops, repeat=3))
+    per_call_us = seconds / (loops * len(CASES)) * 1e6
+    print(f"{label:<28} {per_call_us:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    bench("memoized (default persona)", None)
+    bench("full render (custom persona)", PersonaConfig())
@@ -0,0 +1,96 @@
+"""
+Benchmark for SSE framing of a streamed answer.
+
+Replays a simulated provider stream (1-3 character deltas at a steady
+rate) through the previous framing (one json.dumps'd str event per
+delta) and the current one (coalesced chunks encoded by app.core.sse),
+and reports per answer:
+- bytes sent
+- writes: frames handed to the ASGI server, each one send and one
+  socket write syscall (replayed here with send() on a socket pair)
+- CPU time spent producing and writing the frames
+
+Usage (from backend/):
+    python -m benchmarks.bench_sse
+"""
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+
+from app.core.constants import SSE_COALESCE_MAX_BYTES, SSE_COALESCE_WINDOW
+from app.core.sse import coalesce_chunks, encode_event
+
+ANSWER_CHARS = 2400
+DELTA_INTERVAL = 0.002  # Seconds between provider deltas (sped up from ~20ms)
+RUNS = 3
+
+
+def make_deltas(seed: int = 7):
+    rng = random.Random(seed)
+    words = "Price your install at what it costs you plus the profit you want to make ✨ ".split(" ")
+    text = ""
+    while len(text) < ANSWER_CHARS:
+        text += rng.choice(words) + " "
+    deltas, i = [], 0
+    while i < len(text):
+        step = rng.randint(1, 3)
+        deltas.append(text[i:i + step])
+        i += step
+    return deltas
+
+
+async def provider(deltas):
+    for delta in deltas:
+        await asyncio.sleep(DELTA_INTERVAL)
+        yield "chunk", delta
+
+
+async def previous_framing(deltas):
+    async for kind, content in provider(deltas):
+        yield f"event: {kind}\ndata: {json.dumps({'content': content})}\n\n".encode()
+
+
+async def current_framing(deltas):
+    chunks = coalesce_chunks(provider(deltas), SSE_COALESCE_WINDOW, SSE_COALESCE_MAX_BYTES)
+    async for kind, content in chunks:
+        yield encode_event(kind, {"content": content})
+
+
+def drain(sock: socket.socket) -> None:
+    """Read the client side until it closes (the peer reading the stream)."""
+    while sock.recv(1 << 16):
+        pass
+
+
+async def measure(label: str, framing, deltas) -> None:
+    client, server = socket.socketpair()
+    reader = threading.Thread(target=drain, args=(client,), daemon=True)
+    reader.start()
+    writes = sent = 0
+    cpu = 0.0
+    for _ in range(RUNS):
+        writes = sent = 0
+        start = time.process_time()
+        async for frame in framing(deltas):
+            server.send(frame)
+            writes += 1
+            sent += len(frame)
+        cpu += time.process_time() - start
+    server.close()
+    reader.join()
+    client.close()
+    print(f"{label:<20} {sent:8d} bytes {writes:6d} writes {cpu / RUNS * 1000:8.2f} ms CPU")
+
+
+async def main() -> None:
+    deltas = make_deltas()
+    print(f"{len(deltas)} deltas, {sum(len(d) for d in deltas)} characters per answer")
+    await measure("one event per delta", previous_framing, deltas)
+    await measure("coalesced (sse.py)", current_framing, deltas)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
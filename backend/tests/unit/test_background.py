@@ -0,0 +1,69 @@
+"""
+Unit tests for background jobs
+"""
+import asyncio
+
+from app.core.background import run_in_background, stop_background_tasks
+
+
+class TestRunInBackground:
+    """Tests for one-off background jobs"""
+    
+    async def test_same_key_runs_once(self):
+        """Test a job is not started again while one with its key runs"""
+        runs = []
+        release = asyncio.Event()
+        
+        async def job(n):
+            runs.append(n)
+            await release.wait()
+        
+        assert run_in_background("job", job(1), key="k")
+        assert not run_in_background("job", job(2), key="k")
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0.01)
+        assert runs == [1]
+        assert run_in_background("job", job(3), key="k")
+        await asyncio.sleep(0.01)
+        assert runs == [1, 3]
+    
+    async def test_failures_are_contained(self):
+        """Test a failing job is logged, not raised"""
+        async def job():
+            raise RuntimeError("boom")
+        
+        assert run_in_background("failing", job())
+        await asyncio.sleep(0.01)
+    
+    async def test_stop_waits_for_running_jobs(self):
+        """Test shutdown lets a running job finish within the drain timeout"""
+        finished = asyncio.Event()
+        
+        async def job():
+            await asyncio.sleep(0.02)
+            finished.set()
+        
+        run_in_background("write", job())
+        await asyncio.sleep(0)
+        await stop_background_tasks(drain_timeout=1)
+        assert finished.is_set()
+    
+    async def test_stop_cancels_jobs_past_timeout(self):
+        """Test shutdown cancels jobs still running after the drain timeout"""
+        cancelled = asyncio.Event()
+        
+        async def job():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        
+        run_in_background("slow", job(), key="slow")
+        await asyncio.sleep(0)
+        await stop_background_tasks(drain_timeout=0.02)
+        assert cancelled.is_set()
+        assert run_in_background("slow", job(), key="slow")
+        await asyncio.sleep(0)
+        await stop_background_tasks(drain_timeout=0.02)
@@ -0,0 +1,92 @@
+"""
+Unit tests for banned word enforcement
+"""
+import pytest
+
+from app.core.banned_words import find_banned_words, BannedWordScanner
+
+
+def _scan(chunks, **kwargs):
+    """Feed chunks, returning the first hit (or None) and the scanner."""
+    scanner = BannedWordScanner(**kwargs)
+    for chunk in chunks:
+        hit = scanner.feed(chunk)
+        if hit:
+            return hit, scanner
+    return None, scanner
+
+
+class TestFindBannedWords:
+    """Tests for the whole-text check"""
+    
+    def test_case_insensitive(self):
+        """Test matching ignores case"""
+        assert find_banned_words("Take it to the NEXT LEVEL") == ["next level"]
+    
+    def test_clean_text(self):
+        """Test clean text has no matches"""
+        assert find_banned_words("Post three times a week and track saves.") == []
+    
+    def test_contextual_exception(self):
+        """Test a contextual word is allowed next to its context phrase"""
+        words = ["luxury"]
+        contextual = {"luxury": ["luxury hair"]}
+        assert find_banned_words("Luxury hair pricing", words, contextual) == []
+        assert find_banned_words("Pure luxury", words, contextual) == ["luxury"]
+
+
+class TestBannedWordScanner:
+    """Tests for incremental scanning"""
+    
+    def test_match_within_chunk(self):
+        """Test a word inside one chunk is found"""
+        hit, _ = _scan(["This will ", "transform your ", "business"])
+        assert hit == "transform"
+    
+    @pytest.mark.parametrize("chunks", [
+        ["next le", "vel"],
+        ["ne", "xt", " ", "lev", "el"],
+        ["n", "e", "x", "t", " ", "l", "e", "v", "e", "l"],
+    ])
+    def test_match_across_chunks(self, chunks):
+        """Test a word split over chunk boundaries is found"""
+        hit, _ = _scan(["go to the "] + chunks + [" now"])
+        assert hit == "next level"
+    
+    def test_prefers_longest_word(self):
+        """Test the longer of two overlapping words is reported"""
+        hit, _ = _scan(["a total transformation"])
+        assert hit == "transformation"
+    
+    def test_clean_stream(self):
+        """Test a clean stream has no hit and keeps its text"""
+        hit, scanner = _scan(["Post three ", "times a week."])
+        assert hit is None
+        assert scanner.text == "Post three times a week."
+        assert scanner.finish() == []
+    
+    def test_contextual_words_checked_on_finish(self):
+        """Test contextual words are left to the full-text check"""
+        kwargs = {"banned_words": ["luxury"], "contextual_words": {"luxury": ["luxury hair"]}}
+        hit, scanner = _scan(["Pure lux", "ury"], **kwargs)
+        assert hit is None
+        assert scanner.finish() == ["luxury"]
+        
+        hit, scanner = _scan(["Luxury ", "hair pricing"], **kwargs)
+        assert hit is None
+        assert scanner.finish() == []
+    
+    @pytest.mark.parametrize("text", [
+        "Let's level up and unlock your potential.",
+        "Game-changer: this is a journey, period.",
+        "Nothing banned in here at all.",
+    ])
+    def test_matches_whole_text_check(self, text):
+        """Test chunked scanning agrees with the whole-text check"""
+        for size in (1, 3, 7):
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            hit, scanner = _scan(chunks)
+            expected = find_banned_words(text)
+            assert (hit is not None) == bool(expected)
+            if hit:
+                assert hit in expected
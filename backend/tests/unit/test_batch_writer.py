@@ -0,0 +1,74 @@
+"""
+Unit tests for the buffered batch writer
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+import app.core.batch_writer as batch_writer
+from app.core.batch_writer import BatchWriter
+from app.db.models import QuestionLog
+from tests.conftest import TestSessionLocal, test_engine
+
+
+def _row(n: int) -> dict:
+    return {"user_id": 1, "question": f"question {n}", "tokens_used": n}
+
+
+async def _count() -> int:
+    async with TestSessionLocal() as session:
+        return (await session.execute(select(func.count(QuestionLog.id)))).scalar()
+
+
+@pytest.fixture
+async def question_logs(monkeypatch):
+    """question_logs table in the test database, used by the writer."""
+    monkeypatch.setattr(batch_writer, "AsyncSessionLocal", TestSessionLocal)
+    async with test_engine.begin() as conn:
+        await conn.run_sync(QuestionLog.__table__.create)
+    yield
+    async with test_engine.begin() as conn:
+        await conn.run_sync(QuestionLog.__table__.drop)
+
+
+class TestBatchWriter:
+    """Tests for BatchWriter"""
+    
+    async def test_flushes_on_size(self, question_logs):
+        """Test a full batch is inserted without waiting for the interval"""
+        writer = BatchWriter("test", QuestionLog.__table__, batch_size=3, flush_interval=60, max_queue=10)
+        for n in range(3):
+            assert writer.add(_row(n))
+        await asyncio.sleep(0.1)
+        assert await _count() == 3
+        assert writer.stats()["flushes"] == 1
+        await writer.stop()
+    
+    async def test_flushes_on_interval(self, question_logs):
+        """Test a partial batch is inserted once the interval passes"""
+        writer = BatchWriter("test", QuestionLog.__table__, batch_size=100, flush_interval=0.05, max_queue=10)
+        writer.add(_row(1))
+        await asyncio.sleep(0.2)
+        assert await _count() == 1
+        await writer.stop()
+    
+    async def test_stop_flushes_buffered_rows(self, question_logs):
+        """Test rows still buffered are written on stop"""
+        writer = BatchWriter("test", QuestionLog.__table__, batch_size=2, flush_interval=60, max_queue=10)
+        for n in range(5):
+            writer.add(_row(n))
+        await writer.stop()
+        assert await _count() == 5
+        assert writer.stats()["flushed_rows"] == 5
+        assert not writer.add(_row(6))
+    
+    async def test_bounded_queue_drops_rows(self, question_logs):
+        """Test rows beyond the queue bound are dropped and counted"""
+        writer = BatchWriter("test", QuestionLog.__table__, batch_size=10, flush_interval=60, max_queue=2)
+        results = [writer.add(_row(n)) for n in range(4)]
+        assert results == [True, True, False, False]
+        assert writer.stats()["dropped_rows"] == 2
+        assert writer.stats()["queue_depth"] == 2
+        await writer.stop()
+        assert await _count() == 2
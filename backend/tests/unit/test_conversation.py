@@ -0,0 +1,57 @@
+"""
+Unit tests for conversation utilities
+"""
+import pytest
+
+from app.core.constants import HISTORY_TRUNCATION_MARKER
+from app.utils.conversation import trim_history_to_budget
+from app.utils.token_counter import TOKENS_PER_MESSAGE, count_tokens
+
+
+def _msg(role, content):
+    return {"role": role, "content": content}
+
+
+def _cost(messages):
+    return sum(count_tokens(m["content"]) + TOKENS_PER_MESSAGE for m in messages)
+
+
+class TestTrimHistoryToBudget:
+    """Tests for trim_history_to_budget function"""
+    
+    def test_everything_fits(self):
+        """Test short history is kept whole and in order"""
+        history = [_msg("user", "hi"), _msg("assistant", "hey, what's up?"), _msg("user", "pricing help")]
+        assert trim_history_to_budget(history, budget=1000) == history
+    
+    def test_keeps_newest_first(self):
+        """Test the oldest messages are dropped when over budget"""
+        history = [_msg("user", f"message number {i} " * 5) for i in range(10)]
+        selected = trim_history_to_budget(history, budget=_cost(history[-3:]))
+        assert selected == history[-3:]
+    
+    def test_oversized_message_truncated(self):
+        """Test a long turn is cut to the per-message limit with a marker"""
+        history = [_msg("user", "caption audit " * 500), _msg("assistant", "ok")]
+        selected = trim_history_to_budget(history, budget=2000, max_message_tokens=100)
+        
+        assert len(selected) == 2
+        assert selected[0]["content"].endswith(HISTORY_TRUNCATION_MARKER)
+        assert count_tokens(selected[0]["content"]) <= 100 + 2
+        assert selected[1] == history[1]
+    
+    def test_stops_when_remainder_too_small(self):
+        """Test a message that would be cut to a sliver ends the selection"""
+        history = [_msg("user", "older question " * 200), _msg("user", "latest")]
+        budget = _cost(history[-1:]) + TOKENS_PER_MESSAGE + 10
+        assert trim_history_to_budget(history, budget=budget) == history[-1:]
+    
+    def test_stays_within_budget(self):
+        """Test the selection never exceeds the budget"""
+        history = [_msg("user", "word " * n) for n in (300, 20, 150, 5, 400, 60)]
+        for budget in (50, 200, 600, 1500):
+            assert _cost(trim_history_to_budget(history, budget=budget)) <= budget + 2
+    
+    def test_empty_history(self):
+        """Test empty history yields nothing"""
+        assert trim_history_to_budget([], budget=500) == []
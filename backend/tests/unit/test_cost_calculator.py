@@ -5,6 +5,8 @@ import pytest
 from app.utils.cost_calculator import (
     estimate_cost_from_total_tokens,
     estimate_cost_from_tokens,
+    get_model_pricing,
+    MODEL_PRICING_PER_1K,
     GPT4_INPUT_PRICE_PER_1K,
     GPT4_OUTPUT_PRICE_PER_1K,
     DEFAULT_INPUT_RATIO,
@@ -145,3 +147,32 @@ class TestEstimateCostFromTokens:
         
         # Should still calculate (negative costs are possible in edge cases)
         assert isinstance(cost, float)
+
+
+class TestModelPricing:
+    """Tests for per-model pricing"""
+    
+    def test_default_is_gpt4(self):
+        """Test unknown or missing models use GPT-4 pricing"""
+        expected = (GPT4_INPUT_PRICE_PER_1K, GPT4_INPUT_PRICE_PER_1K, GPT4_OUTPUT_PRICE_PER_1K)
+        assert get_model_pricing(None) == expected
+        assert get_model_pricing("some-other-model") == expected
+    
+    def test_longest_prefix_wins(self):
+        """Test dated and variant model names resolve to the closest entry"""
+        assert get_model_pricing("gpt-4o-mini-2024-07-18") == MODEL_PRICING_PER_1K["gpt-4o-mini"]
+        assert get_model_pricing("gpt-4o-2024-08-06") == MODEL_PRICING_PER_1K["gpt-4o"]
+        assert get_model_pricing("gpt-4-0613") == MODEL_PRICING_PER_1K["gpt-4"]
+    
+    def test_model_pricing_applied(self):
+        """Test the model's prices are used for the split"""
+        input_price, _, output_price = MODEL_PRICING_PER_1K["gpt-4o"]
+        cost = estimate_cost_from_tokens(2000, 1000, model="gpt-4o")
+        assert cost == round(2 * input_price + output_price, 6)
+    
+    def test_cached_input_tokens(self):
+        """Test cached prompt tokens are billed at the cached rate"""
+        input_price, cached_price, _ = MODEL_PRICING_PER_1K["gpt-4o"]
+        cost = estimate_cost_from_tokens(2000, 0, model="gpt-4o", cached_input_tokens=1000)
+        assert cost == round(input_price + cached_price, 6)
+        assert cost < estimate_cost_from_tokens(2000, 0, model="gpt-4o")
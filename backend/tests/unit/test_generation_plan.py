@@ -0,0 +1,144 @@
+"""
+Unit tests for the pre-generation stages of a chat turn
+"""
+import asyncio
+
+import pytest
+
+import app.services.chat_service as chat_service_module
+from app.core.config import settings
+from app.core.exceptions import ServerBusyError
+from app.core.llm_gateway import LLMGateway
+from app.core.model_routing import RoutedModel
+from app.core.prompts import FALLBACK_RESPONSES
+from app.services.chat_service import ChatService, GenerationPlan, classify_message
+from app.services.rag_service import ContextResult
+from app.services.semantic_cache_service import CachedResponse
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", True)
+    chat = ChatService(db=None)
+    events = []
+    
+    async def embed(message):
+        return [0.1, 0.2]
+    
+    async def profile(user_id):
+        return None
+    
+    async def retrieve(message, query_embedding, own_session=False):
+        events.append(("retrieve", own_session))
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            events.append(("retrieve_cancelled", own_session))
+            raise
+        return ContextResult("Price for profit.", [{"title": "Pricing", "score": 0.9}], 1, 0.9)
+    
+    monkeypatch.setattr(chat, "_embed_query", embed)
+    monkeypatch.setattr(chat, "_load_user_profile", profile)
+    monkeypatch.setattr(chat, "_retrieve_context", retrieve)
+    return chat, events
+
+
+def _lookup(events, hit):
+    async def lookup(embedding, key):
+        events.append(("lookup",))
+        await asyncio.sleep(0.01)
+        if hit:
+            return CachedResponse(1, "Cached answer", [], 0.9, 10, 0.99)
+        return None
+    return lookup
+
+
+class TestCacheAndRetrieval:
+    """Tests for running retrieval alongside the cache lookup"""
+    
+    async def test_hit_cancels_retrieval(self, service, monkeypatch):
+        """Test a cache hit is served and the retrieval started alongside it is cancelled"""
+        chat, events = service
+        monkeypatch.setattr(chat.semantic_cache, "lookup", _lookup(events, hit=True))
+        
+        plan = await chat._prepare_generation("How do I price?", 1)
+        await asyncio.sleep(0)
+        assert plan.cached.response == "Cached answer"
+        assert plan.route is None
+        assert events == [("retrieve", True), ("lookup",), ("retrieve_cancelled", True)]
+    
+    async def test_miss_uses_overlapped_retrieval(self, service, monkeypatch):
+        """Test a cache miss uses the retrieval that ran during the lookup"""
+        chat, events = service
+        monkeypatch.setattr(chat.semantic_cache, "lookup", _lookup(events, hit=False))
+        
+        plan = await chat._prepare_generation("How do I price?", 1)
+        assert plan.cached is None
+        assert plan.cache_key is not None
+        assert plan.kb_confidence == 0.9
+        assert events == [("retrieve", True), ("lookup",)]
+    
+    async def test_conversation_turns_skip_the_cache(self, service, monkeypatch):
+        """Test a turn with history retrieves on the request session without a lookup"""
+        chat, events = service
+        monkeypatch.setattr(chat.semantic_cache, "lookup", _lookup(events, hit=True))
+        
+        plan = await chat._prepare_generation(
+            "And for a closure?", 1, conversation_history=[{"role": "user", "content": "Hi"}]
+        )
+        assert plan.cached is None
+        assert plan.cache_key is None
+        assert events == [("retrieve", False)]
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """A ChatService whose turns route to the fast model, with a fresh gateway."""
+    gateway = LLMGateway()
+    monkeypatch.setattr(chat_service_module, "llm_gateway", gateway)
+    monkeypatch.setattr(settings, "OPENAI_MODEL", "gpt-4")
+    chat = ChatService(db=None)
+    
+    async def load_history(user_id, conversation_id, conversation_history):
+        return conversation_history, None
+    
+    async def prepare(message, *args, **kwargs):
+        return GenerationPlan(
+            signals=classify_message(message),
+            query_embedding=None,
+            user_profile=None,
+            context_result="",
+            kb_confidence=0.0,
+            route=RoutedModel("small_talk", "gpt-4o-mini", 300),
+        )
+    
+    async def acquire(user_id, user_tier, plan):
+        raise ServerBusyError(1)  # Reached the queue: stop the turn here
+    
+    monkeypatch.setattr(chat, "_load_history", load_history)
+    monkeypatch.setattr(chat, "_prepare_generation", prepare)
+    monkeypatch.setattr(chat, "_acquire_llm", acquire)
+    return chat, gateway
+
+
+def _open(gateway, model):
+    for _ in range(settings.LLM_CIRCUIT_FAILURE_THRESHOLD):
+        gateway.breaker(model).record_failure()
+
+
+class TestCircuitCheck:
+    """Tests for refusing a turn while its routed model's circuit is open"""
+    
+    async def test_open_routed_model_is_refused(self, routed):
+        """Test a turn routed to a model with an open circuit gets the fallback before queueing"""
+        chat, gateway = routed
+        _open(gateway, "gpt-4o-mini")
+        response = await chat.process_message(1, "hey!")
+        assert response.response == FALLBACK_RESPONSES["service_unavailable"]
+    
+    async def test_open_primary_model_does_not_block_fast_route(self, routed):
+        """Test an open circuit on the primary model does not refuse turns routed elsewhere"""
+        chat, gateway = routed
+        _open(gateway, "gpt-4")
+        with pytest.raises(ServerBusyError):
+            await chat.process_message(1, "hey!")
@@ -0,0 +1,118 @@
+"""
+Unit tests for the outbound HTTP pools
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import http
+from app.core.clients import get_openai_client, reset_clients
+from app.core.config import settings
+
+
+async def _handle(reader, writer):
+    """Answer every request on a connection with a small keep-alive response."""
+    try:
+        while await reader.readuntil(b"\r\n\r\n"):
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+@pytest.fixture
+async def server():
+    connections = []
+    
+    async def handle(reader, writer):
+        connections.append(writer)
+        await _handle(reader, writer)
+    
+    srv = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}", connections
+    srv.close()
+
+
+@pytest.fixture(autouse=True)
+async def pools(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP2_ENABLED", False)
+    yield
+    await http.close_http_clients()
+
+
+class TestClients:
+    """Tests for the shared per-service clients"""
+    
+    async def test_one_client_per_service(self):
+        """Test a service's client is reused, and recreated after shutdown"""
+        client = http.get_http_client("membership")
+        assert http.get_http_client("membership") is client
+        assert http.get_http_client("openai") is not client
+        
+        await http.close_http_clients()
+        assert client.is_closed
+        assert http.get_http_client("membership") is not client
+    
+    async def test_openai_client_follows_pool(self, monkeypatch):
+        """Test the OpenAI client is rebuilt once its pool was closed"""
+        monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+        reset_clients()
+        openai_client = get_openai_client()
+        assert get_openai_client() is openai_client
+        
+        await http.close_http_clients()
+        rebuilt = get_openai_client()
+        assert rebuilt is not openai_client
+        assert not http.get_http_client("openai").is_closed
+        reset_clients()
+    
+    def test_unknown_service(self):
+        """Test asking for an unconfigured service fails"""
+        with pytest.raises(ValueError):
+            http.get_http_client("pinecone")
+
+
+class TestPoolStats:
+    """Tests for connection reuse and pool utilization"""
+    
+    async def test_requests_reuse_a_connection(self, server):
+        """Test sequential requests share one kept-alive connection"""
+        url, connections = server
+        client = http.get_http_client("membership")
+        for _ in range(3):
+            response = await client.get(url)
+            assert response.text == "ok"
+        
+        assert len(connections) == 1
+        stats = http.pool_stats()["services"]["membership"]
+        assert stats["requests"] == 3
+        assert stats["in_flight"] == 0
+        assert stats["connections"] == 1
+        assert stats["idle_connections"] == 1
+        assert stats["max_connections"] == settings.MEMBERSHIP_HTTP_MAX_CONNECTIONS
+    
+    async def test_open_stream_counts_in_flight(self, server):
+        """Test a response counts as in flight until it is closed"""
+        url, _ = server
+        client = http.get_http_client("membership")
+        async with client.stream("GET", url):
+            stats = http.pool_stats()["services"]["membership"]
+            assert stats["in_flight"] == 1
+            assert stats["busy_connections"] == 1
+        
+        stats = http.pool_stats()["services"]["membership"]
+        assert stats["in_flight"] == 0
+        assert stats["peak_in_flight"] == 1
+    
+    async def test_failed_request_counts_error(self):
+        """Test a request that cannot connect is counted as an error"""
+        client = http.get_http_client("membership")
+        with pytest.raises(httpx.ConnectError):
+            await client.get("http://127.0.0.1:9/")
+        stats = http.pool_stats()["services"]["membership"]
+        assert stats["errors"] == 1
+        assert stats["in_flight"] == 0
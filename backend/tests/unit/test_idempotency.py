@@ -0,0 +1,140 @@
+"""
+Unit tests for idempotent chat submissions
+"""
+import asyncio
+
+import pytest
+
+import app.core.idempotency as idempotency_module
+from app.core.chat_events import ChatEvent, ChatEventType
+from app.core.exceptions import IdempotencyConflictError
+from app.core.idempotency import IdempotencyRecord, replay_events, request_fingerprint
+
+
+class InMemoryRedis:
+    """The few Redis string commands the records use (TTLs ignored)."""
+    
+    def __init__(self):
+        self.data = {}
+    
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+    
+    async def get(self, key):
+        return self.data.get(key)
+    
+    async def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = InMemoryRedis()
+    monkeypatch.setattr(idempotency_module, "get_redis_client", lambda: client)
+    monkeypatch.setattr(idempotency_module, "IDEMPOTENCY_POLL_INTERVAL", 0.01)
+    return client
+
+
+FINGERPRINT = request_fingerprint("How do I price a wig install?", None, False)
+
+
+class TestResolve:
+    """Tests for claiming a key and answering retries"""
+    
+    async def test_first_request_claims(self, redis):
+        """Test the first request with a key runs, and a retry gets its response"""
+        first = IdempotencyRecord(1, "chat", "abc")
+        assert await first.resolve(FINGERPRINT, timeout=1) is None
+        await first.complete({"response": "Start with your costs"})
+        
+        stored = await IdempotencyRecord(1, "chat", "abc").resolve(FINGERPRINT, timeout=1)
+        assert stored["response"] == {"response": "Start with your costs"}
+    
+    async def test_keys_are_per_user(self, redis):
+        """Test the same key from another user is a separate request"""
+        assert await IdempotencyRecord(1, "chat", "abc").resolve(FINGERPRINT, timeout=1) is None
+        assert await IdempotencyRecord(2, "chat", "abc").resolve(FINGERPRINT, timeout=1) is None
+    
+    async def test_different_request_rejected(self, redis):
+        """Test reusing a key for a different message fails"""
+        await IdempotencyRecord(1, "chat", "abc").resolve(FINGERPRINT, timeout=1)
+        with pytest.raises(IdempotencyConflictError) as exc_info:
+            await IdempotencyRecord(1, "chat", "abc").resolve(request_fingerprint("Other", None, False), timeout=1)
+        assert exc_info.value.code == "IDEMPOTENCY_KEY_REUSED"
+    
+    async def test_retry_waits_for_running_request(self, redis):
+        """Test a retry of a running request gets its response once it completes"""
+        first = IdempotencyRecord(1, "chat", "abc")
+        await first.resolve(FINGERPRINT, timeout=1)
+        retry = asyncio.ensure_future(IdempotencyRecord(1, "chat", "abc").resolve(FINGERPRINT, timeout=1))
+        await asyncio.sleep(0.03)
+        assert not retry.done()
+        
+        await first.complete({"response": "Done"})
+        assert (await retry)["response"] == {"response": "Done"}
+    
+    async def test_retry_runs_after_failure(self, redis):
+        """Test a retry runs the request again once the first one released the key"""
+        first = IdempotencyRecord(1, "chat", "abc")
+        await first.resolve(FINGERPRINT, timeout=1)
+        retry = asyncio.ensure_future(IdempotencyRecord(1, "chat", "abc").resolve(FINGERPRINT, timeout=1))
+        await asyncio.sleep(0.03)
+        await first.release()
+        assert await retry is None
+    
+    async def test_still_running_at_timeout(self, redis):
+        """Test a retry gives up with a conflict when the request outlasts the wait"""
+        await IdempotencyRecord(1, "chat", "abc").resolve(FINGERPRINT, timeout=1)
+        with pytest.raises(IdempotencyConflictError) as exc_info:
+            await IdempotencyRecord(1, "chat", "abc").resolve(FINGERPRINT, timeout=0.03)
+        assert exc_info.value.code == "IDEMPOTENCY_IN_PROGRESS"
+    
+    async def test_stream_retry_attaches(self, redis):
+        """Test a stream retry gets the running request's stream id"""
+        first = IdempotencyRecord(1, "chat_stream", "abc")
+        await first.resolve(FINGERPRINT, timeout=1, stream=True)
+        await first.set_stream("f" * 32)
+        stored = await IdempotencyRecord(1, "chat_stream", "abc").resolve(FINGERPRINT, timeout=1, stream=True)
+        assert stored["stream_id"] == "f" * 32
+
+
+async def _events(*events):
+    for event in events:
+        yield event
+
+
+class TestTrack:
+    """Tests for recording streamed turns"""
+    
+    async def test_completed_turn_is_stored(self, redis):
+        """Test the answer of a streamed turn is stored and replays as one chunk"""
+        record = IdempotencyRecord(1, "chat_stream", "abc")
+        await record.resolve(FINGERPRINT, timeout=1, stream=True)
+        events = _events(
+            ChatEvent(ChatEventType.START, {"context_type": "business_mentorship"}),
+            ChatEvent(ChatEventType.CHUNK, {"content": "Draft"}),
+            ChatEvent(ChatEventType.RESET, {"reason": "banned_words"}),
+            ChatEvent(ChatEventType.CHUNK, {"content": "Price "}),
+            ChatEvent(ChatEventType.CHUNK, {"content": "for profit"}),
+            ChatEvent(ChatEventType.DONE, {"message_id": 7, "conversation_id": 3}),
+        )
+        assert len([event async for event in record.track(events)]) == 6
+        
+        stored = await IdempotencyRecord(1, "chat_stream", "abc").resolve(FINGERPRINT, timeout=1, stream=True)
+        replayed = replay_events(stored)
+        assert [event.type for event in replayed] == [
+            ChatEventType.START, ChatEventType.CHUNK, ChatEventType.DONE
+        ]
+        assert replayed[1].data["content"] == "Price for profit"
+        assert replayed[2].data["message_id"] == 7
+    
+    async def test_failed_turn_releases(self, redis):
+        """Test a turn ending in an error frees the key"""
+        record = IdempotencyRecord(1, "chat_stream", "abc")
+        await record.resolve(FINGERPRINT, timeout=1, stream=True)
+        events = _events(ChatEvent(ChatEventType.ERROR, {"message": "Try again"}))
+        [event async for event in record.track(events)]
+        assert redis.data == {}
@@ -0,0 +1,87 @@
+"""
+Unit tests for compiled keyword matching
+"""
+import random
+
+import pytest
+
+from app.utils.keywords import KeywordMatcher
+from app.core.prompts import (
+    ConversationContext,
+    detect_conversation_context,
+    detect_instagram_intent,
+    detect_recipe,
+)
+from app.core.prompts.context import CONTEXT_KEYWORDS
+
+
+class TestKeywordMatcher:
+    """Tests for KeywordMatcher"""
+    
+    def test_overlapping_and_prefix_keywords(self):
+        """Test keywords sharing a start position are all found"""
+        matcher = KeywordMatcher({"a": ["reel", "reels", "reels not doing well", "not"]})
+        assert matcher.find("My REELS not doing well") == {"reel", "reels", "reels not doing well", "not"}
+    
+    def test_substring_semantics(self):
+        """Test keywords match inside words, like `in`"""
+        matcher = KeywordMatcher({"hair": ["loc"]})
+        assert matcher.scan("Local clients").any("hair")
+    
+    def test_counts_and_duplicates(self):
+        """Test counts per set, with duplicate keywords counted twice"""
+        matcher = KeywordMatcher({"x": ["price", "price", "cost"]}, {"y": ["cost"]})
+        hits = matcher.scan("What does it cost?")
+        assert hits.count("x") == 1
+        assert hits.count("y") == 1
+        assert matcher.scan("price and cost").count("x") == 3
+        assert not matcher.scan("hello").any("x")
+    
+    def test_uppercase_keywords_never_match(self):
+        """Test keywords with capitals are ignored, as `kw in text.lower()`"""
+        matcher = KeywordMatcher({"x": ["hiring VAs"]})
+        assert not matcher.scan("hiring VAs").any("x")
+    
+    def test_empty_matcher(self):
+        """Test a matcher without keywords finds nothing"""
+        assert KeywordMatcher({}).find("anything") == frozenset()
+    
+    def test_matches_substring_reference(self):
+        """Test found keywords equal those passing `kw in text.lower()`"""
+        rng = random.Random(7)
+        alphabet = "abc "
+        keywords = sorted({
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))).strip() or "a"
+            for _ in range(60)
+        })
+        matcher = KeywordMatcher({"all": keywords})
+        for _ in range(200):
+            text = "".join(rng.choice(alphabet + "ABC") for _ in range(rng.randint(0, 40)))
+            expected = {kw for kw in keywords if kw in text.lower()}
+            assert matcher.find(text) == expected
+
+
+class TestDetectorsWithSharedScan:
+    """Tests for classifiers reusing one scan"""
+    
+    @pytest.mark.parametrize("message,expected", [
+        ("How do I price my services?", ConversationContext.BUSINESS_MENTORSHIP),
+        ("My hair is breaking", ConversationContext.TROUBLESHOOTING),
+        ("hello there", ConversationContext.GENERAL),
+    ])
+    def test_detect_conversation_context(self, message, expected):
+        """Test context detection is unchanged"""
+        assert detect_conversation_context(message) == expected
+    
+    def test_shared_scan_gives_same_results(self):
+        """Test a combined scan gives the same classification as separate ones"""
+        from app.core.prompts.generation import INSTAGRAM_KEYWORDS
+        from app.core.prompts.recipes import RECIPE_KEYWORD_SETS
+        
+        matcher = KeywordMatcher(CONTEXT_KEYWORDS, {"instagram": INSTAGRAM_KEYWORDS}, RECIPE_KEYWORD_SETS)
+        message = "Can you audit my shopify store? My wig sales are down and my reach dropped"
+        hits = matcher.scan(message)
+        assert detect_conversation_context(message, hits) == detect_conversation_context(message)
+        assert detect_instagram_intent(message, hits) == detect_instagram_intent(message) is True
+        assert detect_recipe(message, hits) is detect_recipe(message)
+        assert detect_recipe(message).name.startswith("WIG & HAIR PRODUCT E-COMMERCE")
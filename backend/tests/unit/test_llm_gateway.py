@@ -0,0 +1,160 @@
+"""
+Unit tests for the LLM gateway policies
+"""
+import asyncio
+import time
+
+import pytest
+
+import app.core.llm_gateway as gateway_module
+from app.core.config import settings
+from app.core.exceptions import CircuitOpenError, OpenAIError
+from app.core.llm_gateway import CircuitBreaker, LLMGateway
+from app.core.metrics import LatencyHistogram
+
+
+@pytest.fixture(autouse=True)
+def fast_policies(monkeypatch):
+    monkeypatch.setattr(gateway_module, "LLM_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(gateway_module, "LLM_HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_RESET_SECONDS", 30)
+
+
+def _flaky(failures, error=TimeoutError):
+    """Request that fails failures times, then answers "ok"."""
+    calls = []
+    
+    async def request(budget):
+        calls.append(budget)
+        if len(calls) <= failures:
+            raise error()
+        return "ok"
+    
+    return request, calls
+
+
+class TestRetries:
+    """Tests for deadlines and retries"""
+    
+    async def test_retries_transient_errors(self):
+        """Test transient failures are retried until a call succeeds"""
+        gateway = LLMGateway()
+        request, calls = _flaky(2)
+        assert await gateway.call("m", request, timeout=5) == "ok"
+        assert len(calls) == 3
+        assert gateway.stats()["models"]["m"]["retries"] == 2
+    
+    async def test_does_not_retry_client_errors(self):
+        """Test a non-transient error is raised at once"""
+        gateway = LLMGateway()
+        request, calls = _flaky(5, error=ValueError)
+        with pytest.raises(ValueError):
+            await gateway.call("m", request, timeout=5)
+        assert len(calls) == 1
+        assert gateway.breaker("m").state == "closed"
+    
+    async def test_deadline_bounds_a_slow_call(self):
+        """Test a hung upstream fails once the deadline passes"""
+        gateway = LLMGateway()
+        
+        async def hang(budget):
+            await asyncio.sleep(10)
+        
+        start = time.monotonic()
+        with pytest.raises(OpenAIError):
+            await gateway.call("m", hang, timeout=0.05)
+        assert time.monotonic() - start < 1
+
+
+class TestCircuitBreaker:
+    """Tests for failing fast on a failing model"""
+    
+    async def test_opens_and_fails_fast(self):
+        """Test calls are refused without reaching the upstream once the circuit opens"""
+        gateway = LLMGateway()
+        request, calls = _flaky(100)
+        for _ in range(2):
+            with pytest.raises(OpenAIError):
+                await gateway.call("m", request, timeout=5)
+        attempts = len(calls)
+        
+        with pytest.raises(CircuitOpenError):
+            await gateway.call("m", request, timeout=5)
+        with pytest.raises(CircuitOpenError):
+            gateway.check("m")
+        assert len(calls) == attempts
+        assert gateway.stats()["models"]["m"]["circuit"] == "open"
+    
+    def test_half_open_probe(self, monkeypatch):
+        """Test one probe is let through after the reset timeout and closes the circuit"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        now = [1000.0]
+        monkeypatch.setattr(gateway_module.time, "monotonic", lambda: now[0])
+        
+        breaker.record_failure()
+        assert not breaker.allow()
+        now[0] += 31
+        assert breaker.allow()
+        assert not breaker.allow()  # Only one probe at a time
+        breaker.record_success()
+        assert breaker.state == "closed"
+    
+    def test_failed_probe_reopens(self, monkeypatch):
+        """Test a failed probe opens the circuit for another reset timeout"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        now = [1000.0]
+        monkeypatch.setattr(gateway_module.time, "monotonic", lambda: now[0])
+        
+        breaker.record_failure()
+        now[0] += 31
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.times_opened == 1
+
+
+class TestHedging:
+    """Tests for hedged requests"""
+    
+    async def test_slow_call_is_hedged(self, monkeypatch):
+        """Test a call slower than the latency percentile gets a second request that wins"""
+        monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+        gateway = LLMGateway()
+        for _ in range(10):
+            gateway._latency["m"].observe(50)
+        started = []
+        
+        async def request(budget):
+            started.append(budget)
+            if len(started) == 1:
+                await asyncio.sleep(10)
+            return len(started)
+        
+        assert await gateway.call("m", request, timeout=5, hedge=True) == 2
+        stats = gateway.stats()["models"]["m"]
+        assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    
+    async def test_no_hedging_without_samples(self, monkeypatch):
+        """Test calls are not hedged before the model has a latency history"""
+        monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+        gateway = LLMGateway()
+        request, calls = _flaky(0)
+        assert await gateway.call("m", request, timeout=5, hedge=True) == "ok"
+        assert len(calls) == 1
+
+
+class TestLatencyHistogram:
+    """Tests for latency histograms"""
+    
+    def test_percentiles(self):
+        """Test percentiles are the upper bound of the bucket holding the rank"""
+        histogram = LatencyHistogram(buckets=(100, 1000))
+        for ms in (20, 40, 60, 80, 500, 500, 500, 500, 900, 5000):
+            histogram.observe(ms)
+        assert histogram.percentile(0.4) == 100
+        assert histogram.percentile(0.9) == 1000
+        assert histogram.percentile(1.0) is None
+        assert histogram.as_dict()["buckets"] == {"100": 4, "1000": 5, "+Inf": 1}
@@ -0,0 +1,129 @@
+"""
+Unit tests for the LLM scheduler
+"""
+import asyncio
+
+import pytest
+
+from app.core.exceptions import ServerBusyError
+from app.core.llm_scheduler import LLMScheduler
+
+
+async def _queue(scheduler, user_id, tier, tokens=0, admitted=None):
+    """Start an acquire and let it reach the queue (appending user_id to admitted once admitted)."""
+    async def acquire():
+        ticket = await scheduler.acquire(user_id, tier, tokens)
+        if admitted is not None:
+            admitted.append(user_id)
+        return ticket
+    
+    task = asyncio.ensure_future(acquire())
+    await asyncio.sleep(0)
+    return task
+
+
+class TestConcurrency:
+    """Tests for the concurrency budget and queue order"""
+    
+    async def test_admits_up_to_the_limit(self):
+        """Test turns beyond max_concurrency wait for a release"""
+        scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=0, max_wait=5)
+        first = await scheduler.acquire(1, "basic", 0)
+        waiting = await _queue(scheduler, 2, "basic")
+        assert not waiting.done()
+        assert scheduler.stats()["queued"] == 1
+        
+        first.release()
+        second = await waiting
+        assert scheduler.stats()["in_flight"] == 1
+        second.release()
+        assert scheduler.stats()["in_flight"] == 0
+    
+    async def test_vip_goes_first(self):
+        """Test a VIP turn queued after a basic one is admitted before it"""
+        scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=0, max_wait=5)
+        running = await scheduler.acquire(1, "basic", 0)
+        admitted = []
+        basic = await _queue(scheduler, 2, "basic", admitted=admitted)
+        vip = await _queue(scheduler, 3, "vip", admitted=admitted)
+        
+        running.release()
+        (await vip).release()
+        (await basic).release()
+        assert admitted == [3, 2]
+    
+    async def test_fair_within_a_tier(self):
+        """Test a user's extra turns queue behind other users' first turns"""
+        scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=0, max_wait=5)
+        running = await scheduler.acquire(1, "basic", 0)
+        admitted = []
+        burst = await _queue(scheduler, 1, "basic", admitted=admitted)
+        other = await _queue(scheduler, 2, "basic", admitted=admitted)
+        
+        running.release()
+        (await other).release()
+        (await burst).release()
+        assert admitted == [2, 1]
+    
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        """Test a turn cancelled while queued frees its place"""
+        scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=0, max_wait=5)
+        running = await scheduler.acquire(1, "basic", 0)
+        waiting = await _queue(scheduler, 2, "basic")
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.stats()["queued"] == 0
+        running.release()
+        assert scheduler.stats()["in_flight"] == 0
+
+
+class TestLoadShedding:
+    """Tests for shedding turns that would wait too long"""
+    
+    async def test_times_out_in_the_queue(self):
+        """Test a turn still queued at max_wait fails with ServerBusyError"""
+        scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=0, max_wait=0.05)
+        running = await scheduler.acquire(1, "basic", 0)
+        with pytest.raises(ServerBusyError) as exc_info:
+            await scheduler.acquire(2, "basic", 0)
+        assert exc_info.value.retry_after >= 1
+        assert scheduler.stats()["timed_out"] == 1
+        assert scheduler.stats()["queued"] == 0
+        running.release()
+    
+    async def test_sheds_on_estimated_wait(self):
+        """Test a turn is refused at once when the queue ahead would outlast max_wait"""
+        scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=0, max_wait=5)
+        scheduler._service_seconds = 3.0
+        running = await scheduler.acquire(1, "basic", 0)
+        queued = await _queue(scheduler, 2, "basic")
+        
+        with pytest.raises(ServerBusyError):
+            scheduler.check(3, "basic")
+        with pytest.raises(ServerBusyError):
+            await scheduler.acquire(3, "basic", 0)
+        scheduler.check(4, "vip")  # Would go ahead of the queued basic turn
+        assert scheduler.stats()["shed"] == 2
+        
+        running.release()
+        (await queued).release()
+
+
+class TestTokenBudget:
+    """Tests for the tokens-per-minute budget"""
+    
+    async def test_waits_for_tokens(self):
+        """Test a turn waits while the budget is spent and is admitted as it refills"""
+        scheduler = LLMScheduler(max_concurrency=10, tokens_per_minute=60_000, max_wait=5)
+        first = await scheduler.acquire(1, "basic", 60_000)
+        waiting = await _queue(scheduler, 2, "basic", tokens=50)
+        assert not waiting.done()
+        (await asyncio.wait_for(waiting, 1)).release()
+        first.release()
+    
+    async def test_release_returns_unused_tokens(self):
+        """Test the reservation is corrected with the tokens actually used"""
+        scheduler = LLMScheduler(max_concurrency=10, tokens_per_minute=60_000, max_wait=5)
+        ticket = await scheduler.acquire(1, "basic", 10_000)
+        ticket.release(tokens_used=1_000)
+        assert scheduler.stats()["tokens_available"] >= 59_000
@@ -0,0 +1,86 @@
+"""
+Unit tests for collecting indexed chunks for missing KB auto-resolution
+"""
+import numpy as np
+import pytest
+
+import app.services.knowledge_service as knowledge_service_module
+from app.services.knowledge_service import KnowledgeService
+from app.services.rag_service import RAGService
+
+
+class FakeSession:
+    """Stands in for the AsyncSession; the tests never reach the database."""
+    
+    async def rollback(self):
+        pass
+
+
+def _rows(kb_id, count):
+    return [
+        {"id": f"kb_{kb_id}_chunk_{i}", "kb_id": kb_id, "embedding": "[0.5,0.25,1.0]"}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def rag(monkeypatch):
+    service = RAGService(db=FakeSession())
+    
+    async def build_rows(content, metadata, content_id, namespace=None, knowledge_base_id=None):
+        return _rows(knowledge_base_id, 2)
+    
+    async def write_vectors(rows, content_id, table, replace):
+        return [row["id"] for row in rows]
+    
+    monkeypatch.setattr(service, "_build_chunk_rows", build_rows)
+    monkeypatch.setattr(service, "_write_vectors", write_vectors)
+    return service
+
+
+class TestIndexedChunks:
+    """Tests for the chunk vectors kept after indexing"""
+    
+    async def test_kept_as_float32_rows(self, rag):
+        """Test each indexed KB chunk is kept as a float32 vector"""
+        await rag.index_content("Text", {"title": "T"}, "kb_1", knowledge_base_id=1)
+        assert len(rag.indexed_chunks) == 2
+        kb_id, vector = rag.indexed_chunks[0]
+        assert kb_id == 1
+        assert vector.dtype == np.float32
+        assert vector.tolist() == [0.5, 0.25, 1.0]
+    
+    async def test_not_kept_without_tracking(self, rag):
+        """Test nothing is kept while tracking is off (full reindex)"""
+        rag.track_indexed_chunks = False
+        await rag.index_content("Text", {"title": "T"}, "kb_1", knowledge_base_id=1)
+        assert rag.indexed_chunks == []
+
+
+class TestResolveBatches:
+    """Tests for matching indexed chunks in bounded batches"""
+    
+    async def test_waits_for_a_full_batch(self, rag, monkeypatch):
+        """Test chunks are matched once min_chunks are held, then released"""
+        batches = []
+        
+        class RecordingMissingKB:
+            def __init__(self, db, rag_service):
+                pass
+            
+            async def resolve_with_chunks(self, chunks):
+                batches.append(len(chunks))
+                return 0
+        
+        monkeypatch.setattr(knowledge_service_module, "MissingKBService", RecordingMissingKB)
+        service = KnowledgeService(FakeSession())
+        service.rag_service = rag
+        
+        await rag.index_content("Text", {"title": "T"}, "kb_1", knowledge_base_id=1)
+        await service._resolve_missing_kb(min_chunks=3)
+        assert batches == []
+        
+        await rag.index_content("Text", {"title": "T"}, "kb_2", knowledge_base_id=2)
+        await service._resolve_missing_kb(min_chunks=3)
+        assert batches == [4]
+        assert rag.indexed_chunks == []
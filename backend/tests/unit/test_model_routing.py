@@ -0,0 +1,78 @@
+"""
+Unit tests for chat model routing
+"""
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import TokenUsage
+from app.core.model_routing import ModelRouter, RoutingSignals
+from app.core.prompts.context import ConversationContext
+
+
+@pytest.fixture(autouse=True)
+def models(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_ROUTING_ENABLED", True)
+    monkeypatch.setattr(settings, "OPENAI_MODEL", "gpt-4")
+    monkeypatch.setattr(settings, "OPENAI_FAST_MODEL", "gpt-4o-mini")
+
+
+def _signals(**overrides):
+    signals = dict(
+        context_type=ConversationContext.HAIR_EDUCATION,
+        has_recipe=False,
+        kb_confidence=0.5,
+        user_tier="basic",
+        message_chars=200,
+    )
+    signals.update(overrides)
+    return RoutingSignals(**signals)
+
+
+class TestRouting:
+    """Tests for route selection"""
+    
+    def test_small_talk_goes_to_fast_model(self):
+        """Test a short general message gets the fast model and a small budget"""
+        routed = ModelRouter().route(_signals(context_type=ConversationContext.GENERAL, message_chars=12))
+        assert routed.route == "small_talk"
+        assert routed.model == "gpt-4o-mini"
+        assert routed.max_tokens == 300
+    
+    def test_recipe_goes_to_primary_model(self):
+        """Test recipe requests keep the primary model even when short"""
+        routed = ModelRouter().route(
+            _signals(context_type=ConversationContext.GENERAL, has_recipe=True, message_chars=12)
+        )
+        assert routed.route == "recipe"
+        assert routed.model == "gpt-4"
+    
+    def test_kb_grounded_by_tier(self):
+        """Test well-grounded short questions use the fast model for basic members only"""
+        router = ModelRouter()
+        assert router.route(_signals(kb_confidence=0.9)).route == "kb_grounded"
+        assert router.route(_signals(kb_confidence=0.9, user_tier=None)).route == "kb_grounded"
+        assert router.route(_signals(kb_confidence=0.9, user_tier="vip")).route == "default"
+        assert router.route(_signals(kb_confidence=0.6)).route == "default"
+    
+    def test_disabled_routing_uses_default(self, monkeypatch):
+        """Test every turn gets the default route when routing is disabled"""
+        monkeypatch.setattr(settings, "MODEL_ROUTING_ENABLED", False)
+        routed = ModelRouter().route(_signals(context_type=ConversationContext.GENERAL, message_chars=12))
+        assert routed.route == "default"
+        assert routed.model == "gpt-4"
+
+
+class TestRouteStats:
+    """Tests for per-route statistics"""
+    
+    def test_records_latency_tokens_and_cost(self):
+        """Test a recorded generation shows up in its route's stats"""
+        router = ModelRouter()
+        routed = router.route(_signals(context_type=ConversationContext.GENERAL, message_chars=12))
+        router.record(routed, 120.0, 900.0, TokenUsage(prompt_tokens=1000, completion_tokens=100))
+        
+        stats = router.stats()["routes"]
+        assert stats["small_talk"]["turns"] == 1
+        assert stats["small_talk"]["first_token_ms"]["count"] == 1
+        assert stats["small_talk"]["cost_usd"] == pytest.approx(0.00015 + 0.00006)
+        assert stats["default"]["turns"] == 0
@@ -0,0 +1,79 @@
+"""
+Unit tests for system prompt generation
+"""
+import pytest
+from app.core.prompts import (
+    ConversationContext,
+    PersonaConfig,
+    get_system_prompt,
+    get_persona_core_prompt,
+    get_context_mode_prompt,
+    get_confidence_mode_prompt,
+    get_user_context_prompt,
+    get_conversation_summary_prompt,
+)
+
+
+PROFILE = {
+    "onboarding": {
+        "user_name": "Jasmine",
+        "business_type": "Wig installs",
+        "goals": "Fully booked by summer",
+    }
+}
+
+
+class TestGetSystemPrompt:
+    """Tests for the memoized get_system_prompt"""
+    
+    @pytest.mark.parametrize("context_type", list(ConversationContext))
+    @pytest.mark.parametrize("kb_confidence", [0.0, 0.42, 0.7499, 0.75, 1.0])
+    @pytest.mark.parametrize("user_profile", [None, {"onboarding": {}}, PROFILE])
+    def test_memoized_matches_full_render(self, context_type, kb_confidence, user_profile):
+        """Test the cached default-persona path renders the same prompt as a fresh persona"""
+        kwargs = dict(context_type=context_type, kb_confidence=kb_confidence, user_profile=user_profile)
+        
+        assert get_system_prompt(**kwargs) == get_system_prompt(persona=PersonaConfig(), **kwargs)
+    
+    def test_user_context_is_per_request(self):
+        """Test the user block is spliced in without leaking between users"""
+        with_profile = get_system_prompt(user_profile=PROFILE)
+        without_profile = get_system_prompt()
+        
+        assert "**Name**: Jasmine" in with_profile
+        assert "**Goals**: Fully booked by summer" in with_profile
+        assert "USER CONTEXT" not in without_profile
+        assert with_profile.startswith("# TAY AI - AUTHORITATIVE BUSINESS MENTOR")
+    
+    def test_low_confidence_quotes_percentage(self):
+        """Test low confidence mode reports the rounded score"""
+        assert "confidence is LOW (42%)" in get_system_prompt(kb_confidence=0.42)
+        assert "LOW CONFIDENCE MODE" not in get_system_prompt(kb_confidence=0.9)
+    
+    def test_custom_persona_is_not_cached(self):
+        """Test a custom persona's fields are used instead of the cached default"""
+        persona = PersonaConfig(identity="You are a test persona.")
+        
+        assert "You are a test persona." in get_system_prompt(persona=persona)
+        assert "You are a test persona." not in get_system_prompt()
+
+
+class TestPrefixCacheFragments:
+    """Tests for the prompt pieces used by the prefix-cache layout"""
+    
+    def test_persona_core_is_static(self):
+        """Test the persona core is the general, high-confidence prompt without a user block"""
+        assert get_persona_core_prompt() == get_system_prompt()
+        assert "USER CONTEXT" not in get_persona_core_prompt()
+        assert "LOW CONFIDENCE MODE" not in get_persona_core_prompt()
+    
+    def test_dynamic_blocks(self):
+        """Test the dynamic blocks are empty unless they apply"""
+        assert get_confidence_mode_prompt(0.9) == ""
+        assert "LOW (42%)" in get_confidence_mode_prompt(0.42)
+        assert get_user_context_prompt(None) == ""
+        assert "**Name**: Jasmine" in get_user_context_prompt(PROFILE)
+        assert get_context_mode_prompt(ConversationContext.GENERAL) == ""
+        assert "BUSINESS QUESTION MODE" in get_context_mode_prompt(ConversationContext.BUSINESS_MENTORSHIP)
+        assert get_conversation_summary_prompt(None) == ""
+        assert "Sells wigs online" in get_conversation_summary_prompt("Sells wigs online")
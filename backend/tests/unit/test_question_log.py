@@ -0,0 +1,80 @@
+"""
+Unit tests for question logging and missing-KB detection
+"""
+import pytest
+
+import app.services.chat_service as chat_service_module
+from app.core import ConversationContext
+from app.services.chat_service import ChatService
+from app.services.rag_service import ContextResult
+
+
+class RecordingWriter:
+    """Collects the rows given to question_log_writer."""
+    
+    def __init__(self):
+        self.rows = []
+    
+    def add(self, row):
+        self.rows.append(row)
+        return True
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    writer = RecordingWriter()
+    jobs = []
+    
+    def run_in_background(name, coro):
+        coro.close()
+        jobs.append(name)
+    
+    monkeypatch.setattr(chat_service_module, "question_log_writer", writer)
+    monkeypatch.setattr(chat_service_module, "run_in_background", run_in_background)
+    return writer, jobs
+
+
+def _context(*scores):
+    sources = [
+        {"title": f"Doc {i}", "category": "faqs", "score": score, "chunk_id": f"c{i}"}
+        for i, score in enumerate(scores)
+    ]
+    return ContextResult(
+        context="...", sources=sources, total_matches=len(sources),
+        average_score=sum(scores) / len(scores) if scores else 0.0
+    )
+
+
+class TestQuestionLog:
+    """Tests for the question log row of a turn with retrieved sources"""
+    
+    def test_logs_rag_score_of_dict_sources(self, writes):
+        """Test a grounded turn is logged with the average score of its sources"""
+        writer, jobs = writes
+        ChatService(db=None)._log_question_and_missing_kb(
+            1, "How do I price a wig install?", "Start with your costs.",
+            ConversationContext.BUSINESS_MENTORSHIP, _context(0.9, 0.8)
+        )
+        
+        assert len(writer.rows) == 1
+        row = writer.rows[0]
+        assert row["has_sources"] is True
+        assert row["extra_metadata"]["rag_score_avg"] == pytest.approx(0.85)
+        assert row["extra_metadata"]["sources_count"] == 2
+        assert jobs == []
+    
+    def test_low_scores_log_missing_kb(self, writes):
+        """Test a turn whose sources score low is logged as missing KB"""
+        writer, jobs = writes
+        ChatService(db=None)._log_question_and_missing_kb(
+            1, "What's the best glue for lace?", "Here is what I know.",
+            ConversationContext.HAIR_EDUCATION, _context(0.9, 0.5)
+        )
+        
+        assert len(writer.rows) == 1
+        assert jobs == ["missing-kb-log"]
+    
+    def test_missing_kb_reports_lowest_score(self):
+        """Test missing-KB detection reports the lowest source score"""
+        detected = ChatService._detect_missing_kb("Question?", "Answer.", _context(0.9, 0.5))
+        assert detected["rag_score"] == 0.5
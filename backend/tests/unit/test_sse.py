@@ -0,0 +1,139 @@
+"""
+Unit tests for SSE encoding and pacing
+"""
+import asyncio
+import json
+
+from app.core.chat_events import ChatEvent, ChatEventType
+from app.core.sse import (
+    HEARTBEAT_FRAME,
+    coalesce_chunks,
+    encode_event,
+    with_heartbeat,
+)
+
+
+async def _items(items, delay=0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+class TestEncodeEvent:
+    """Tests for SSE frame encoding"""
+    
+    def test_frame_format(self):
+        """Test the frame is a standard SSE event with compact JSON"""
+        frame = encode_event("chunk", {"content": "Hi \"you\" ✨"})
+        assert frame.startswith(b"event: chunk\ndata: ")
+        assert frame.endswith(b"\n\n")
+        assert json.loads(frame.split(b"data: ", 1)[1]) == {"content": "Hi \"you\" ✨"}
+    
+    def test_event_id(self):
+        """Test an event id is sent as the frame's id line (for Last-Event-ID)"""
+        frame = encode_event("chunk", {"content": "a"}, event_id=12)
+        assert frame.startswith(b"id: 12\nevent: chunk\ndata: ")
+
+
+class TestChatEvent:
+    """Tests for encoding chat events per transport"""
+    
+    def test_to_sse(self):
+        """Test an event encodes to the same frame as encode_event"""
+        event = ChatEvent(ChatEventType.DONE, {"message_id": 3, "usage": {"prompt_tokens": 10}})
+        assert event.to_sse() == encode_event("done", event.data)
+    
+    def test_to_ws(self):
+        """Test an event encodes to a {type, data} WebSocket message"""
+        event = ChatEvent(ChatEventType.CHUNK, {"content": "Hi ✨"})
+        assert json.loads(event.to_ws()) == {"type": "chunk", "data": {"content": "Hi ✨"}}
+    
+    def test_is_final(self):
+        """Test done and error end a stream"""
+        assert ChatEvent(ChatEventType.DONE, {}).is_final
+        assert ChatEvent(ChatEventType.ERROR, {}).is_final
+        assert not ChatEvent(ChatEventType.CHUNK, {}).is_final
+
+
+class TestCoalesceChunks:
+    """Tests for merging text deltas"""
+    
+    async def test_merges_by_size_and_keeps_order(self):
+        """Test deltas merge up to the size limit and other items flush the buffer"""
+        items = [("chunk", "ab"), ("chunk", "cd"), ("chunk", "ef"), ("reset", ["x"]), ("chunk", "g")]
+        result = await _collect(coalesce_chunks(_items(items), window=10, max_bytes=4))
+        assert result == [("chunk", "abcd"), ("chunk", "ef"), ("reset", ["x"]), ("chunk", "g")]
+    
+    async def test_flushes_after_window(self):
+        """Test buffered text is released when the window passes without more deltas"""
+        async def slow():
+            yield "chunk", "a"
+            yield "chunk", "b"
+            await asyncio.sleep(0.1)
+            yield "chunk", "c"
+        
+        result = await _collect(coalesce_chunks(slow(), window=0.02, max_bytes=100))
+        assert result == [("chunk", "ab"), ("chunk", "c")]
+    
+    async def test_early_exit_closes_source(self):
+        """Test stopping the consumer closes the source stream"""
+        closed = asyncio.Event()
+        
+        async def source():
+            try:
+                yield "reset", None
+                await asyncio.sleep(60)
+                yield "chunk", "never"
+            finally:
+                closed.set()
+        
+        stream = coalesce_chunks(source(), window=0.01, max_bytes=10)
+        assert await stream.__anext__() == ("reset", None)
+        task = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await stream.aclose()
+        assert closed.is_set()
+
+
+class TestHeartbeat:
+    """Tests for keep-alive frames"""
+    
+    async def test_heartbeat_while_idle(self):
+        """Test a comment frame is sent when the stream is idle"""
+        async def frames():
+            yield b"a"
+            await asyncio.sleep(0.05)
+            yield b"b"
+        
+        result = await _collect(with_heartbeat(frames(), interval=0.02))
+        assert result[0] == b"a" and result[-1] == b"b"
+        assert HEARTBEAT_FRAME in result
+    
+    async def test_no_heartbeat_when_busy(self):
+        """Test a steady stream passes through unchanged"""
+        result = await _collect(with_heartbeat(_items([b"a", b"b", b"c"]), interval=1))
+        assert result == [b"a", b"b", b"c"]
+    
+    async def test_until_stops_and_cancels_source(self):
+        """Test the stream ends once until completes, cancelling the frame in flight"""
+        cancelled = asyncio.Event()
+        
+        async def frames():
+            yield b"a"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            yield b"b"
+        
+        result = await _collect(with_heartbeat(frames(), interval=1, until=asyncio.sleep(0.02)))
+        assert result == [b"a"]
+        assert cancelled.is_set()
@@ -0,0 +1,46 @@
+"""
+Unit tests for local token counting
+"""
+import pytest
+
+from app.utils.token_counter import (
+    count_tokens,
+    count_message_tokens,
+    TOKENS_PER_MESSAGE,
+    TOKENS_PER_REPLY,
+)
+
+
+class TestCountTokens:
+    """Tests for count_tokens function"""
+    
+    def test_empty_text(self):
+        """Test empty text has no tokens"""
+        assert count_tokens("") == 0
+    
+    def test_longer_text_has_more_tokens(self):
+        """Test counts grow with the text"""
+        short = count_tokens("How do I price a wig install?")
+        assert short > 0
+        assert count_tokens("How do I price a wig install? " * 10) > short
+
+
+class TestCountMessageTokens:
+    """Tests for count_message_tokens function"""
+    
+    def test_no_messages(self):
+        """Test an empty prompt still counts the reply priming"""
+        assert count_message_tokens([]) == TOKENS_PER_REPLY
+    
+    def test_includes_message_overhead(self):
+        """Test each message adds its formatting overhead and content"""
+        messages = [
+            {"role": "system", "content": "You are Tay AI."},
+            {"role": "user", "content": "Hi"},
+        ]
+        content_tokens = sum(count_tokens(m["role"]) + count_tokens(m["content"]) for m in messages)
+        assert count_message_tokens(messages) == TOKENS_PER_REPLY + 2 * TOKENS_PER_MESSAGE + content_tokens
+    
+    def test_missing_content(self):
+        """Test messages without content are counted"""
+        assert count_message_tokens([{"role": "assistant", "content": None}]) > TOKENS_PER_REPLY
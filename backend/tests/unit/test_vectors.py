@@ -0,0 +1,108 @@
+"""
+Unit tests for vector utilities
+"""
+import numpy as np
+import pytest
+
+from app.utils.vectors import (
+    to_blob,
+    from_blob,
+    stack_blobs,
+    normalize_rows,
+    assign_to_centroids,
+    kmeans_refine,
+    merge_close_centroids,
+)
+
+
+def _unit(*values):
+    return normalize_rows(np.array(values, dtype=np.float32))[0]
+
+
+class TestBlobs:
+    """Tests for float32 blob serialization"""
+    
+    def test_round_trip(self):
+        """Test a vector survives serialization"""
+        vector = [0.25, -1.5, 3.0]
+        assert from_blob(to_blob(vector)).tolist() == vector
+    
+    def test_stack_blobs(self):
+        """Test many blobs become one matrix"""
+        matrix = stack_blobs([to_blob([1, 2]), to_blob([3, 4])], 2)
+        assert matrix.shape == (2, 2)
+        assert matrix[1].tolist() == [3.0, 4.0]
+    
+    def test_stack_no_blobs(self):
+        """Test empty input gives an empty matrix of the right width"""
+        assert stack_blobs([], 8).shape == (0, 8)
+
+
+class TestAssignToCentroids:
+    """Tests for incremental centroid assignment"""
+    
+    def test_joins_similar_cluster(self):
+        """Test a close embedding joins the existing cluster"""
+        centroids = np.array([_unit(1, 0, 0)])
+        labels, centroids, counts = assign_to_centroids(
+            np.array([[0.95, 0.05, 0]]), centroids, np.array([3]), threshold=0.9
+        )
+        assert labels.tolist() == [0]
+        assert counts.tolist() == [4]
+        assert len(centroids) == 1
+    
+    def test_creates_cluster_below_threshold(self):
+        """Test a dissimilar embedding opens a new cluster"""
+        centroids = np.array([_unit(1, 0, 0)])
+        labels, centroids, counts = assign_to_centroids(
+            np.array([[0, 1, 0]]), centroids, np.array([3]), threshold=0.9
+        )
+        assert labels.tolist() == [1]
+        assert counts.tolist() == [3, 1]
+    
+    def test_batch_rows_share_new_cluster(self):
+        """Test paraphrases in one batch land in the same new cluster"""
+        labels, centroids, counts = assign_to_centroids(
+            np.array([[0, 1, 0], [0, 0.98, 0.05], [1, 0, 0]]),
+            np.empty((0, 3)), np.empty(0), threshold=0.9
+        )
+        assert labels[0] == labels[1]
+        assert labels[2] != labels[0]
+        assert sorted(counts.tolist()) == [1, 2]
+    
+    def test_centroids_stay_unit_length(self):
+        """Test updated centroids are normalized"""
+        _, centroids, _ = assign_to_centroids(
+            np.array([[1, 0.1, 0], [1, -0.1, 0]]), np.empty((0, 3)), np.empty(0), threshold=0.5
+        )
+        assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+
+
+class TestKmeansRefine:
+    """Tests for k-means refinement"""
+    
+    def test_reassigns_to_nearest(self):
+        """Test points move to the nearest refined centroid"""
+        embeddings = np.array([[1, 0], [0.9, 0.1], [0, 1], [0.1, 0.9]])
+        labels, _ = kmeans_refine(embeddings, np.array([[1, 0.2], [0.2, 1]]), iterations=3)
+        assert labels.tolist() == [0, 0, 1, 1]
+    
+    def test_empty_cluster_keeps_position(self):
+        """Test a centroid without members is left in place"""
+        seed = np.array([[1, 0], [-1, 0]], dtype=np.float32)
+        _, centroids = kmeans_refine(np.array([[1, 0.1]]), seed, iterations=2)
+        assert centroids[1].tolist() == pytest.approx([-1.0, 0.0])
+
+
+class TestMergeCloseCentroids:
+    """Tests for near-duplicate cluster merging"""
+    
+    def test_larger_cluster_absorbs_smaller(self):
+        """Test the smaller of two near-identical clusters is merged"""
+        centroids = np.array([[1, 0], [0.99, 0.01], [0, 1]])
+        mapping = merge_close_centroids(centroids, np.array([2, 10, 5]), threshold=0.95)
+        assert mapping == [1, 1, 2]
+    
+    def test_single_cluster(self):
+        """Test a single cluster maps to itself"""
+        assert merge_close_centroids(np.array([[1, 0]]), np.array([1]), 0.9) == [0]
@@ -170,10 +170,11 @@ export const chatApi = {
   }> {
     const body: Record<string, unknown> = {
       message,
-      conversation_history: conversationHistory,
       include_sources: true,
     };
+    // Continuing a session: the server loads the thread's history itself
     if (conversationId != null) body.conversation_id = conversationId;
+    else body.conversation_history = conversationHistory;
     const res = await fetch(`${apiBase()}/chat/`, {
       method: 'POST',
       headers: getHeaders(true),